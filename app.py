@@ -1,169 +1,414 @@
-import json
-from flask import Flask, render_template
-from flask_sqlalchemy import SQLAlchemy
+import argparse
+import os
+import threading
+import time
+from functools import wraps
+from flask import Flask, g, render_template, send_file
+from sqlalchemy import create_engine
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.sql import text
-from src.seeding import Seeding
-import plotly.graph_objs as go
-import plotly.io as pio
-import plotly.utils
-import json
+from src.schools import get_school_registry
+from src.search import SchoolSearchIndex
+from src.plots import (
+    PLOT_FORMATS,
+    box_plot_data,
+    box_plot_json,
+    department_bar_data,
+    department_bar_json,
+    plot_layouts,
+)
+from src.cache import ALL_SCHOOLS, get_response_cache, request_key, requested_school_ids
+from src.backends import METRICS, create_backend
+from src.rankings import (
+    LEADERBOARD_MIN_REVIEWS,
+    LEADERBOARD_ORDERS,
+    LEADERBOARD_PAGE_SIZE,
+    leaderboard_data,
+    page_params,
+    percentile_data,
+)
+from src.dataset import DATASET_PATH
+from src.db import PoolMonitor, pool_options
+from src.metrics import (
+    CONTENT_TYPE,
+    REGISTRY,
+    REQUEST_SECONDS,
+    current_route,
+    instrument_engine,
+)
+from src.profiling import PROFILE_PATH, ProfilerMiddleware, RequestProfiler
+from src.migrations import apply_schema
+from src.readiness import Readiness
+from src.json_provider import json_provider
+from src.export import (
+    EXPORT_PATH,
+    ExportError,
+    ExportFormat,
+    ExportQuery,
+    ExportSpool,
+    data_version,
+    export_etag,
+    stream_export,
+)
 from flask import request, jsonify
-from src.scraping import ProfessorScraper
 from pathlib import Path
-from src.parse_professors import parse_professors, save_to_parquet
-from sqlalchemy import create_engine
-from sqlalchemy_utils import database_exists, create_database
+
+# Scraping (Selenium, the API scraper) and seeding are only imported by the routes and
+# functions using them, so processes only serving the dashboards start without them
+# (see benchmarks/cold_start.py)
 
 app = Flask(__name__)
-app.config["SQLALCHEMY_DATABASE_URI"] = "postgresql:///rmp.db"
-db = SQLAlchemy(app)
+# Responses are encoded with orjson when it is installed (RMP_ORJSON=0 turns it off)
+app.json = json_provider(app, use_orjson=os.environ.get("RMP_ORJSON", "1") != "0")
+# RMP_DATABASE_URL points the app at another database (i.e. a benchmark fixture)
+app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get(
+    "RMP_DATABASE_URL", "postgresql:///rmp.db"
+)
+# Pool size, overflow, timeout, recycle and pre-ping, see src/db.py for the RMP_DB_* overrides
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = pool_options()
+# Number of long-lived browsers working through the scrape queue
+app.config["SCRAPE_DRIVERS"] = 2
+# "api" fetches professors from the RMP GraphQL API and falls back to Selenium on failure,
+# "selenium" always loads the page in a browser
+app.config["SCRAPE_ENGINE"] = os.environ.get("RMP_SCRAPE_ENGINE", "api")
+# The API's URL, the public GraphQL endpoint (src.api_scraper.API_URL) when None
+app.config["SCRAPE_API_URL"] = os.environ.get("RMP_SCRAPE_API_URL")
+# "page" parses the browser's page once every professor is loaded, "records" takes
+# the cards out of the page in batches as they load, for schools too large to keep loaded
+app.config["SELENIUM_EXTRACTION"] = os.environ.get("RMP_SELENIUM_EXTRACTION", "page")
+# Where the dashboard queries are answered from, "postgres" or "parquet"
+# The parquet backend reads the partitioned dataset and needs no database server
+app.config["QUERY_BACKEND"] = os.environ.get("RMP_QUERY_BACKEND", "postgres")
+app.config["DATASET_PATH"] = Path(os.environ.get("RMP_DATASET_PATH", DATASET_PATH))
+# RMP_READ_ONLY=1 only serves the dashboards, the scrape routes answer 503
+# so the process never loads Selenium or the API scraper
+app.config["READ_ONLY"] = os.environ.get("RMP_READ_ONLY", "0") == "1"
+# Requests run under cProfile: "off", "header" (requests sent with an X-Profile header)
+# or "all", see src/profiling.py
+app.config["PROFILING"] = os.environ.get("RMP_PROFILING", "off")
+app.config["PROFILE_PATH"] = Path(os.environ.get("RMP_PROFILE_PATH", PROFILE_PATH))
+# A plain engine, Flask-SQLAlchemy would import its ORM (unused here) at startup
+engine = create_engine(
+    app.config["SQLALCHEMY_DATABASE_URI"], **app.config["SQLALCHEMY_ENGINE_OPTIONS"]
+)
+# Every connection is checked out through the monitor, which returns it when the block ends
+pool_monitor = PoolMonitor(engine)
+# Statements are timed into the /metrics query histogram
+instrument_engine(engine)
+query_backend = create_backend(
+    app.config["QUERY_BACKEND"],
+    connect=pool_monitor.connect,
+    dataset_path=app.config["DATASET_PATH"],
+)
+# Size and time to live in seconds of the plot response cache
+app.config["RESPONSE_CACHE_SIZE"] = 512
+app.config["RESPONSE_CACHE_TTL"] = 600
+
+# Where finished exports are kept for resuming downloads, and for how many seconds
+app.config["EXPORT_PATH"] = Path(os.environ.get("RMP_EXPORT_PATH", EXPORT_PATH))
+app.config["EXPORT_TTL"] = 3600
+# Rows fetched from the server-side cursor and written out at a time
+app.config["EXPORT_CHUNK_ROWS"] = 10_000
+
+response_cache = get_response_cache()
+response_cache.max_entries = app.config["RESPONSE_CACHE_SIZE"]
+response_cache.ttl = app.config["RESPONSE_CACHE_TTL"]
+# Seconds between checks for schools seeded by other processes (see scrape_versions)
+app.config["RESPONSE_CACHE_POLL"] = 2
+response_cache.poll_interval = app.config["RESPONSE_CACHE_POLL"]
+
+# A school's last_changed_at only moves when its professors do (see Seeding.record_scrapes)
+SCRAPE_VERSIONS = text("SELECT school_id, last_changed_at FROM ScrapeState")
+
+
+def scrape_versions() -> dict:
+    """
+    Returns {school_id: when its professors last changed} from the database, so cached
+    responses follow the seeds of every process writing to it, or None before it is prepared.
+    """
+    try:
+        with pool_monitor.connect() as connection:
+            return dict(connection.execute(SCRAPE_VERSIONS).fetchall())
+    except DBAPIError:
+        return None
+
+
+profiler = RequestProfiler(app.config["PROFILING"], app.config["PROFILE_PATH"])
+if profiler.enabled:
+    app.wsgi_app = ProfilerMiddleware(app.wsgi_app, profiler)
+
+db_pool_connections = REGISTRY.gauge(
+    "rmp_db_pool_connections", "Connections of the database pool by state", ["state"]
+)
+db_pool_events = REGISTRY.counter(
+    "rmp_db_pool_events_total",
+    "Pool checkouts, connects, invalidations and timeouts",
+    ["event"],
+)
+response_cache_events = REGISTRY.counter(
+    "rmp_response_cache_events_total",
+    "Response cache hits, misses and drops",
+    ["event"],
+)
+response_cache_entries = REGISTRY.gauge(
+    "rmp_response_cache_entries", "Responses held in the response cache"
+)
+
+
+@REGISTRY.collector
+def collect_pool_and_cache() -> None:
+    # Read from the pool monitor and response cache rather than counted twice
+    stats = pool_monitor.stats()
+    for state in ("in_use", "idle", "overflow"):
+        if stats[state] is not None:
+            db_pool_connections.set(stats[state], state=state)
+    for event in ("checkouts", "connects", "invalidations", "timeouts"):
+        db_pool_events.set_total(stats[event], event=event)
+    info = response_cache.info()
+    for event in ("hits", "misses", "expirations", "evictions", "invalidations"):
+        response_cache_events.set_total(info[event], event=event)
+    response_cache_entries.set(info["entries"])
+
+
+@app.before_request
+def start_request_metrics():
+    # Labelled by the route's rule so IDs in paths don't make a series each
+    g.request_start = time.perf_counter()
+    g.route_token = current_route.set(
+        request.url_rule.rule if request.url_rule else "unmatched"
+    )
+
+
+@app.after_request
+def record_request_metrics(response):
+    # Streamed responses (i.e. /export) are timed until their headers are ready
+    if "request_start" in g:
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - g.request_start,
+            route=current_route.get(),
+            method=request.method,
+            status=response.status_code,
+        )
+    return response
+
+
+@app.teardown_request
+def reset_request_route(exc=None) -> None:
+    token = g.pop("route_token", None)
+    if token is not None:
+        current_route.reset(token)
+
+
+def cached_response(ordered=True, all_schools=False):
+    """
+    Caches a JSON endpoint's responses keyed on its query parameters.
+    Entries are dropped when one of the requested schools is seeded again.
+    Responses carry an ETag so browsers can revalidate with If-None-Match.
+
+    ordered=False treats list parameters as sets (i.e. the order schools were picked in doesn't matter)
+    all_schools=True is for responses built from every school, dropped when any school is seeded
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request_key(request.path, request.args.lists(), ordered)
+            entry = response_cache.get(key)
+            if entry is None:
+                if all_schools:
+                    versions = response_cache.versions([ALL_SCHOOLS])
+                else:
+                    school_names = request.args.getlist("schools[]")
+                    school_names.append(request.args.get("school_name"))
+                    versions = response_cache.versions(
+                        requested_school_ids(school_names)
+                    )
+                response = app.make_response(view(*args, **kwargs))
+                # Errors other than missing data are never cached
+                if response.status_code not in (200, 404):
+                    return response
+                entry = response_cache.set(
+                    key, response.get_data(), response.status_code, versions
+                )
+            response = app.response_class(
+                entry.body, status=entry.status, mimetype="application/json"
+            )
+            response.set_etag(entry.etag)
+            # Browsers keep the response but check back with the ETag every time
+            response.headers["Cache-Control"] = "no-cache"
+            return response.make_conditional(request)
+
+        return wrapper
+
+    return decorator
 
 
 def initialize_database(app: Flask) -> bool:
     """
-    Checks if the database and tables exists
-    If not it creates the db and tables and returns True
+    Checks which tables exist
+    Creates any missing tables, then applies the pending migrations (see src/migrations.py)
+    Returns True if the schools table was missing (i.e. the database needs seeding)
     Otherwise returns False indicating the database is already initialized
     """
-    engine = create_engine(app.config["SQLALCHEMY_DATABASE_URI"])
-    if not database_exists(engine.url):
-        create_database(engine.url)
-    with app.app_context():
-        if not db.engine.dialect.has_table(
-            db.engine.connect(), "schools"
-        ):  # Checking if a table exists
-            schema_path = Path(__file__).parent / "db/schema.sql"
-            with open(schema_path, "r") as f:
-                db.session.execute(text(f.read()))
-            db.session.commit()
-            return True
-        else:
-            return False
+    from src.seeding import Seeding
+
+    with pool_monitor.connect() as connection:
+        # Checking if a table exists
+        needs_seeding = not connection.dialect.has_table(connection, "schools")
+        needs_stats = not connection.dialect.has_table(connection, "departmentstats")
+        needs_aliases = not connection.dialect.has_table(
+            connection, "departmentaliases"
+        )
+        # Creates missing tables, then evolves existing ones with the pending migrations
+        apply_schema(connection)
+        # Databases seeded before the rollup existed build it from their instructors
+        if needs_stats and not needs_seeding:
+            Seeding(connection).refresh_department_stats()
+        connection.commit()
+        # Databases seeded before department names were normalized merge their spellings
+        if needs_aliases and not needs_seeding:
+            Seeding(connection).canonicalize_departments()
+    return needs_seeding
+
+
+export_spool = ExportSpool(app.config["EXPORT_PATH"], ttl=app.config["EXPORT_TTL"])
+search_index = SchoolSearchIndex(
+    get_school_registry(),
+    query_backend.scraped_school_ids,
+    # Polled with the response cache's versions, see poll_scrape_versions
+    poll_scraped=response_cache.poll_versions,
+)
+
+
+def poll_scrape_versions() -> dict:
+    """
+    The response cache's version source (see scrape_versions).
+    Schools scraped by other processes have stamps too, so they're marked as scraped
+    and stop being offered for scraping here.
+    """
+    stamps = scrape_versions()
+    if stamps is not None:
+        search_index.mark_scraped(stamps)
+    return stamps
+
+
+# The dataset of the parquet backend is only written offline (see src/dataset.py)
+if not query_backend.read_only:
+    response_cache.version_source = poll_scrape_versions
 
 
 @app.route("/autocomplete")
 def autocomplete():
     """
     Autocomplete the searched school names
-    Returns a list of 10 school names matching the search term
+    Returns a list of 10 scraped school names matching the search term
     """
     term = request.args.get("term", "")
-    with db.engine.connect() as conn:
-        result = conn.execute(
-            text(
-                """
-                SELECT DISTINCT school_name 
-                FROM Schools 
-                RIGHT JOIN Instructors
-                ON Schools.school_id = Instructors.school_id
-                WHERE school_name 
-                ILIKE :term LIMIT 10
-                """
-            ),
-            {"term": f"%{term}%"},
+    return jsonify(search_index.search(term, limit=10, scraped=True))
+
+
+def user_scrape_request(job, df) -> int:
+    """
+    Syncs a scraped university into the database and adds the parquet to the data directory.
+    Called by the scrape job workers once the professors have been fetched.
+    Unchanged schools skip the database and parquet writes.
+    Input: the scrape job (school id and name for the parquet) and the professors dataframe
+    Output: the number of professors scraped
+    """
+    from src.refresh import ingest_school
+
+    with pool_monitor.connect() as connection:
+        ingest_school(
+            connection,
+            job.school_id,
+            job.school_name,
+            df,
+            dataset_path=app.config["DATASET_PATH"],
+            # Fewer professors than the page advertised means "Show More" stopped early
+            complete=df.height >= (job.total_professors or 0),
         )
-        names = [row[0] for row in result]
-    return jsonify(names)
+    search_index.mark_scraped([job.school_id])
+    return df.height
+
 
+_scrape_jobs = None
+_scrape_jobs_lock = threading.Lock()
 
-def user_scrape_request(id: int, name: str) -> None:
+
+def get_scrape_jobs():
+    """
+    Returns the scrape job queue, created by the first scrape request.
+    Selenium and the API scraper are imported then rather than when the app starts.
     """
-    Scrapes a single university and adds the parquet to the data directory.
-    Input: id from the SCHOOL table in the database, Name for the parquet
+    global _scrape_jobs
+    if _scrape_jobs is None:
+        with _scrape_jobs_lock:
+            if _scrape_jobs is None:
+                from src.api_scraper import API_URL, ApiScraper
+                from src.scrape_jobs import DriverPool, ScrapeJobQueue
+
+                _scrape_jobs = ScrapeJobQueue(
+                    user_scrape_request,
+                    DriverPool(size=app.config["SCRAPE_DRIVERS"]),
+                    api_scraper=(
+                        ApiScraper(app.config["SCRAPE_API_URL"] or API_URL)
+                        if app.config["SCRAPE_ENGINE"] == "api"
+                        else None
+                    ),
+                    extraction=app.config["SELENIUM_EXTRACTION"],
+                )
+    return _scrape_jobs
+
 
-    *Note: Lacks optimization for multiple threads or object persistence for consecutive requests.
-    (i.e. start-up time for the webdriver on each request)*
+def scraping_unavailable():
+    """
+    Returns the error response of the scrape routes when this process can't scrape, or None.
     """
-    url = f"https://www.ratemyprofessors.com/search/professors/{id}?q="
-    scraper = ProfessorScraper()
-    html_string = scraper.read_page_source(url, output_file=None)
-    df = parse_professors(html_string)
-    seeder = Seeding(db.engine.connect())
-    seeder.seed_dataframe(df)
-    data_path = Path(__file__).parent / "data/dataframes" / f"{name}.parquet"
-    save_to_parquet(df, data_path)
+    if query_backend.read_only:
+        return jsonify({"error": "Scraping needs the postgres query backend"}), 503
+    if app.config["READ_ONLY"]:
+        return (
+            jsonify({"error": "Scraping is turned off on this server (RMP_READ_ONLY)"}),
+            503,
+        )
+    return None
 
 
 @app.route("/school_plot")
+@cached_response()
 def school_plot():
     """
     Generates a bar plot for all departments with average professor difficulty, quality,
     or retake percent for a given school.
-    The plot is returned as a JSON object.
+    Returns the plot's data columns, drawn in the browser with the layouts of /plot_layouts,
+    or with format=figure the whole Plotly figure as graphJSON.
     """
     # Retrieve the school name from the URL with default ""
     school_name = request.args.get("school_name", "")
     minReviews = request.args.get("min_reviews", 1000)
     metric = request.args.get("metric", "difficulty")
+    plot_format = request.args.get("format", "compact")
 
     if not school_name:
         return jsonify({"error": "Missing school_name parameter"}), 400
+    if metric not in METRICS:
+        return jsonify({"error": f"Unknown metric {metric}"}), 400
+    if plot_format not in PLOT_FORMATS:
+        return jsonify({"error": f"Unknown format {plot_format}"}), 400
+    try:
+        minReviews = int(minReviews)
+    except ValueError:
+        return jsonify({"error": "min_reviews must be a number"}), 400
 
     # Query for the school's departments with their resepective difficulties and total ratings
-    with db.engine.connect() as connection:
-        result = connection.execute(
-            text(
-                f"""
-                SELECT d.department_name, 
-                        ROUND(SUM(i.{metric} * i.total_ratings) / SUM(i.total_ratings), 2) AS avg_metric,
-                        SUM(i.total_ratings) as total_ratings
-                FROM Instructors i
-                JOIN Departments d ON i.department_id = d.department_id
-                JOIN Schools s ON i.school_id = s.school_id
-                WHERE s.school_name = :school_name
-                GROUP BY d.department_name
-                HAVING SUM(i.total_ratings) >= :minReviews
-                ORDER BY avg_metric DESC
-                """
-            ),
-            {
-                "school_name": school_name,
-                "minReviews": minReviews,
-            },
-        )
-        data = result.fetchall()
+    data = query_backend.department_averages(school_name, metric, minReviews)
 
     if not data:
         return jsonify({"error": "No data found"}), 404
 
-    departments = [row[0] for row in data]
-    avg_stat = [row[1] for row in data]
-    total_ratings = [row[2] for row in data]
-
-    bar = go.Bar(
-        x=departments,
-        y=avg_stat,
-        text=[f"{tr} ratings" for tr in total_ratings],
-        marker_color="#FF9149",
-    )
-
-    # Change the title and axis based on user selection
-    if metric == "difficulty":
-        title = "Average Professor Difficulty"
-        ticks = [1, 2, 3, 4, 5]
-        span = [1, 5]
-    elif metric == "quality":
-        title = "Average Professor Quality"
-        ticks = [1, 2, 3, 4, 5]
-        span = [1, 5]
-    else:
-        title = "Average Professor Retake Percent"
-        ticks = [0, 25, 50, 75, 100]
-        span = [0, 100]
-
-    layout = go.Layout(
-        title=f"Department Wide Averages at {school_name}",
-        xaxis=dict(title="Department", tickangle=45),
-        yaxis=dict(title=title, range=span, tickvals=ticks),
-        height=600,
-        margin=dict(b=150),
-        paper_bgcolor="#FFEDDB",
-    )
-
-    fig = go.Figure(data=[bar], layout=layout)
-    graph_json = json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
-
-    return jsonify({"graphJSON": graph_json})
+    if plot_format == "figure":
+        return jsonify({"graphJSON": department_bar_json(school_name, metric, data)})
+    return jsonify(department_bar_data(school_name, metric, data))
 
 
 @app.route("/autocomplete-unscraped")
@@ -175,127 +420,167 @@ def autocomplete_unscraped():
     *(i.e. no instructors in the database)*
     """
     term = request.args.get("term", "")
-    with db.engine.connect() as connection:
-        result = connection.execute(
-            text(
-                """
-                SELECT school_name
-                FROM schools
-                WHERE school_id NOT IN (
-                    SELECT DISTINCT school_id
-                    FROM instructors
-                )
-                AND school_name ILIKE :term
-                LIMIT 10
-                """
-            ),
-            {"term": f"%{term}%"},
-        )
-        schools = [row[0] for row in result]
-    return jsonify(schools)
+    return jsonify(search_index.search(term, limit=10, scraped=False))
 
 
 @app.route("/scrape_school", methods=["POST"])
 def scrape():
     """
-    Scrapes a single university and adds the parquet to the data directory and
-    populates the database.
+    Queues a single university to be scraped, added to the parquet data directory
+    and populated in the database.
+    Returns the job ID right away, poll /scrape_status/<job_id> for progress.
 
-    Input: school_id from the SCHOOL table in the database, Name for the parquet
+    Input: school_name matching a name in the SCHOOL table in the database
     """
     school_name = request.form.get("school_name")
 
     if not school_name:
         return jsonify({"error": "Missing school_id parameter"}), 400
+    unavailable = scraping_unavailable()
+    if unavailable:
+        return unavailable
 
-    with db.engine.connect() as connection:
-        result = connection.execute(
-            text(
-                """
-                    SELECT school_id 
-                    FROM schools 
-                    WHERE school_name 
-                    ILIKE :school_name LIMIT 1
-                 """
-            ),
-            {"school_name": school_name},
+    registry = get_school_registry()
+    school_id = registry.id_for(school_name)
+    if not school_id:
+        return jsonify({"error": f"School with name {school_name} not found"}), 404
+    school_name = registry.name_for(school_id)
+
+    # Requests for a school that is already being scraped join the running job
+    job = get_scrape_jobs().submit(school_id, school_name)
+
+    return (
+        jsonify(
+            {
+                "job_id": job.job_id,
+                "status": job.status,
+                "message": f"Scraping {job.school_name} with ID {school_id}.",
+            }
+        ),
+        202,
+    )
+
+
+@app.route("/refresh_stale", methods=["POST"])
+def refresh_stale():
+    """
+    Queues a re-scrape of every school last scraped more than max_age_days ago, oldest first.
+    Schools that haven't changed skip the database and parquet writes.
+
+    Input: max_age_days (default 7) and an optional limit on the number of schools
+    Returns the queued job IDs, poll /scrape_status/<job_id> for their progress.
+    """
+    unavailable = scraping_unavailable()
+    if unavailable:
+        return unavailable
+    try:
+        max_age_days = float(request.form.get("max_age_days", 7))
+        limit = request.form.get("limit", type=int)
+    except ValueError:
+        return jsonify({"error": "max_age_days must be a number"}), 400
+
+    from src.seeding import Seeding
+
+    with pool_monitor.connect() as connection:
+        school_ids = Seeding(connection).stale_school_ids(
+            max_age_days * 24 * 3600, limit
         )
-        row = result.fetchone()
-        if not row:
-            return jsonify({"error": f"School with name {school_name} not found"}), 404
-        school_id = row[0]
+    registry = get_school_registry()
+    scrape_jobs = get_scrape_jobs()
+    jobs = [
+        scrape_jobs.submit(school_id, registry.name_for(school_id))
+        for school_id in school_ids
+    ]
+    return jsonify({"job_ids": [job.job_id for job in jobs]}), 202
+
+
+@app.route("/scrape_status/<job_id>")
+def scrape_status(job_id):
+    """
+    Returns the progress of a scrape job
+    (i.e. the number of professors and how many "Show More" clicks are done)
+    """
+    # Processes that haven't queued a scrape yet don't know any job
+    job = _scrape_jobs.get(job_id) if _scrape_jobs is not None else None
+    if not job:
+        return jsonify({"error": f"Unknown job {job_id}"}), 404
+    return jsonify(job.to_dict())
 
-    # Call the scraping function
-    user_scrape_request(school_id, school_name)
 
-    return jsonify({"message": f"Scraped {school_name} with ID {school_id}."})
+@app.route("/scrape_result/<job_id>")
+def scrape_result(job_id):
+    """
+    Returns the outcome of a finished scrape job.
+    Responds with 202 while the job is still queued or running.
+    """
+    # Processes that haven't queued a scrape yet don't know any job
+    job = _scrape_jobs.get(job_id) if _scrape_jobs is not None else None
+    if not job:
+        return jsonify({"error": f"Unknown job {job_id}"}), 404
+    if not job.finished:
+        return jsonify({"status": job.status}), 202
+    if job.status == "failed":
+        return jsonify({"status": job.status, "error": job.error}), 500
+    return jsonify(
+        {
+            "status": job.status,
+            "message": f"Scraped {job.school_name} with ID {job.school_id}.",
+            "rows": job.rows,
+        }
+    )
 
 
 @app.route("/box_plot")
+@cached_response()
 def box_plot():
     """
     Generates a box plot for the selected metric and department across multiple schools
-    The plot is returned as a JSON object.
+    Returns the plot's data columns, drawn in the browser with the layouts of /plot_layouts,
+    or with format=figure the whole Plotly figure as graphJSON.
+
+    With summary=1 only each school's quartiles, whiskers and outliers are sent
+    instead of every instructor's value.
     """
     school_names = request.args.getlist("schools[]")
     department = request.args.get("department")
     metric = request.args.get("metric")
+    summary = request.args.get("summary", "0").lower() in ("1", "true")
+    plot_format = request.args.get("format", "compact")
 
     if not school_names or not department or not metric:
         return jsonify({"error": "Missing parameters"}), 400
+    if metric not in METRICS:
+        return jsonify({"error": f"Unknown metric {metric}"}), 400
+    if plot_format not in PLOT_FORMATS:
+        return jsonify({"error": f"Unknown format {plot_format}"}), 400
+
+    df = query_backend.metric_values(school_names, department, metric)
+    if plot_format == "figure":
+        graph_json = box_plot_json(school_names, department, metric, df, summary)
+        payload = None if graph_json is None else {"graphJSON": graph_json}
+    else:
+        payload = box_plot_data(school_names, department, metric, df, summary)
 
-    box_data = []
-    with db.engine.connect() as conn:
-        for school in school_names:
-            result = conn.execute(
-                text(
-                    f"""
-                    SELECT i.{metric}
-                    FROM Instructors i
-                    JOIN Departments d ON i.department_id = d.department_id
-                    JOIN Schools s ON i.school_id = s.school_id
-                    WHERE s.school_name = :school AND d.department_name = :dept AND i.{metric} IS NOT NULL
-                """
-                ),
-                {"school": school, "dept": department},
-            )
-            values = [row[0] for row in result]
-            if values:
-                box_data.append(
-                    go.Box(
-                        x=values,
-                        name=school,
-                        boxpoints="outliers",
-                        marker_color="#FF9149",
-                        orientation="h",
-                        hoverinfo="x",
-                    )
-                )
-
-    if not box_data:
+    if payload is None:
         return jsonify({"error": "No data found"}), 404
 
-    if metric != "retake_percent":
-        ticks = [1, 2, 3, 4, 5]
-        span = [1, 5]
-    else:
-        ticks = [0, 25, 50, 75, 100]
-        span = [0, 100]
+    return jsonify(payload)
 
-    metric = metric.replace("_", " ").title()
 
-    layout = go.Layout(
-        title=f"{metric} Distribution in {department} Across Schools",
-        xaxis=dict(title=metric, range=span, tickvals=ticks),
-        paper_bgcolor="#FFEDDB",
-        height=600,
-    )
-
-    fig = go.Figure(data=box_data, layout=layout)
-    return jsonify({"graphJSON": json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)})
+@app.route("/plot_layouts")
+def plot_layouts_route():
+    """
+    Returns the layouts and trace styles the browser draws the compact plot payloads with.
+    They only change with the code, so browsers keep them for an hour and then revalidate.
+    """
+    response = app.response_class(plot_layouts(), mimetype="application/json")
+    response.add_etag()
+    response.headers["Cache-Control"] = "public, max-age=3600"
+    return response.make_conditional(request)
 
 
 @app.route("/departments_for_schools")
+@cached_response(ordered=False)
 def departments_for_schools():
     """
     Returns the list of departments shared between all selected schools.
@@ -305,24 +590,195 @@ def departments_for_schools():
     if not schools:
         return jsonify([])
 
-    with db.engine.connect() as conn:
-        result = conn.execute(
-            # Finding the departments shared across all schools
-            text(
-                """
-                SELECT department_name
-                FROM Departments
-                JOIN Instructors ON Instructors.department_id = Departments.department_id
-                JOIN Schools ON Schools.school_id = Instructors.school_id
-                WHERE Schools.school_name = ANY(:schools)
-                GROUP BY department_name
-                HAVING COUNT(DISTINCT Schools.school_name) = :num_schools
-                """
+    return jsonify(query_backend.shared_departments(schools))
+
+
+@app.route("/department_leaderboard")
+@cached_response(all_schools=True)
+def department_leaderboard():
+    """
+    Ranks every school by a department's rating weighted average of a metric,
+    highest first or lowest first with order=asc (i.e. the easiest departments).
+    Schools need at least min_reviews ratings in the department to be ranked.
+    Paginated with page and per_page, schools with the same average share a rank.
+    """
+    department = request.args.get("department")
+    metric = request.args.get("metric", "quality")
+    order = request.args.get("order", "desc")
+
+    if not department:
+        return jsonify({"error": "Missing department parameter"}), 400
+    if metric not in METRICS:
+        return jsonify({"error": f"Unknown metric {metric}"}), 400
+    if order not in LEADERBOARD_ORDERS:
+        return jsonify({"error": "order must be asc or desc"}), 400
+    try:
+        min_reviews = int(request.args.get("min_reviews", LEADERBOARD_MIN_REVIEWS))
+    except ValueError:
+        return jsonify({"error": "min_reviews must be a number"}), 400
+    try:
+        page, per_page = page_params(
+            request.args.get("page", 1),
+            request.args.get("per_page", LEADERBOARD_PAGE_SIZE),
+        )
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+
+    total, rows = query_backend.department_leaderboard(
+        department, metric, min_reviews, order == "asc", per_page, (page - 1) * per_page
+    )
+    if not total:
+        return jsonify({"error": "No data found"}), 404
+    return jsonify(
+        leaderboard_data(
+            department, metric, order, min_reviews, page, per_page, total, rows
+        )
+    )
+
+
+@app.route("/instructor_percentile")
+@cached_response(all_schools=True)
+def instructor_percentile():
+    """
+    Returns where an instructor sits in their department nationally:
+    for each metric the percentage of the department's other instructors (at every school,
+    with at least min_reviews ratings) with a lower value.
+    Every instructor of the school with the name is returned, narrowed down with department.
+    """
+    school_name = request.args.get("school_name")
+    instructor = request.args.get("instructor")
+    department = request.args.get("department")
+
+    if not school_name or not instructor:
+        return jsonify({"error": "Missing parameters"}), 400
+    try:
+        min_reviews = int(request.args.get("min_reviews", 0))
+    except ValueError:
+        return jsonify({"error": "min_reviews must be a number"}), 400
+
+    rows = query_backend.instructor_percentiles(
+        school_name, instructor, department, min_reviews
+    )
+    if not rows:
+        return jsonify({"error": "No instructor found"}), 404
+    return jsonify(percentile_data(school_name, instructor, rows))
+
+
+@app.route("/department_names")
+@cached_response(all_schools=True)
+def department_names():
+    """
+    Returns every department with instructors at some school, sorted alphabetically.
+    """
+    return jsonify(query_backend.department_names())
+
+
+@app.route("/export")
+def export():
+    """
+    Streams the instructors matching the filters (see ExportQuery.from_args)
+    as CSV, Parquet or Arrow IPC, with format= and compression= (see EXPORT_FORMATS).
+    Rows are read from Postgres with a server-side cursor and sent a chunk at a time.
+
+    The ETag covers the filters, the format and the data version, so downloads
+    stopped part way can be resumed with Range and If-Range once the export is spooled.
+    """
+    if query_backend.read_only:
+        return (
+            jsonify(
+                {"error": "Exports are read from Postgres, not the parquet dataset"}
             ),
-            {"schools": schools, "num_schools": len(schools)},
+            503,
+        )
+    try:
+        export_query = ExportQuery.from_args(request.args)
+        export_format = ExportFormat(
+            request.args.get("format", "csv"), request.args.get("compression")
+        )
+    except ExportError as error:
+        return jsonify({"error": str(error)}), 400
+
+    with pool_monitor.connect() as connection:
+        etag = export_etag(export_query, export_format, data_version(connection))
+    name = f"{etag}{export_format.extension}"
+    rows = stream_export(
+        pool_monitor.connect,
+        export_query,
+        export_format,
+        app.config["EXPORT_CHUNK_ROWS"],
+    )
+    path = export_spool.get(name)
+    # Only a Range whose If-Range is this export's ETag resumes a download, anything else
+    # (no If-Range or a date, which can't tell exports apart) gets the whole export
+    resuming = request.range is not None and request.if_range.etag == etag
+    # Resuming a download the spool doesn't have (yet) builds it first
+    if path is None and resuming:
+        path = export_spool.build(name, rows)
+    if path is not None:
+        rows.close()
+        response = send_file(
+            path,
+            mimetype=export_format.mimetype,
+            as_attachment=True,
+            download_name=export_format.filename,
+            etag=etag,
+            conditional=resuming,
+        )
+        if not resuming:
+            response.headers["Accept-Ranges"] = "bytes"
+            response = response.make_conditional(request)
+        return response
+
+    response = app.response_class(
+        export_spool.write(name, rows), mimetype=export_format.mimetype
+    )
+    response.set_etag(etag)
+    response.headers["Accept-Ranges"] = "bytes"
+    response.headers["Content-Disposition"] = (
+        f"attachment; filename={export_format.filename}"
+    )
+    return response.make_conditional(request)
+
+
+@app.route("/cache_stats")
+def cache_stats():
+    """
+    Returns the hit and miss counters of the plot response cache and the autocomplete cache.
+    """
+    autocomplete_info = search_index.cache_info()
+    return jsonify(
+        {
+            "responses": response_cache.info(),
+            "autocomplete": {
+                "hits": autocomplete_info.hits,
+                "misses": autocomplete_info.misses,
+                "entries": autocomplete_info.currsize,
+                "max_entries": autocomplete_info.maxsize,
+            },
+        }
+    )
+
+
+@app.route("/db_stats")
+def db_stats():
+    """
+    Returns the connection pool's size, connections in use and checkout wait times.
+    """
+    return jsonify(
+        dict(
+            pool_monitor.stats(),
+            max_overflow=app.config["SQLALCHEMY_ENGINE_OPTIONS"]["max_overflow"],
         )
-        departments = sorted({row[0] for row in result})
-    return jsonify(departments)
+    )
+
+
+@app.route("/metrics")
+def metrics():
+    """
+    Returns this process' pipeline, request, query, pool and cache metrics
+    in the Prometheus text format. Every worker process keeps its own.
+    """
+    return app.response_class(REGISTRY.render(), content_type=CONTENT_TYPE)
 
 
 @app.route("/comparison")
@@ -330,6 +786,11 @@ def comparison():
     return render_template("comparison.html")
 
 
+@app.route("/leaderboard")
+def leaderboard():
+    return render_template("leaderboard.html")
+
+
 @app.route("/scrape")
 def scrape_page():
     return render_template("scrape.html")
@@ -345,11 +806,132 @@ def school():
     return render_template("departments.html")
 
 
+# How the data is prepared when the server starts, see serve_with_data
+PREPARE_MODES = ("background", "wait", "skip", "only")
+# Key of the Postgres advisory lock held while the data is prepared
+PREPARE_LOCK_KEY = 0x726D70
+PREPARE_LOCK = text("SELECT pg_advisory_lock(:key)")
+PREPARE_UNLOCK = text("SELECT pg_advisory_unlock(:key)")
+# Advisory locks on a bigint key are listed with its low 32 bits as objid and objsubid 1
+PREPARE_LOCK_HELD = text(
+    """
+    SELECT EXISTS (
+        SELECT 1 FROM pg_locks
+        WHERE locktype = 'advisory' AND granted AND classid = 0 AND objid = :key
+            AND objsubid = 1
+            AND database = (SELECT oid FROM pg_database WHERE datname = current_database())
+    )
+    """
+)
+
+
+def prepare_data() -> None:
+    """
+    Gets the query backend's data ready, shared with the ASGI server (asgi.py)
+    The parquet backend only needs the dataset, built from the parquet files if missing
+    The database is created, migrated and seeded when needed
+    Run in the background while serving, before it, or on its own (see --prepare)
+    """
+    if query_backend.read_only:
+        if not app.config["DATASET_PATH"].exists():
+            from src.dataset import consolidate_dataset
+
+            consolidate_dataset(dataset_path=app.config["DATASET_PATH"])
+        return
+    from sqlalchemy_utils import create_database, database_exists
+    from src.seeding import Seeding
+
+    # Checked with a short-lived engine of its own that sqlalchemy_utils disposes of
+    if not database_exists(app.config["SQLALCHEMY_DATABASE_URI"]):
+        try:
+            create_database(app.config["SQLALCHEMY_DATABASE_URI"])
+        # Unless another process starting at the same time created it first
+        except DBAPIError:
+            if not database_exists(app.config["SQLALCHEMY_DATABASE_URI"]):
+                raise
+    # Held on a connection of its own until the data is ready, so processes started together
+    # prepare it once and report they aren't ready meanwhile (see data_prepared)
+    with pool_monitor.engine.connect() as lock_connection:
+        lock_connection.execute(PREPARE_LOCK, {"key": PREPARE_LOCK_KEY})
+        try:
+            # Check if the database needs to be initialized or not
+            if initialize_database(app):
+                with Seeding(pool_monitor.engine.connect()) as seeding:
+                    seeding.initialize_school_names()
+                    seeding.seed_existing_data()
+        finally:
+            lock_connection.execute(PREPARE_UNLOCK, {"key": PREPARE_LOCK_KEY})
+
+
+def data_prepared() -> bool:
+    """
+    Returns whether the query backend's data is ready, prepared by this process or another:
+    the dataset exists, or the database has its tables and isn't being prepared.
+    """
+    if query_backend.read_only:
+        return app.config["DATASET_PATH"].exists()
+    with pool_monitor.connect() as connection:
+        if not connection.dialect.has_table(connection, "schools"):
+            return False
+        return not connection.execute(
+            PREPARE_LOCK_HELD, {"key": PREPARE_LOCK_KEY}
+        ).scalar()
+
+
+def reload_prepared_data() -> None:
+    # The autocomplete index and cached responses may have been loaded
+    # while the data was being prepared
+    search_index.mark_scraped(query_backend.scraped_school_ids())
+    response_cache.clear()
+    # Builds the autocomplete index now rather than on the first search
+    search_index.search("", 1, True)
+
+
+readiness = Readiness(data_prepared, on_ready=reload_prepared_data)
+
+
+@app.route("/ready")
+def ready():
+    """
+    Returns 200 once the query backend's data is ready (see prepare_data) and 503 until then,
+    for load balancers and container health checks to hold traffic back.
+    Routes are served meanwhile, from whatever is prepared so far.
+    """
+    state = readiness.check()
+    return jsonify(state), 200 if state["status"] == "ready" else 503
+
+
+def serve_with_data(prepare: str, serve) -> None:
+    """
+    Calls serve() once the data is being prepared as asked:
+    "background" in a thread while serving, "wait" before serving,
+    "skip" leaves it to another process and "only" prepares the data without serving.
+    """
+    if prepare == "background":
+        readiness.start(prepare_data)
+    elif prepare in ("wait", "only"):
+        readiness.run(prepare_data)
+    if prepare != "only":
+        serve()
+
+
+def add_serving_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--prepare",
+        choices=PREPARE_MODES,
+        default="background",
+        help="Prepare the data in the background while serving (default), before serving, "
+        "not at all (another process does) or only prepare it and exit",
+    )
+    parser.add_argument(
+        "--read-only", action="store_true", help="Serve the dashboards without scraping"
+    )
+
+
 if __name__ == "__main__":
-    # Check if the database needs to be initialized or not
-    if initialize_database(app):
-        with app.app_context():
-            seeding = Seeding(db.engine.connect())
-            seeding.initialize_school_names()
-            seeding.seed_existing_data()
-    app.run(debug=False, port=8080)
+    parser = argparse.ArgumentParser(description="Serve the dashboard with Flask.")
+    parser.add_argument("--port", type=int, default=8080)
+    add_serving_arguments(parser)
+    args = parser.parse_args()
+    app.config["READ_ONLY"] = app.config["READ_ONLY"] or args.read_only
+    serve_with_data(args.prepare, lambda: app.run(debug=False, port=args.port))
@@ -0,0 +1,420 @@
+"""
+ASGI server of the dashboard, for production serving with several worker processes.
+
+The plot, department and ranking endpoints are async and query Postgres through asyncpg,
+so a slow query only holds up its own request. Their responses, cache and ETags
+are the same as the Flask app's. Every other route (the pages, static files,
+scrape jobs, /ready and /metrics) is passed on to the Flask app in app.py.
+Both record their latency in the process' metrics.
+
+The server starts answering right away while the data is prepared in the background,
+/ready answers 503 until it is (see --prepare). --read-only turns scraping off.
+Scrape jobs live in the process that queued them, so the scrape routes answer 503
+unless the app is known to run in a single worker (--workers 1 or RMP_SINGLE_WORKER=1).
+
+    uv run python asgi.py --workers 4 --port 8080
+    RMP_READ_ONLY=1 uv run uvicorn asgi:app --workers 4 --port 8080
+    RMP_SINGLE_WORKER=1 uv run uvicorn asgi:app --port 8080
+"""
+
+import argparse
+import contextlib
+import os
+import threading
+import time
+import anyio
+import uvicorn
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+from src.backends import METRICS, create_async_backend
+from src.cache import ALL_SCHOOLS, request_key, requested_school_ids
+from src.metrics import REQUEST_SECONDS, current_route, instrument_engine
+from src.plots import (
+    PLOT_FORMATS,
+    box_plot_data,
+    box_plot_json,
+    department_bar_data,
+    department_bar_json,
+)
+from src.rankings import (
+    LEADERBOARD_MIN_REVIEWS,
+    LEADERBOARD_ORDERS,
+    LEADERBOARD_PAGE_SIZE,
+    leaderboard_data,
+    page_params,
+    percentile_data,
+)
+from app import (
+    add_serving_arguments,
+    app as flask_app,
+    readiness,
+    response_cache,
+    search_index,
+    serve_with_data,
+)
+
+# Set when the app is served by a single worker process, which can run scrape jobs.
+# Nothing tells the app how many workers uvicorn started, so it's off unless said so
+SINGLE_WORKER = os.environ.get("RMP_SINGLE_WORKER", "0") == "1"
+
+# Threads building figures at once, more only compete with the event loop for the GIL
+figure_threads = anyio.CapacityLimiter(int(os.environ.get("RMP_FIGURE_THREADS", 2)))
+
+async_backend = create_async_backend(
+    flask_app.config["QUERY_BACKEND"],
+    database_url=flask_app.config["SQLALCHEMY_DATABASE_URI"],
+    engine_options=flask_app.config["SQLALCHEMY_ENGINE_OPTIONS"],
+    dataset_path=flask_app.config["DATASET_PATH"],
+)
+# Statements of the asyncpg engine are timed like the Flask app's
+if hasattr(async_backend, "engine"):
+    instrument_engine(async_backend.engine.sync_engine)
+
+
+def json_response(obj, status: int = 200) -> Response:
+    # Serialized by Flask's JSON provider so bodies (and ETags) match the Flask app's
+    body = flask_app.json.response(obj).get_data()
+    return Response(body, status_code=status, media_type="application/json")
+
+
+def cached_response(ordered=True, all_schools=False):
+    """
+    Caches an async JSON endpoint's responses in the process' response cache,
+    like the Flask app's cached_response. Views return (object, status).
+    """
+
+    def decorator(view):
+        async def wrapper(request):
+            params = request.query_params
+            key = request_key(
+                request.url.path,
+                ((name, params.getlist(name)) for name in params),
+                ordered,
+            )
+            entry = response_cache.get(key)
+            if entry is None:
+                if all_schools:
+                    versions = response_cache.versions([ALL_SCHOOLS])
+                else:
+                    school_names = params.getlist("schools[]")
+                    school_names.append(params.get("school_name"))
+                    versions = response_cache.versions(
+                        requested_school_ids(school_names)
+                    )
+                obj, status = await view(request)
+                response = json_response(obj, status)
+                # Errors other than missing data are never cached
+                if status not in (200, 404):
+                    return response
+                entry = response_cache.set(key, response.body, status, versions)
+            headers = {"ETag": f'"{entry.etag}"', "Cache-Control": "no-cache"}
+            if_none_match = request.headers.get("if-none-match", "")
+            tags = {
+                tag.strip().removeprefix("W/").strip('"')
+                for tag in if_none_match.split(",")
+            }
+            if entry.etag in tags or "*" in tags:
+                return Response(status_code=304, headers=headers)
+            return Response(
+                entry.body,
+                status_code=entry.status,
+                media_type="application/json",
+                headers=headers,
+            )
+
+        return wrapper
+
+    return decorator
+
+
+@cached_response()
+async def school_plot(request):
+    """
+    Async /school_plot, the bar plot of a school's department averages.
+    """
+    params = request.query_params
+    school_name = params.get("school_name", "")
+    minReviews = params.get("min_reviews", 1000)
+    metric = params.get("metric", "difficulty")
+    plot_format = params.get("format", "compact")
+
+    if not school_name:
+        return {"error": "Missing school_name parameter"}, 400
+    if metric not in METRICS:
+        return {"error": f"Unknown metric {metric}"}, 400
+    if plot_format not in PLOT_FORMATS:
+        return {"error": f"Unknown format {plot_format}"}, 400
+    try:
+        minReviews = int(minReviews)
+    except ValueError:
+        return {"error": "min_reviews must be a number"}, 400
+
+    data = await async_backend.department_averages(school_name, metric, minReviews)
+    if not data:
+        return {"error": "No data found"}, 404
+    if plot_format == "compact":
+        return department_bar_data(school_name, metric, data), 200
+    # Building the figure is CPU bound, so it runs off the event loop
+    graph_json = await anyio.to_thread.run_sync(
+        department_bar_json, school_name, metric, data, limiter=figure_threads
+    )
+    return {"graphJSON": graph_json}, 200
+
+
+@cached_response()
+async def box_plot(request):
+    """
+    Async /box_plot, the distribution of a metric in a department across schools.
+    """
+    params = request.query_params
+    school_names = params.getlist("schools[]")
+    department = params.get("department")
+    metric = params.get("metric")
+    summary = params.get("summary", "0").lower() in ("1", "true")
+    plot_format = params.get("format", "compact")
+
+    if not school_names or not department or not metric:
+        return {"error": "Missing parameters"}, 400
+    if metric not in METRICS:
+        return {"error": f"Unknown metric {metric}"}, 400
+    if plot_format not in PLOT_FORMATS:
+        return {"error": f"Unknown format {plot_format}"}, 400
+
+    df = await async_backend.metric_values(school_names, department, metric)
+    if plot_format == "figure":
+        graph_json = await anyio.to_thread.run_sync(
+            box_plot_json,
+            school_names,
+            department,
+            metric,
+            df,
+            summary,
+            limiter=figure_threads,
+        )
+        payload = None if graph_json is None else {"graphJSON": graph_json}
+    else:
+        # The box statistics are computed by Polars, which releases the GIL
+        payload = await anyio.to_thread.run_sync(
+            box_plot_data,
+            school_names,
+            department,
+            metric,
+            df,
+            summary,
+            limiter=figure_threads,
+        )
+    if payload is None:
+        return {"error": "No data found"}, 404
+    return payload, 200
+
+
+@cached_response(ordered=False)
+async def departments_for_schools(request):
+    """
+    Async /departments_for_schools, the departments shared between all selected schools.
+    """
+    schools = request.query_params.getlist("schools[]")
+    if not schools:
+        return [], 200
+    return await async_backend.shared_departments(schools), 200
+
+
+@cached_response(all_schools=True)
+async def department_leaderboard(request):
+    """
+    Async /department_leaderboard, schools ranked by a department's average.
+    """
+    params = request.query_params
+    department = params.get("department")
+    metric = params.get("metric", "quality")
+    order = params.get("order", "desc")
+
+    if not department:
+        return {"error": "Missing department parameter"}, 400
+    if metric not in METRICS:
+        return {"error": f"Unknown metric {metric}"}, 400
+    if order not in LEADERBOARD_ORDERS:
+        return {"error": "order must be asc or desc"}, 400
+    try:
+        min_reviews = int(params.get("min_reviews", LEADERBOARD_MIN_REVIEWS))
+    except ValueError:
+        return {"error": "min_reviews must be a number"}, 400
+    try:
+        page, per_page = page_params(
+            params.get("page", 1), params.get("per_page", LEADERBOARD_PAGE_SIZE)
+        )
+    except ValueError as error:
+        return {"error": str(error)}, 400
+
+    total, rows = await async_backend.department_leaderboard(
+        department, metric, min_reviews, order == "asc", per_page, (page - 1) * per_page
+    )
+    if not total:
+        return {"error": "No data found"}, 404
+    return (
+        leaderboard_data(
+            department, metric, order, min_reviews, page, per_page, total, rows
+        ),
+        200,
+    )
+
+
+@cached_response(all_schools=True)
+async def instructor_percentile(request):
+    """
+    Async /instructor_percentile, where an instructor sits in their department nationally.
+    """
+    params = request.query_params
+    school_name = params.get("school_name")
+    instructor = params.get("instructor")
+    department = params.get("department")
+
+    if not school_name or not instructor:
+        return {"error": "Missing parameters"}, 400
+    try:
+        min_reviews = int(params.get("min_reviews", 0))
+    except ValueError:
+        return {"error": "min_reviews must be a number"}, 400
+
+    rows = await async_backend.instructor_percentiles(
+        school_name, instructor, department, min_reviews
+    )
+    if not rows:
+        return {"error": "No instructor found"}, 404
+    return percentile_data(school_name, instructor, rows), 200
+
+
+@cached_response(all_schools=True)
+async def department_names(request):
+    return await async_backend.department_names(), 200
+
+
+async def autocomplete(request):
+    # The search index is in memory, so searching doesn't need a thread
+    term = request.query_params.get("term", "")
+    return json_response(search_index.search(term, limit=10, scraped=True))
+
+
+async def autocomplete_unscraped(request):
+    term = request.query_params.get("term", "")
+    return json_response(search_index.search(term, limit=10, scraped=False))
+
+
+async def single_worker_only(request):
+    # Scrape jobs live in the process that queued them, so with several workers
+    # polling their status could reach a process that doesn't know the job
+    return json_response(
+        {
+            "error": "Scraping needs a single worker, run asgi.py with --workers 1 "
+            "(or set RMP_SINGLE_WORKER=1) or app.py"
+        },
+        503,
+    )
+
+
+def timed_route(path: str, endpoint, **options) -> Route:
+    """
+    Returns the route of an async endpoint timed into the request histogram,
+    with its path as the route label of the queries it runs.
+    Requests passed on to the Flask app are timed by the Flask app's own hooks.
+    """
+
+    async def view(request):
+        token = current_route.set(path)
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await endpoint(request)
+            status = response.status_code
+            return response
+        finally:
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                route=path,
+                method=request.method,
+                status=status,
+            )
+            current_route.reset(token)
+
+    return Route(path, view, **options)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # The scraped schools are loaded and the autocomplete index built once the data is ready
+    # (see app.reload_prepared_data), checked in the background so requests are served meanwhile
+    threading.Thread(
+        target=readiness.check, name="readiness-check", daemon=True
+    ).start()
+    yield
+    await async_backend.close()
+
+
+def create_app(single_worker: bool = SINGLE_WORKER) -> Starlette:
+    """
+    Returns the ASGI app. Unless it runs in a single worker, the scrape routes
+    answer 503 instead of queueing jobs only their own process knows about.
+    """
+    routes = [
+        timed_route("/school_plot", school_plot),
+        timed_route("/box_plot", box_plot),
+        timed_route("/departments_for_schools", departments_for_schools),
+        timed_route("/department_leaderboard", department_leaderboard),
+        timed_route("/instructor_percentile", instructor_percentile),
+        timed_route("/department_names", department_names),
+        timed_route("/autocomplete", autocomplete),
+        timed_route("/autocomplete-unscraped", autocomplete_unscraped),
+    ]
+    if not single_worker:
+        routes += [
+            timed_route("/scrape_school", single_worker_only, methods=["POST"]),
+            timed_route("/refresh_stale", single_worker_only, methods=["POST"]),
+        ]
+    # Pages, static files and the remaining JSON routes are served by the Flask app
+    # in a thread pool
+    routes.append(Mount("/", WSGIMiddleware(flask_app)))
+    return Starlette(routes=routes, lifespan=lifespan)
+
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serve the dashboard with uvicorn workers."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=min(4, os.cpu_count() or 1),
+        help="Worker processes, each with its own connection pools and caches",
+    )
+    add_serving_arguments(parser)
+    args = parser.parse_args()
+
+    # Workers import this module again and read their settings back from the environment
+    if args.workers > 1:
+        os.environ["RMP_SINGLE_WORKER"] = "0"
+    if args.read_only:
+        os.environ["RMP_READ_ONLY"] = "1"
+        flask_app.config["READ_ONLY"] = True
+    # The data is prepared once here rather than by every worker,
+    # which find out it's ready through the database (see app.data_prepared)
+    serve_with_data(
+        args.prepare,
+        lambda: uvicorn.run(
+            # A single worker serves an app of this module rather than importing it again,
+            # and is the only process that can run scrape jobs
+            "asgi:app" if args.workers > 1 else create_app(single_worker=True),
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            # The dashboard has no websockets, so their protocol isn't imported
+            ws="none",
+            log_level="warning",
+        ),
+    )
@@ -0,0 +1,52 @@
+"""
+Benchmarks the GraphQL API scraper against a local stub server.
+
+Reports professors/sec and round trips next to the "Show More" clicks
+the Selenium scraper needs for the same schools.
+Parity with the teacher cards and retries are tested in tests/test_api_scraper.py.
+
+Usage:
+    python -m benchmarks.api_scraper --professors 4000 --latency 0.05
+"""
+
+import argparse
+import time
+from benchmarks.rmp_stub import StubServer, synthetic_nodes
+from src.api_scraper import ApiScraper
+
+
+def run(num_professors: int, num_schools: int, page_size: int, latency: float) -> None:
+    schools = {
+        school_id: synthetic_nodes(num_professors, f"School {school_id}", school_id)
+        for school_id in range(1, num_schools + 1)
+    }
+    with StubServer(schools, latency=latency) as stub:
+        scraper = ApiScraper(stub.url, page_size=page_size)
+        start = time.perf_counter()
+        results = scraper.scrape_schools(list(schools))
+        elapsed = time.perf_counter() - start
+        requests = stub.requests
+
+    rows = sum(df.height for df in results.values())
+    clicks = num_schools * ((num_professors + 7) // 8)
+    print(
+        f"{num_schools} schools x {num_professors} professors, page size {page_size}, "
+        f"{latency * 1000:.0f} ms latency"
+    )
+    print(
+        f"  API scraper: {rows} professors in {elapsed:.2f}s ({rows / elapsed:.0f}/sec)"
+    )
+    print(
+        f"  Round trips: {requests} requests vs {clicks} Show More clicks with Selenium"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--professors", type=int, default=4000)
+    parser.add_argument("--schools", type=int, default=8)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    run(args.professors, args.schools, args.page_size, args.latency)
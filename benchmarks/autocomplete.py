@@ -0,0 +1,65 @@
+"""
+Measures the latency of the in-process school search index behind /autocomplete.
+
+Runs every two to six character prefix and infix of random school names through
+the index, first uncached and then again from the response cache,
+and reports p50/p99 latency in milliseconds.
+
+Usage:
+    python -m benchmarks.autocomplete
+"""
+
+import random
+import statistics
+import time
+from src.schools import get_school_registry
+from src.search import SchoolSearchIndex
+
+
+def terms(count: int, seed: int = 0) -> list:
+    """
+    Returns search terms cut from random school names, like a user typing.
+    """
+    rng = random.Random(seed)
+    names = list(get_school_registry().names().values())
+    result = []
+    for _ in range(count):
+        name = rng.choice(names)
+        start = rng.choice([0, 0, rng.randrange(max(len(name) - 2, 1))])
+        result.append(name[start : start + rng.randint(2, 6)])
+    return result
+
+
+def measure(index: SchoolSearchIndex, search_terms: list, scraped) -> list:
+    timings = []
+    for term in search_terms:
+        start = time.perf_counter()
+        index.search(term, limit=10, scraped=scraped)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label: str, timings: list) -> None:
+    quantiles = statistics.quantiles(timings, n=100)
+    print(
+        f"{label:<10}{quantiles[49]:>10.3f}{quantiles[98]:>10.3f}{max(timings):>10.3f}"
+    )
+
+
+def main() -> None:
+    rng = random.Random(1)
+    names = get_school_registry().names()
+    # Roughly a third of the schools are treated as scraped
+    scraped = [int(key) for key in names if rng.random() < 0.3]
+    index = SchoolSearchIndex(get_school_registry(), lambda: scraped, cache_size=4096)
+    search_terms = terms(2000)
+    # Builds the trigram index and loads the scraped set before timing
+    index.search("warm up", scraped=False)
+
+    print(f"{'':<10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    report("uncached", measure(index, search_terms, scraped=False))
+    report("cached", measure(index, search_terms, scraped=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Cold start of the web process, its import time and time to the first request.
+
+Imports app and asgi in fresh interpreters and lists the heaviest modules app imports
+(python -X importtime). None of the scraping and seeding dependencies may be among them.
+
+Then starts the Flask server (python app.py) and the ASGI server (python asgi.py
+--workers 1) with the data prepared in the background, and times from the process
+starting to the first answer of /ready, the first uncached /department_names
+and /ready reporting the data ready. Fails when a server takes longer than --budget
+seconds to answer /department_names.
+
+Usage:
+    python -m benchmarks.cold_start --database-url postgresql:///rmp_bench_1x
+    python -m benchmarks.cold_start --query-backend parquet --dataset-path data/dataset
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+# Modules only scraping and seeding need, the web process shouldn't import them
+INGESTION_MODULES = (
+    "selenium",
+    "webdriver_manager",
+    "bs4",
+    "httpx",
+    "sqlalchemy_utils",
+    "src.scraping",
+    "src.scrape_jobs",
+    "src.api_scraper",
+    "src.refresh",
+    "src.seeding",
+)
+# Seconds between polls of a starting server
+POLL_INTERVAL = 0.005
+# Seconds a server gets to report its data ready
+READY_TIMEOUT = 300
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+print(json.dumps([time.perf_counter() - start, sorted(sys.modules)]))
+"""
+
+
+def import_run(module: str, env: dict, importtime: bool = False) -> tuple:
+    """
+    Imports a module in a fresh interpreter. Returns the seconds it took,
+    the modules loaded and the python -X importtime report.
+    """
+    options = ["-X", "importtime"] if importtime else []
+    process = subprocess.run(
+        [sys.executable, *options, "-c", IMPORT_SCRIPT.format(module=module)],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    seconds, modules = json.loads(process.stdout.splitlines()[-1])
+    return seconds, modules, process.stderr
+
+
+def heaviest_imports(report: str, module: str, count: int) -> list:
+    """
+    Returns the (name, seconds) of the modules imported by module itself that took longest,
+    from a python -X importtime report. Modules are listed after the ones they import.
+    """
+    children = []
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            if name.strip() == module:
+                break
+            children = []
+        elif depth == 1:
+            children.append((name.strip(), int(cumulative) / 1e6))
+    return sorted(children, key=lambda child: -child[1])[:count]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get(url: str) -> int:
+    """
+    Returns the status of a GET request, or None when nothing answers yet.
+    """
+    try:
+        with urllib.request.urlopen(url, timeout=READY_TIMEOUT) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+    except (urllib.error.URLError, ConnectionError):
+        return None
+
+
+def time_server(command: list, port: int, env: dict) -> dict:
+    """
+    Starts a server and returns the seconds to its first answer of /ready,
+    its first /department_names and /ready answering 200.
+    """
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        timings = {}
+        while get(f"{base}/ready") is None:
+            if process.poll() is not None:
+                raise RuntimeError(
+                    f"{' '.join(command)} exited with {process.returncode}"
+                )
+            time.sleep(POLL_INTERVAL)
+        timings["first response"] = time.perf_counter() - start
+        status = get(f"{base}/department_names")
+        timings["first data"] = time.perf_counter() - start
+        if status != 200:
+            raise RuntimeError(f"/department_names answered {status}")
+        while get(f"{base}/ready") != 200:
+            if time.perf_counter() - start > READY_TIMEOUT:
+                raise RuntimeError(f"Not ready after {READY_TIMEOUT} seconds")
+            time.sleep(POLL_INTERVAL)
+        timings["ready"] = time.perf_counter() - start
+        return timings
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default="postgresql:///rmp_bench_1x")
+    parser.add_argument("--query-backend", default="postgres")
+    parser.add_argument("--dataset-path", type=Path)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--budget", type=float, default=1.0, help="Seconds to the first data"
+    )
+    args = parser.parse_args(argv)
+
+    env = dict(
+        os.environ,
+        RMP_DATABASE_URL=args.database_url,
+        RMP_QUERY_BACKEND=args.query_backend,
+    )
+    if args.dataset_path:
+        env["RMP_DATASET_PATH"] = str(args.dataset_path.resolve())
+
+    print(f"{'import':<12}{'median s':>10}")
+    loaded = set()
+    for module in ("app", "asgi"):
+        runs = [import_run(module, env) for _ in range(args.repeats)]
+        loaded.update(runs[0][1])
+        print(
+            f"{module:<12}{statistics.median(seconds for seconds, _, _ in runs):>10.3f}"
+        )
+    _, _, report = import_run("app", env, importtime=True)
+    print("Heaviest imports of app:")
+    for name, seconds in heaviest_imports(report, "app", 8):
+        print(f"  {name:<28}{seconds:>8.3f} s")
+    ingestion = sorted(
+        name
+        for name in loaded
+        if name in INGESTION_MODULES or name.split(".")[0] in INGESTION_MODULES
+    )
+    print(f"Ingestion modules imported: {', '.join(ingestion) or 'none'}")
+
+    servers = {
+        "app.py": [sys.executable, "app.py", "--port", "{port}"],
+        "asgi.py": [sys.executable, "asgi.py", "--workers", "1", "--port", "{port}"],
+    }
+    print(f"{'server':<12}{'first response s':>18}{'first data s':>14}{'ready s':>10}")
+    over_budget = 0
+    for name, command in servers.items():
+        runs = []
+        for _ in range(args.repeats):
+            port = free_port()
+            runs.append(
+                time_server([part.format(port=port) for part in command], port, env)
+            )
+        medians = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        over_budget += medians["first data"] > args.budget
+        print(
+            f"{name:<12}{medians['first response']:>18.3f}{medians['first data']:>14.3f}"
+            f"{medians['ready']:>10.3f}"
+        )
+    print(f"Servers over the {args.budget:g} s budget: {over_budget}")
+    if ingestion or over_budget:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Helpers shared by the benchmarks: latency percentiles and the Postgres vs parquet
+backend comparisons.
+"""
+
+from sqlalchemy import create_engine
+from src.backends import ParquetBackend, PostgresBackend
+
+
+def percentile(values: list, quantile: float) -> float:
+    """
+    Returns the value below which the quantile share of the values fall (i.e. 0.99 for p99).
+    """
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * quantile))]
+
+
+def backend_pair(database_url: str, dataset_path: str) -> tuple:
+    """
+    Returns the Postgres backend of a database and the parquet backend of its dataset.
+    """
+    return PostgresBackend(create_engine(database_url).connect), ParquetBackend(
+        dataset_path
+    )
+
+
+def same_leaderboard(postgres, parquet, *args) -> bool:
+    """
+    Whether both backends rank a department_leaderboard(*args) the same.
+    Postgres averages are Decimals, compared as the floats parquet gives.
+    """
+    total, rows = postgres.department_leaderboard(*args)
+    rows = [
+        (rank, school, None if average is None else float(average), ratings, count)
+        for rank, school, average, ratings, count in rows
+    ]
+    return (total, rows) == parquet.department_leaderboard(*args)
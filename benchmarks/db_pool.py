@@ -0,0 +1,145 @@
+"""
+Load test of the database connection pool.
+
+Many threads request uncached /school_plot and /box_plot responses at once,
+while the connections in use and the server's open connections are sampled.
+Checks that checkouts never go past pool_size + max_overflow and that the server
+is back to at most pool_size connections afterwards, then reports requests/sec,
+latency and checkout waits.
+Overflow connections closed under load can linger a moment on the server while
+their backend exits, so the peak server count is reported but not asserted.
+
+Usage:
+    python -m benchmarks.db_pool --threads 64 --requests 40 --pool-size 4 --max-overflow 2
+"""
+
+import argparse
+import os
+import random
+import threading
+import time
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+from benchmarks.common import percentile
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=40, help="Requests per thread")
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--max-overflow", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    # The pool is configured from the environment when the app is imported
+    os.environ["RMP_DB_POOL_SIZE"] = str(args.pool_size)
+    os.environ["RMP_DB_MAX_OVERFLOW"] = str(args.max_overflow)
+    import app as dashboard
+
+    client = dashboard.app.test_client()
+    limit = args.pool_size + args.max_overflow
+    registry = dashboard.get_school_registry()
+    schools = [
+        registry.name_for(school_id)
+        for school_id in sorted(dashboard.query_backend.scraped_school_ids())
+    ]
+
+    # Counts the server side connections to the database without going through the pool
+    sampler = create_engine(
+        dashboard.app.config["SQLALCHEMY_DATABASE_URI"], poolclass=NullPool
+    )
+    peaks = {"in_use": 0, "server": 0}
+    done = threading.Event()
+
+    def server_connections(connection) -> int:
+        count = connection.execute(
+            text(
+                """
+                SELECT COUNT(*) FROM pg_stat_activity
+                WHERE datname = current_database() AND pid <> pg_backend_pid()
+                """
+            )
+        ).scalar()
+        # pg_stat_activity is a snapshot taken once per transaction
+        connection.commit()
+        return count
+
+    def sample() -> None:
+        with sampler.connect() as connection:
+            while not done.is_set():
+                peaks["server"] = max(peaks["server"], server_connections(connection))
+                peaks["in_use"] = max(peaks["in_use"], dashboard.pool_monitor.in_use)
+                time.sleep(0.01)
+
+    latencies = []
+    errors = []
+
+    def work(seed: int) -> None:
+        rng = random.Random(seed)
+        for _ in range(args.requests):
+            # Random parameters so nearly every request misses the response cache
+            if rng.random() < 0.5:
+                url = (
+                    f"/school_plot?school_name={rng.choice(schools)}"
+                    f"&metric=quality&min_reviews={rng.randint(0, 10_000)}"
+                )
+            else:
+                picked = "&".join(f"schools[]={s}" for s in rng.sample(schools, 3))
+                url = f"/box_plot?{picked}&department=Mathematics&metric=difficulty&summary={rng.randint(0, 1)}"
+            start = time.perf_counter()
+            response = client.get(url)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 500:
+                errors.append(response.status_code)
+
+    sampler_thread = threading.Thread(target=sample, daemon=True)
+    sampler_thread.start()
+    workers = [threading.Thread(target=work, args=(i,)) for i in range(args.threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    sampler_thread.join()
+
+    # Give the backends of closed overflow connections a moment to exit
+    time.sleep(0.5)
+    with sampler.connect() as connection:
+        settled = server_connections(connection)
+
+    stats = dashboard.pool_monitor.stats()
+    total = args.threads * args.requests
+    print(
+        f"{args.threads} threads x {args.requests} requests, "
+        f"pool_size={args.pool_size} max_overflow={args.max_overflow}"
+    )
+    print(
+        f"  {total / elapsed:.0f} requests/sec, latency p50 {percentile(latencies, 0.5):.1f} ms "
+        f"p99 {percentile(latencies, 0.99):.1f} ms, {len(errors)} errors"
+    )
+    print(
+        f"  checkout wait p50 {stats['checkout_wait_ms_p50']} ms "
+        f"p99 {stats['checkout_wait_ms_p99']} ms, {stats['timeouts']} timeouts"
+    )
+    print(
+        f"  peak connections in use {peaks['in_use']} (monitor {stats['peak_in_use']}), "
+        f"limit {limit}"
+    )
+    print(
+        f"  server connections: peak {peaks['server']}, {settled} after the run, "
+        f"{stats['connects']} opened in total"
+    )
+    bounded = (
+        max(peaks["in_use"], stats["peak_in_use"]) <= limit
+        and settled <= args.pool_size
+        and stats["in_use"] == 0
+    )
+    print(f"Pool bounded: {'OK' if bounded else 'FAILED'}")
+    if not bounded:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Speed and effect of normalizing the scraped department names.
+
+Normalizes every department name in data/dataframes the way bulk seeding does, then
+synthetic misspellings of them (lost "&", plurals, abbreviations, typos) the way names
+new to the database are, and reports names/sec and how many misspellings found their
+department. The department names of random pairs of schools are matched by exact name
+and once normalized, i.e. what /departments_for_schools can compare.
+
+With --dataset, the Postgres and parquet backends are asked for the instructors of
+departments by their aliases, which have to give the same values.
+
+Usage:
+    python -m benchmarks.departments
+    python -m benchmarks.departments --database-url postgresql:///rmp.db --dataset data/dataset
+"""
+
+import argparse
+import random
+import time
+from pathlib import Path
+import polars as pl
+from sqlalchemy.sql import text
+from src.departments import (
+    ABBREVIATIONS,
+    FUZZY_TOKEN,
+    DepartmentNormalizer,
+    clean_department,
+    department_key,
+    department_tokens,
+)
+from benchmarks.common import backend_pair, same_leaderboard
+
+ROOT = Path(__file__).parent.parent
+# Words spelled out by ABBREVIATIONS and their shortenings, to misspell names with
+SHORTENINGS = {}
+for short, word in ABBREVIATIONS.items():
+    if " " not in word:
+        SHORTENINGS.setdefault(word.title(), []).append(short.title())
+
+
+def read_departments(data_dir: Path) -> pl.DataFrame:
+    """
+    Returns the School and Department of every instructor in the parquet files.
+    """
+    # Typed files have categories of their own, so they're joined as strings
+    frames = [
+        pl.read_parquet(file, columns=["School", "Department"]).cast(pl.String)
+        for file in sorted(data_dir.glob("*.parquet"))
+    ]
+    return pl.concat(frames, how="vertical_relaxed").drop_nulls()
+
+
+def misspell(name: str, rng: random.Random) -> str:
+    """
+    Returns a name the way RMP pages mangle them.
+    """
+    change = rng.randrange(5)
+    words = name.split()
+    if change == 0:
+        return name.replace("&", rng.choice(["amp", "", "and"]))
+    if change == 1:
+        return " ".join(rng.choice(SHORTENINGS.get(word, [word])) for word in words)
+    if change == 2 and not name.endswith("s"):
+        return name + "s"
+    if change == 3 and len(words[-1]) >= FUZZY_TOKEN:
+        # Two neighbouring letters of the last word swapped, past its first letter
+        last = words[-1]
+        i = rng.randrange(1, len(last) - 1)
+        return " ".join(words[:-1] + [last[:i] + last[i + 1] + last[i] + last[i + 2 :]])
+    return name.upper()
+
+
+def benchmark_normalization(departments: pl.DataFrame, synthetic: int) -> dict:
+    """
+    Times normalizing the real vocabulary, then misspellings of it against the
+    departments found, and returns the real vocabulary's canonical names.
+    """
+    counts = departments.group_by("Department").len()
+    names = counts.sort(["len", "Department"], descending=[True, False])[
+        "Department"
+    ].to_list()
+    # Fresh caches, as in a new process
+    for cached in (clean_department, department_tokens, department_key):
+        cached.cache_clear()
+    normalizer = DepartmentNormalizer()
+    start = time.perf_counter()
+    canonical = normalizer.assign(names)
+    elapsed = time.perf_counter() - start
+    print(f"{'vocabulary':<24}{'names':>10}{'departments':>14}{'names/sec':>12}")
+    print(
+        f"{'data/dataframes':<24}{len(names):>10}{len(set(canonical.values())):>14}"
+        f"{len(names) / elapsed:>12.0f}"
+    )
+
+    rng = random.Random(0)
+    misspelled = {}
+    for _ in range(synthetic):
+        name = rng.choice(names)
+        misspelled.setdefault(misspell(name, rng), name)
+    variants = [name for name in misspelled if name not in canonical]
+    start = time.perf_counter()
+    found = {name: normalizer.canonical(name) for name in variants}
+    elapsed = time.perf_counter() - start
+    print(
+        f"{'new misspellings':<24}{len(variants):>10}{'':>14}{len(variants) / elapsed:>12.0f}"
+    )
+    matched = sum(found[name] == canonical[misspelled[name]] for name in variants)
+    wrong = sum(
+        found[name] not in (None, canonical[misspelled[name]]) for name in variants
+    )
+    print(
+        f"Misspellings matched to their department: {matched / len(variants):.1%}, "
+        f"to another one: {wrong / len(variants):.1%}"
+    )
+    return canonical
+
+
+def shared_departments(departments: pl.DataFrame, canonical: dict, pairs: int) -> None:
+    """
+    Prints the share of a school's department names found at another random school,
+    by exact name and once normalized.
+    """
+    by_school = {
+        school: set(df["Department"])
+        for (school,), df in departments.unique()
+        .partition_by("School", as_dict=True)
+        .items()
+    }
+    rng = random.Random(1)
+    schools = sorted(by_school)
+    names = exact = normalized = 0
+    for _ in range(pairs):
+        a, b = rng.sample(schools, 2)
+        other = {canonical[name] for name in by_school[b]}
+        names += len(by_school[a])
+        exact += len(by_school[a] & by_school[b])
+        normalized += sum(canonical[name] in other for name in by_school[a])
+    print(
+        f"Department names found at another school: {exact / names:.1%} by exact name, "
+        f"{normalized / names:.1%} normalized"
+    )
+
+
+def compare_backends(database_url: str, dataset_path: str, samples: int) -> int:
+    """
+    Compares the values the Postgres and parquet backends give for departments
+    requested by random aliases. Returns the number of mismatches.
+    """
+    postgres, parquet = backend_pair(database_url, dataset_path)
+    with postgres.connect() as connection:
+        rows = connection.execute(
+            text(
+                """
+                SELECT a.alias, s.school_name
+                FROM DepartmentAliases a
+                JOIN DepartmentStats ds ON ds.department_id = a.department_id
+                JOIN Schools s ON ds.school_id = s.school_id
+                ORDER BY a.alias, s.school_name
+                """
+            )
+        ).all()
+    rng = random.Random(2)
+    mismatches = 0
+    for alias, school in rng.sample(rows, min(samples, len(rows))):
+        expected = postgres.metric_values([school], alias, "quality").sort("value")
+        mismatches += not expected.equals(
+            parquet.metric_values([school], alias, "quality").sort("value")
+        )
+        mismatches += not same_leaderboard(postgres, parquet, alias, "quality", 0)
+    print(
+        f"Postgres vs parquet values of departments by alias: {mismatches} mismatches"
+    )
+    return mismatches
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--data-dir", type=Path, default=ROOT / "data/dataframes")
+    parser.add_argument("--synthetic", type=int, default=100_000)
+    parser.add_argument("--pairs", type=int, default=10_000)
+    parser.add_argument("--database-url", default="postgresql:///rmp.db")
+    parser.add_argument(
+        "--dataset", help="Parquet dataset of the database to compare with"
+    )
+    parser.add_argument("--samples", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    departments = read_departments(args.data_dir)
+    canonical = benchmark_normalization(departments, args.synthetic)
+    shared_departments(departments, canonical, args.pairs)
+    if args.dataset and compare_backends(args.database_url, args.dataset, args.samples):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
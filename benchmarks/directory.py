@@ -0,0 +1,106 @@
+"""
+Benchmarks the school directory crawler against a local fake site
+serving the IDs and names in data/school_names.json.
+
+Runs a full crawl that is interrupted halfway and resumed from its checkpoint,
+then an incremental refresh after a school is added, renamed and removed.
+Reports the requests, time and coverage of each run.
+Resuming and the refreshed changes are tested in tests/test_directory.py.
+
+Usage:
+    python -m benchmarks.directory --latency 0.05
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from benchmarks.rmp_stub import StubServer
+from src.directory import DirectoryCrawler
+from src.schools import SCHOOL_NAMES_PATH
+
+
+class Interrupted(Exception):
+    pass
+
+
+def crawler(stub: StubServer, workdir: Path, **options) -> DirectoryCrawler:
+    return DirectoryCrawler(
+        stub.url,
+        workdir / "checkpoint.json",
+        workdir / "school_names.json",
+        rate=0,
+        backoff=0.01,
+        checkpoint_interval=0,
+        **options,
+    )
+
+
+def coverage(found: dict, directory: dict) -> str:
+    missing = [school_id for school_id in directory if str(school_id) not in found]
+    wrong = [k for k, v in found.items() if directory.get(int(k)) != v]
+    return (
+        f"{len(found) - len(wrong)}/{len(directory)} schools found, "
+        f"{len(missing)} missing ({sum(i > 6000 for i in missing)} past 6000), {len(wrong)} wrong"
+    )
+
+
+def run(latency: float, max_stride: int) -> None:
+    with open(SCHOOL_NAMES_PATH, encoding="utf-8") as f:
+        directory = {int(k): v for k, v in json.load(f).items()}
+
+    with (
+        tempfile.TemporaryDirectory() as tmp,
+        StubServer(directory=directory, latency=latency) as stub,
+    ):
+        workdir = Path(tmp)
+        options = {"max_stride": max_stride}
+
+        # Interrupts the first run halfway through the dense range
+        first = crawler(stub, workdir, **options)
+        probe_batch = first.probe_batch
+
+        async def failing_probe(client, limiter, ids):
+            if first.requests >= 60:
+                raise Interrupted()
+            return await probe_batch(client, limiter, ids)
+
+        first.probe_batch = failing_probe
+        try:
+            first.crawl()
+        except Interrupted:
+            pass
+        print(f"Interrupted crawl: {len(first.state['hits'])} schools checkpointed")
+
+        start = time.perf_counter()
+        resumed = crawler(stub, workdir, **options)
+        resumed.crawl()
+        print(
+            f"Resumed crawl: {resumed.requests} requests in {time.perf_counter() - start:.2f}s, "
+            + coverage(resumed.school_names(), directory)
+        )
+
+        directory[7999] = "Newly Listed College"
+        directory[5] = directory[5] + " (Renamed)"
+        del directory[10]
+        refresh_stub = StubServer(directory=directory, latency=latency).start()
+        try:
+            start = time.perf_counter()
+            refreshed = crawler(refresh_stub, workdir, **options)
+            changes = refreshed.crawl(refresh=True)
+        finally:
+            refresh_stub.stop()
+        print(
+            f"Refresh: {refreshed.requests} requests in {time.perf_counter() - start:.2f}s, "
+            + coverage(refreshed.school_names(), directory)
+        )
+        print(f"Refresh changes {changes}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--max-stride", type=int, default=4)
+    args = parser.parse_args()
+    run(args.latency, args.max_stride)
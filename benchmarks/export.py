@@ -0,0 +1,181 @@
+"""
+Throughput, memory and correctness of the streaming /export endpoint.
+
+Downloads every instructor in each format and compression and reports the time,
+size and the peak Python memory of serving it, streamed in chunks and with the
+whole result fetched at once. Each download is read back and compared with the
+rows of the same query fetched directly from Postgres, and a download is resumed
+part way with a Range request, which has to give the rest of the same bytes.
+
+Usage:
+    python -m benchmarks.export --chunk-rows 10000
+"""
+
+import argparse
+import shutil
+import time
+import tracemalloc
+import polars as pl
+import pyarrow as pa
+from werkzeug.datastructures import MultiDict
+from src.export import EXPORT_SCHEMA, ExportQuery
+
+# (format, compression) pairs downloaded
+DOWNLOADS = [
+    ("csv", "none"),
+    ("csv", "gzip"),
+    ("csv", "zstd"),
+    ("parquet", "none"),
+    ("parquet", "snappy"),
+    ("parquet", "zstd"),
+    ("arrow", "none"),
+    ("arrow", "lz4"),
+    ("arrow", "zstd"),
+]
+# Filters checked for parity besides the whole table
+FILTERS = MultiDict(
+    [
+        ("departments[]", "Mathematics"),
+        ("departments[]", "English"),
+        ("min_quality", "3.5"),
+        ("max_difficulty", "3"),
+        ("min_reviews", "5"),
+    ]
+)
+
+
+def download(client, path: str, headers=None) -> tuple:
+    """
+    Returns the response, body and seconds taken of a request,
+    reading the body a chunk at a time like a client would.
+    """
+    start = time.perf_counter()
+    response = client.get(path, headers=headers, buffered=False)
+    body = b"".join(response.response)
+    response.close()
+    return response, body, time.perf_counter() - start
+
+
+def peak_memory(client, path: str) -> int:
+    """
+    Returns the peak Python memory of serving a request whose chunks are dropped as they come.
+    """
+    tracemalloc.start()
+    response = client.get(path, buffered=False)
+    for _ in response.response:
+        pass
+    response.close()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def read_export(body: bytes, export_format: str, compression: str) -> pl.DataFrame:
+    if export_format == "csv":
+        if compression != "none":
+            body = pa.input_stream(pa.py_buffer(body), compression=compression).read()
+        return pl.read_csv(body, schema=EXPORT_SCHEMA)
+    if export_format == "parquet":
+        return pl.read_parquet(body)
+    return pl.read_ipc_stream(body)
+
+
+def expected_rows(connection, args: MultiDict) -> pl.DataFrame:
+    statement, params = ExportQuery.from_args(args).statement()
+    rows = connection.execute(statement, params).all()
+    return pl.DataFrame(rows, schema=EXPORT_SCHEMA, orient="row")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        default=10_000,
+        help="Rows fetched and written at a time",
+    )
+    args = parser.parse_args(argv)
+
+    import app as dashboard
+
+    client = dashboard.app.test_client()
+    spool = dashboard.export_spool
+    spool.directory = spool.directory.with_name("exports_benchmark")
+    shutil.rmtree(spool.directory, ignore_errors=True)
+
+    with dashboard.pool_monitor.connect() as connection:
+        expected = expected_rows(connection, MultiDict())
+        filtered = expected_rows(connection, FILTERS)
+    filter_query = "&".join(
+        f"{name}={value}" for name, value in FILTERS.items(multi=True)
+    )
+    print(f"{expected.height} instructors, {filtered.height} matching {filter_query}")
+
+    failures = 0
+    print(
+        f"{'format':<18}{'MB':>8}{'seconds':>9}{'MB/s':>8}"
+        f"{'peak MB':>9}{'peak MB unchunked':>19}  parity"
+    )
+    for export_format, compression in DOWNLOADS:
+        path = f"/export?format={export_format}&compression={compression}"
+        dashboard.app.config["EXPORT_CHUNK_ROWS"] = args.chunk_rows
+        shutil.rmtree(spool.directory, ignore_errors=True)
+        response, body, elapsed = download(client, path)
+        shutil.rmtree(spool.directory, ignore_errors=True)
+        peak = peak_memory(client, path)
+        # The whole result in one chunk, as if it were fetched without a cursor
+        shutil.rmtree(spool.directory, ignore_errors=True)
+        dashboard.app.config["EXPORT_CHUNK_ROWS"] = expected.height + 1
+        _, whole_body, _ = download(client, path)
+        shutil.rmtree(spool.directory, ignore_errors=True)
+        whole_peak = peak_memory(client, path)
+        dashboard.app.config["EXPORT_CHUNK_ROWS"] = args.chunk_rows
+
+        parity = (
+            response.status_code == 200
+            and read_export(body, export_format, compression).equals(expected)
+            and read_export(whole_body, export_format, compression).equals(expected)
+        )
+        _, filtered_body, _ = download(client, f"{path}&{filter_query}")
+        parity = parity and read_export(
+            filtered_body, export_format, compression
+        ).equals(filtered)
+        failures += not parity
+        megabytes = len(body) / 1024**2
+        print(
+            f"{export_format + '/' + compression:<18}{megabytes:>8.2f}{elapsed:>9.2f}"
+            f"{megabytes / elapsed:>8.1f}{peak / 1024**2:>9.1f}{whole_peak / 1024**2:>19.1f}"
+            f"  {'OK' if parity else 'MISMATCH'}"
+        )
+
+    # A download stopped half way, resumed after the spool was lost (i.e. another host)
+    # and again from the spool rebuilt by the first resume
+    path = "/export?format=parquet"
+    response, body, _ = download(client, path)
+    etag = response.headers["ETag"]
+    half = len(body) // 2
+    for attempt in ("with the spool removed", "from the spool"):
+        if attempt == "with the spool removed":
+            shutil.rmtree(spool.directory, ignore_errors=True)
+        resumed, tail, _ = download(
+            client, path, headers={"Range": f"bytes={half}-", "If-Range": etag}
+        )
+        resumed_ok = resumed.status_code == 206 and body[:half] + tail == body
+        failures += not resumed_ok
+        print(
+            f"Range resume {attempt}: {resumed.status_code}, "
+            f"{'OK' if resumed_ok else 'MISMATCH'}"
+        )
+    stale, _, _ = download(
+        client, path, headers={"Range": f"bytes={half}-", "If-Range": '"stale"'}
+    )
+    print(f"Range resume with a stale If-Range: {stale.status_code} (the whole export)")
+    failures += stale.status_code != 200
+
+    shutil.rmtree(spool.directory, ignore_errors=True)
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
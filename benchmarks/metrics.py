@@ -0,0 +1,153 @@
+"""
+Cost of the pipeline and request instrumentation, and the stage report it gives.
+
+Parses synthetic pages of a few schools (and one unknown school), saves them as parquet
+and seeds them twice into a scratch database, then prints the stage timers and counters
+of /metrics. The counters have to add up: every card parsed is inserted or skipped,
+and the second seed finds every school unchanged.
+
+Then times the metric primitives, and Flask test client requests with and without
+the request hooks.
+
+Usage:
+    python -m benchmarks.metrics --database-url postgresql:///rmp_bench
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+from sqlalchemy import create_engine
+from src.metrics import (
+    CARDS_PARSED,
+    INSTRUCTORS_SKIPPED,
+    INSTRUCTORS_WRITTEN,
+    SCHOOLS_SYNCED,
+    STAGE_SECONDS,
+    Counter,
+    Histogram,
+    timed,
+)
+from src.parse_professors import parse_professors, save_to_parquet
+from src.schools import get_school_registry
+from src.seeding import Seeding
+from benchmarks.seeding import prepare_database
+from benchmarks.synthetic import synthetic_page
+
+
+def run_pipeline(engine, schools: int, cards: int) -> int:
+    """
+    Parses, saves and seeds synthetic pages twice and prints the stage report.
+    Returns the number of counters that don't add up.
+    """
+    prepare_database(engine)
+    rng = random.Random(0)
+    names = rng.sample(sorted(get_school_registry().names().values()), schools)
+    with tempfile.TemporaryDirectory() as directory:
+        files = []
+        for i, school in enumerate(names + ["Synthetic University"]):
+            df = parse_professors(synthetic_page(cards, school=school, seed=i))
+            files.append(Path(directory) / f"{i}.parquet")
+            save_to_parquet(df, files[-1])
+        with engine.connect() as connection:
+            seeding = Seeding(connection)
+            seeding.bulk_seed_files(files)
+            seeding.bulk_seed_files(files)
+
+    stages = {}
+    for name, labels, value in STAGE_SECONDS.samples():
+        stages.setdefault(labels["stage"], {})[name.rsplit("_", 1)[1]] = value
+    print(f"{'stage':<28}{'calls':>8}{'seconds':>10}")
+    for stage, values in stages.items():
+        print(f"{stage:<28}{values['count']:>8}{values['sum']:>10.3f}")
+
+    parsed = CARDS_PARSED.value(engine="lxml")
+    inserted = INSTRUCTORS_WRITTEN.value(operation="inserted")
+    skipped = INSTRUCTORS_SKIPPED.value(reason="unknown_school")
+    unchanged = SCHOOLS_SYNCED.value(result="unchanged")
+    print(
+        f"Cards parsed: {parsed}, instructors inserted: {inserted}, skipped: {skipped}, "
+        f"schools unchanged on the second seed: {unchanged}"
+    )
+    # The unknown school's cards are skipped by both seeds
+    mismatches = int(parsed != inserted + skipped // 2) + int(unchanged != schools)
+    print(f"Pipeline counters: {mismatches} mismatches")
+    return mismatches
+
+
+def time_primitives(calls: int) -> None:
+    counter = Counter("bench_total", "", ["label"])
+    histogram = Histogram("bench_seconds", "", ["label"])
+    print(f"{'primitive':<28}{'ns/call':>10}")
+    for label, call in (
+        ("empty call", lambda: None),
+        ("Counter.inc", lambda: counter.inc(label="a")),
+        ("Histogram.observe", lambda: histogram.observe(0.01, label="a")),
+        (
+            "timed() block",
+            lambda: timed("bench").__enter__().__exit__(None, None, None),
+        ),
+    ):
+        start = time.perf_counter()
+        for _ in range(calls):
+            call()
+        print(f"{label:<28}{(time.perf_counter() - start) / calls * 1e9:>10.0f}")
+
+
+def time_requests(requests: int) -> None:
+    """
+    Times a cached endpoint through the Flask test client with and without the request hooks.
+    """
+    from app import (
+        app,
+        record_request_metrics,
+        reset_request_route,
+        start_request_metrics,
+    )
+
+    client = app.test_client()
+    client.get("/department_names")
+    hooks = (
+        (app.before_request_funcs, start_request_metrics),
+        (app.after_request_funcs, record_request_metrics),
+        (app.teardown_request_funcs, reset_request_route),
+    )
+
+    def time_label(label: str) -> None:
+        start = time.perf_counter()
+        for _ in range(requests):
+            client.get("/department_names")
+        print(f"{label:<28}{(time.perf_counter() - start) / requests * 1e6:>10.1f}")
+
+    print(f"{'requests':<28}{'us/request':>10}")
+    time_label("with request metrics")
+    for functions, hook in hooks:
+        functions[None].remove(hook)
+    try:
+        time_label("without request metrics")
+    finally:
+        for functions, hook in hooks:
+            functions[None].append(hook)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default="postgresql:///rmp_bench")
+    parser.add_argument("--schools", type=int, default=20)
+    parser.add_argument("--cards", type=int, default=500)
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    mismatches = run_pipeline(
+        create_engine(args.database_url), args.schools, args.cards
+    )
+    time_primitives(args.calls)
+    time_requests(args.requests)
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
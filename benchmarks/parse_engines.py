@@ -0,0 +1,142 @@
+"""
+Compares the parser engines of parse_professors.
+
+Checks that every engine parses the synthetic pages into the professors they were
+generated from (saved pages have no such ground truth, so there the engines are
+compared with the BeautifulSoup reference), then reports cards/sec and peak RSS
+for each engine.
+Each engine runs in its own process so the peak RSS readings don't mix.
+
+Usage:
+    python -m benchmarks.parse_engines                 # synthetic pages
+    python -m benchmarks.parse_engines saved/*.html    # saved RMP pages
+"""
+
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+from pathlib import Path
+from src.parse_professors import PARSER_ENGINES, parse_professors
+from benchmarks.synthetic import synthetic_dataframe, synthetic_page
+
+
+def load_pages(paths: list, sizes: list) -> dict:
+    """
+    Returns the pages to benchmark keyed by a label.
+    Uses saved html files when given, otherwise synthetic pages of each size.
+    """
+    if paths:
+        return {Path(p).name: Path(p).read_text(encoding="utf-8") for p in paths}
+    return {f"synthetic-{n}": synthetic_page(n, seed=n) for n in sizes}
+
+
+def expected_professors(paths: list, sizes: list) -> dict:
+    """
+    Returns the professors each synthetic page was generated from, keyed like load_pages.
+    """
+    if paths:
+        return {}
+    return {f"synthetic-{n}": synthetic_dataframe(n, seed=n) for n in sizes}
+
+
+def check_parity(pages: dict, expected: dict) -> bool:
+    """
+    Compares every engine with the expected professors of every page,
+    or with the BeautifulSoup reference on pages without them.
+    """
+    ok = True
+    for label, page in pages.items():
+        reference = expected.get(label)
+        against = "expected"
+        if reference is None:
+            reference = parse_professors(page, engine="bs4")
+            against = "bs4"
+        for engine in PARSER_ENGINES:
+            if engine == against:
+                continue
+            df = parse_professors(page, engine=engine)
+            if not df.equals(reference):
+                ok = False
+                print(f"MISMATCH {engine} vs {against} on {label}")
+    return ok
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident memory of this process in MB.
+    ru_maxrss survives exec on Linux (a spawned child reports its parent's peak)
+    so VmHWM is preferred where /proc is available.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run_engine(engine: str, pages: dict, repeat: int, results) -> None:
+    cards = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages.values():
+            cards += parse_professors(page, engine=engine).height
+    elapsed = time.perf_counter() - start
+    results.put((engine, cards, elapsed, peak_rss_mb()))
+
+
+def benchmark(pages: dict, repeat: int = 3) -> list:
+    """
+    Parses every page with each engine in a fresh process.
+    Returns (engine, cards parsed, seconds, peak RSS in MB) tuples.
+    """
+    # Forked children would share the parent's memory so a clean process is spawned
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    measurements = []
+    for engine in PARSER_ENGINES:
+        process = context.Process(
+            target=_run_engine, args=(engine, pages, repeat, results)
+        )
+        process.start()
+        measurements.append(results.get())
+        process.join()
+    return measurements
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("html_files", nargs="*", help="saved RMP pages to parse")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[100, 1000, 5000],
+        help="number of cards per synthetic page",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    pages = load_pages(args.html_files, args.sizes)
+    if not check_parity(pages, expected_professors(args.html_files, args.sizes)):
+        return 1
+    print(f"Parity OK on {len(pages)} pages")
+
+    print(
+        f"{'engine':<8}{'cards':>10}{'seconds':>10}{'cards/sec':>12}{'peak RSS MB':>14}"
+    )
+    for engine, cards, elapsed, peak_rss in benchmark(pages, args.repeat):
+        print(
+            f"{engine:<8}{cards:>10}{elapsed:>10.2f}"
+            f"{cards / elapsed:>12.0f}{peak_rss:>14.1f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Server time and bytes on the wire of the full figure plot responses vs the compact payloads.
+
+Requests /school_plot and /box_plot (raw values and summaries) for random schools
+in both forms, with the standard library and orjson encoders, and reports the
+median server time and the raw and gzipped response sizes.
+When Node is installed, also checks static/js/plots.js draws the compact payloads
+into exactly the figures of the full form.
+
+Usage:
+    python -m benchmarks.plot_payloads --requests 100
+"""
+
+import argparse
+import gzip
+import json
+import random
+import shutil
+import statistics
+import subprocess
+import time
+from pathlib import Path
+from flask.json.provider import DefaultJSONProvider
+from src.json_provider import OrjsonProvider, orjson
+
+ROOT = Path(__file__).parent.parent
+
+# Runs the browser's plot builders on the payloads read from stdin
+NODE_SCRIPT = """
+const plots = require(process.argv[1]);
+const input = JSON.parse(require("fs").readFileSync(0, "utf8"));
+const built = input.cases.map(c =>
+  c.kind === "school_plot"
+    ? plots.departmentPlot(input.layouts, c.payload)
+    : plots.boxPlot(input.layouts, c.payload)
+);
+process.stdout.write(JSON.stringify(built));
+"""
+
+
+def request_paths(schools: list, count: int, seed=0) -> dict:
+    rng = random.Random(seed)
+    paths = {"school_plot": [], "box_plot": [], "box_plot summary": []}
+    for _ in range(count):
+        paths["school_plot"].append(
+            f"/school_plot?school_name={rng.choice(schools)}"
+            f"&metric={rng.choice(['quality', 'difficulty', 'retake_percent'])}&min_reviews=0"
+        )
+        picked = "&".join(f"schools[]={school}" for school in rng.sample(schools, 3))
+        metric = rng.choice(["quality", "difficulty", "retake_percent"])
+        for label, summary in (("box_plot", 0), ("box_plot summary", 1)):
+            paths[label].append(
+                f"/box_plot?{picked}&department=Mathematics&metric={metric}&summary={summary}"
+            )
+    return paths
+
+
+def measure(client, cache, paths: list, plot_format: str) -> tuple:
+    """
+    Returns the median server ms, median bytes and median gzipped bytes of the 200 responses.
+    """
+    timings, sizes, gzipped = [], [], []
+    for path in paths:
+        cache.clear()
+        start = time.perf_counter()
+        response = client.get(f"{path}&format={plot_format}")
+        elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code != 200:
+            continue
+        timings.append(elapsed)
+        sizes.append(len(response.data))
+        gzipped.append(len(gzip.compress(response.data)))
+    return (
+        statistics.median(timings),
+        statistics.median(sizes),
+        statistics.median(gzipped),
+    )
+
+
+def check_parity(client, paths: dict) -> int:
+    """
+    Builds the figures of the compact payloads with static/js/plots.js in Node and
+    compares them with the full figures. Returns the number of mismatches.
+    """
+    layouts = client.get("/plot_layouts").get_json()
+    cases, expected = [], []
+    for label, label_paths in paths.items():
+        for path in label_paths:
+            figure = client.get(f"{path}&format=figure")
+            if figure.status_code != 200:
+                continue
+            kind = label.split()[0]
+            cases.append(
+                {
+                    "kind": kind,
+                    "payload": client.get(f"{path}&format=compact").get_json(),
+                }
+            )
+            expected.append(json.loads(figure.get_json()["graphJSON"]))
+    built = subprocess.run(
+        ["node", "-e", NODE_SCRIPT, str(ROOT / "static/js/plots.js")],
+        input=json.dumps({"layouts": layouts, "cases": cases}),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    mismatches = 0
+    for figure, plot in zip(expected, json.loads(built.stdout)):
+        if figure != plot:
+            mismatches += 1
+    print(f"static/js/plots.js parity on {len(cases)} plots: {mismatches} mismatches")
+    return mismatches
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--requests", type=int, default=100, help="Requests per endpoint"
+    )
+    args = parser.parse_args(argv)
+
+    import app as dashboard
+
+    client = dashboard.app.test_client()
+    registry = dashboard.get_school_registry()
+    schools = [
+        registry.name_for(school_id)
+        for school_id in sorted(dashboard.query_backend.scraped_school_ids())
+    ]
+    paths = request_paths(schools, args.requests)
+    providers = [("json", DefaultJSONProvider(dashboard.app))]
+    if orjson is not None:
+        providers.append(("orjson", OrjsonProvider(dashboard.app)))
+
+    layouts = client.get("/plot_layouts").data
+    print(
+        f"/plot_layouts: {len(layouts)} bytes ({len(gzip.compress(layouts))} gzipped), "
+        "fetched once per page and cached by the browser"
+    )
+    print(f"{'endpoint':<18}{'form':<16}{'server ms':>10}{'bytes':>10}{'gzipped':>10}")
+    for label, label_paths in paths.items():
+        for plot_format in ("figure", "compact"):
+            for encoder, provider in providers:
+                dashboard.app.json = provider
+                ms, size, gzipped = measure(
+                    client, dashboard.response_cache, label_paths, plot_format
+                )
+                form = f"{plot_format}/{encoder}"
+                print(f"{label:<18}{form:<16}{ms:>10.2f}{size:>10.0f}{gzipped:>10.0f}")
+
+    if shutil.which("node"):
+        if check_parity(client, {label: p[:20] for label, p in paths.items()}):
+            raise SystemExit(1)
+    else:
+        print("Node isn't installed, skipping the static/js/plots.js parity check")
+
+
+if __name__ == "__main__":
+    main()
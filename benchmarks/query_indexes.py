@@ -0,0 +1,155 @@
+"""
+EXPLAIN ANALYZE timings of the dashboard queries before and after the query index migration.
+
+Fills a scratch database with a synthetic dataset (5k schools by default), drops the
+indexes of db/migrations/0002_query_indexes.sql and times every query shape,
+then applies the migration again through the migration runner and times them once more.
+Reports the median execution time of each query and the scans its plan used.
+
+Usage:
+    python -m benchmarks.query_indexes --database-url postgresql:///rmp_bench_plot
+"""
+
+import argparse
+import random
+import statistics
+from sqlalchemy import create_engine
+from sqlalchemy.sql import text
+from src.migrations import migrate
+from benchmarks.school_plot import ROLLUP_QUERY, build_dataset
+
+# The migration being measured and the indexes it creates
+MIGRATION_VERSION = 2
+MIGRATION_INDEXES = ("schools_name", "instructors_school_department")
+
+# The queries of PostgresBackend, by the endpoint using them
+QUERIES = {
+    "/school_plot": ROLLUP_QUERY.format(metric="quality"),
+    "/box_plot": """
+        SELECT s.school_name, CAST(i.difficulty AS DOUBLE PRECISION)
+        FROM Instructors i
+        JOIN Departments d ON i.department_id = d.department_id
+        JOIN Schools s ON i.school_id = s.school_id
+        WHERE s.school_name = ANY(:schools) AND d.department_name = :dept AND i.difficulty IS NOT NULL
+    """,
+    "/departments_for_schools": """
+        SELECT department_name
+        FROM Departments
+        JOIN Instructors ON Instructors.department_id = Departments.department_id
+        JOIN Schools ON Schools.school_id = Instructors.school_id
+        WHERE Schools.school_name = ANY(:schools)
+        GROUP BY department_name
+        HAVING COUNT(DISTINCT Schools.school_name) = :num_schools
+    """,
+    "department stats refresh": """
+        SELECT school_id, department_id,
+                SUM(quality * total_ratings),
+                SUM(difficulty * total_ratings),
+                SUM(retake_percent * total_ratings),
+                COALESCE(SUM(total_ratings), 0),
+                COUNT(*)
+        FROM Instructors
+        WHERE school_id = ANY(:school_ids) AND department_id IS NOT NULL
+        GROUP BY school_id, department_id
+    """,
+}
+
+
+def query_params(rng: random.Random, num_schools: int, num_departments: int) -> dict:
+    school_ids = rng.sample(range(1, num_schools + 1), 3)
+    schools = [f"Synthetic School {school_id}" for school_id in school_ids]
+    return {
+        "school_name": schools[0],
+        "minReviews": 50,
+        "schools": schools,
+        "num_schools": len(schools),
+        "dept": f"Department {rng.randint(1, num_departments)}",
+        "school_ids": school_ids,
+    }
+
+
+def scans(plan: dict) -> list:
+    """
+    Returns the table scans of a plan tree, i.e. "Index Only Scan on instructors".
+    """
+    found = []
+    if "Relation Name" in plan:
+        found.append(f"{plan['Node Type']} on {plan['Relation Name']}")
+    for child in plan.get("Plans", []):
+        found.extend(scans(child))
+    return found
+
+
+def explain(engine, params: list) -> dict:
+    """
+    Runs EXPLAIN ANALYZE of every query with each set of params.
+    Returns {query: (median execution ms, scans of the first plan)}.
+    """
+    results = {}
+    with engine.connect() as connection:
+        for label, query in QUERIES.items():
+            timings = []
+            plan_scans = None
+            for values in params:
+                plan = connection.execute(
+                    text(f"EXPLAIN (ANALYZE, FORMAT JSON) {query}"), values
+                ).scalar()[0]
+                timings.append(plan["Execution Time"])
+                plan_scans = plan_scans or sorted(set(scans(plan["Plan"])))
+            results[label] = (statistics.median(timings), plan_scans)
+    return results
+
+
+def vacuum_analyze(engine) -> None:
+    # Sets the visibility map index only scans rely on, VACUUM can't run in a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("VACUUM ANALYZE"))
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default="postgresql:///rmp_bench_plot")
+    parser.add_argument("--schools", type=int, default=5000)
+    parser.add_argument("--instructors-per-school", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.database_url)
+    build_dataset(engine, args.schools, args.instructors_per_school)
+    with engine.connect() as connection:
+        num_departments = connection.execute(
+            text("SELECT COUNT(*) FROM Departments")
+        ).scalar()
+        for index in MIGRATION_INDEXES:
+            connection.execute(text(f"DROP INDEX IF EXISTS {index}"))
+        connection.execute(
+            text("DELETE FROM schema_migrations WHERE version = :version"),
+            {"version": MIGRATION_VERSION},
+        )
+        connection.commit()
+    vacuum_analyze(engine)
+    rng = random.Random(0)
+    params = [
+        query_params(rng, args.schools, num_departments) for _ in range(args.queries)
+    ]
+    before = explain(engine, params)
+
+    with engine.connect() as connection:
+        migrate(connection)
+    vacuum_analyze(engine)
+    after = explain(engine, params)
+
+    print(f"{'query':<28}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for label in QUERIES:
+        print(
+            f"{label:<28}{before[label][0]:>12.3f}{after[label][0]:>12.3f}"
+            f"{before[label][0] / after[label][0]:>9.1f}x"
+        )
+    for label in QUERIES:
+        print(f"{label}")
+        print(f"  before: {', '.join(before[label][1])}")
+        print(f"  after:  {', '.join(after[label][1])}")
+
+
+if __name__ == "__main__":
+    main()
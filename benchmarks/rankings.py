@@ -0,0 +1,221 @@
+"""
+Latency of the department leaderboard and instructor percentile queries across every school.
+
+Fills a scratch database with a synthetic dataset (5k schools and 1M instructors by default)
+unless --reuse is given, then times random leaderboard pages and instructor lookups
+and reports p50/p99 latency. The percentiles are also timed with PERCENT_RANK windows
+over the whole department, which the filtered counts replaced, and both have to agree.
+
+With --dataset, the Postgres and parquet backends of the app are compared on random
+departments and instructors of the real data, which have to give the same rankings.
+
+Usage:
+    python -m benchmarks.rankings --database-url postgresql:///rmp_bench_plot
+    python -m benchmarks.rankings --reuse --dataset data/dataset
+"""
+
+import argparse
+import random
+import statistics
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.sql import text
+from src.backends import METRICS, PostgresBackend
+from benchmarks.common import backend_pair, same_leaderboard
+from benchmarks.school_plot import build_dataset
+
+# The percentile query ranking the whole department with window functions,
+# returning the rows of the filtered counts query for instructors with enough ratings
+WINDOW_PERCENTILES_QUERY = """
+    WITH targets AS (
+        SELECT i.instructor_id, i.department_id
+        FROM Instructors i
+        JOIN Schools s ON i.school_id = s.school_id
+        WHERE s.school_name = :school_name
+        AND LOWER(i.instructor_name) = LOWER(:instructor)
+        AND i.department_id IS NOT NULL
+    ), peers AS (
+        SELECT i.*,
+            {percentiles}
+        FROM Instructors i
+        WHERE i.department_id IN (SELECT department_id FROM targets)
+        AND i.total_ratings >= :min_reviews
+    )
+    SELECT s.school_name, p.instructor_name, d.department_name, p.total_ratings,
+        {columns}
+    FROM peers p
+    JOIN targets t ON p.instructor_id = t.instructor_id
+    JOIN Schools s ON p.school_id = s.school_id
+    JOIN Departments d ON p.department_id = d.department_id
+""".format(
+    percentiles=",\n            ".join(
+        f"PERCENT_RANK() OVER (PARTITION BY i.department_id, i.{metric} IS NULL "
+        f"ORDER BY i.{metric}) AS {metric}_percentile, "
+        f"COUNT(i.{metric}) OVER (PARTITION BY i.department_id) AS {metric}_count"
+        for metric in METRICS
+    ),
+    columns=",\n        ".join(
+        f"CAST(p.{metric} AS DOUBLE PRECISION), "
+        f"CASE WHEN p.{metric} IS NOT NULL THEN p.{metric}_percentile END, "
+        # The others, without the instructor
+        f"p.{metric}_count - CASE WHEN p.{metric} IS NOT NULL THEN 1 ELSE 0 END"
+        for metric in METRICS
+    ),
+)
+# Ratings an instructor's peers need in the timed percentile lookups
+MIN_REVIEWS = 10
+
+
+def quantiles(timings: list) -> tuple:
+    cuts = statistics.quantiles(timings, n=100)
+    return cuts[49], cuts[98]
+
+
+def time_calls(calls: list) -> tuple:
+    """
+    Runs each call and returns the p50 and p99 milliseconds with the results.
+    """
+    timings, results = [], []
+    for call in calls:
+        start = time.perf_counter()
+        results.append(call())
+        timings.append((time.perf_counter() - start) * 1000)
+    return quantiles(timings), results
+
+
+def benchmark_latency(engine, num_schools: int, queries: int) -> int:
+    backend = PostgresBackend(engine.connect)
+    rng = random.Random(0)
+    departments = backend.department_names()
+    with engine.connect() as connection:
+        instructors = connection.execute(
+            text(
+                """
+                SELECT s.school_name, i.instructor_name
+                FROM Instructors i
+                JOIN Schools s ON i.school_id = s.school_id
+                WHERE i.school_id = ANY(:school_ids) AND i.department_id IS NOT NULL
+                """
+            ),
+            {"school_ids": [rng.randint(1, num_schools) for _ in range(queries)]},
+        ).all()
+    lookups = rng.sample(instructors, min(queries, len(instructors)))
+
+    print(f"{'query':<36}{'p50 ms':>10}{'p99 ms':>10}")
+    for label, pages in (
+        ("leaderboard first page", 1),
+        ("leaderboard deep pages", 100),
+    ):
+        calls = []
+        for _ in range(queries):
+            args = (
+                rng.choice(departments),
+                rng.choice(METRICS),
+                50,
+                rng.random() < 0.5,
+                25,
+                rng.randrange(pages) * 25,
+            )
+            calls.append(lambda args=args: backend.department_leaderboard(*args))
+        (p50, p99), _ = time_calls(calls)
+        print(f"{label:<36}{p50:>10.2f}{p99:>10.2f}")
+
+    (p50, p99), counted = time_calls(
+        [
+            lambda school=school, name=name: backend.instructor_percentiles(
+                school, name, None, MIN_REVIEWS
+            )
+            for school, name in lookups
+        ]
+    )
+    print(f"{'percentiles (filtered counts)':<36}{p50:>10.2f}{p99:>10.2f}")
+
+    def window_percentiles(school, name):
+        with engine.connect() as connection:
+            return connection.execute(
+                text(WINDOW_PERCENTILES_QUERY),
+                {"school_name": school, "instructor": name, "min_reviews": MIN_REVIEWS},
+            ).all()
+
+    (p50, p99), windowed = time_calls(
+        [
+            lambda school=school, name=name: window_percentiles(school, name)
+            for school, name in lookups
+        ]
+    )
+    print(f"{'percentiles (PERCENT_RANK windows)':<36}{p50:>10.2f}{p99:>10.2f}")
+
+    # The window query only ranks instructors with enough ratings themselves
+    mismatches = 0
+    for rows, window_rows in zip(counted, windowed):
+        ranked = sorted(row for row in rows if row[3] >= MIN_REVIEWS)
+        mismatches += ranked != sorted(tuple(row) for row in window_rows)
+    print(f"Filtered counts vs PERCENT_RANK windows: {mismatches} mismatches")
+    return mismatches
+
+
+def compare_backends(database_url: str, dataset_path: str, samples: int) -> int:
+    """
+    Compares the rankings of the Postgres and parquet backends on random
+    departments and instructors. Returns the number of mismatches.
+    """
+    postgres, parquet = backend_pair(database_url, dataset_path)
+    rng = random.Random(1)
+    mismatches = int(postgres.department_names() != parquet.department_names())
+    departments = postgres.department_names()
+    for department in rng.sample(departments, min(samples, len(departments))):
+        for metric in METRICS:
+            for ascending in (False, True):
+                mismatches += not same_leaderboard(
+                    postgres, parquet, department, metric, 10, ascending, 25, 0
+                )
+
+    with postgres.connect() as connection:
+        instructors = connection.execute(
+            text(
+                """
+                SELECT s.school_name, i.instructor_name
+                FROM Instructors i
+                JOIN Schools s ON i.school_id = s.school_id
+                ORDER BY i.instructor_id
+                """
+            )
+        ).all()
+    for school, name in rng.sample(instructors, min(samples, len(instructors))):
+        for min_reviews in (0, 20):
+            mismatches += postgres.instructor_percentiles(
+                school, name, None, min_reviews
+            ) != parquet.instructor_percentiles(school, name, None, min_reviews)
+    print(f"Postgres vs parquet backend rankings: {mismatches} mismatches")
+    return mismatches
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default="postgresql:///rmp_bench_plot")
+    parser.add_argument("--schools", type=int, default=5000)
+    parser.add_argument("--instructors-per-school", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument(
+        "--reuse", action="store_true", help="Use the synthetic database already built"
+    )
+    parser.add_argument(
+        "--dataset", help="Parquet dataset of the app's database to compare with"
+    )
+    parser.add_argument("--app-database-url", default="postgresql:///rmp.db")
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.database_url)
+    if not args.reuse:
+        build_dataset(engine, args.schools, args.instructors_per_school)
+    mismatches = benchmark_latency(engine, args.schools, args.queries)
+    if args.dataset:
+        mismatches += compare_backends(
+            args.app_database_url, args.dataset, args.queries
+        )
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Local stand-in for the RMP GraphQL API, used to test and benchmark the API scraper
+and the school directory crawler.
+Serves synthetic schools or replays responses recorded with ApiScraper(record_dir=...).
+
+    uv run python -m benchmarks.rmp_stub --replay recorded/ --port 8765
+"""
+
+import argparse
+import base64
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from benchmarks.synthetic import synthetic_professor
+from src.api_scraper import school_node_id
+
+
+def professor_node(professor: dict) -> dict:
+    """
+    Converts a synthetic professor (the text of a teacher card) into an API teacher node.
+    """
+    first_name, last_name = professor["name"].split(" ", 1)
+    again = professor["again"]
+    return {
+        "legacyId": professor["legacy_id"],
+        "firstName": first_name,
+        "lastName": last_name,
+        "department": professor["department"],
+        "avgRating": float(professor["quality"]),
+        "numRatings": professor["num_ratings"],
+        "wouldTakeAgainPercent": -1 if again == "N/A" else int(again.strip("%")),
+        "avgDifficulty": float(professor["difficulty"]),
+        "school": {"name": professor["school"]},
+    }
+
+
+def synthetic_nodes(num_professors: int, school: str, seed=0) -> list:
+    """
+    Returns the nodes of the same professors synthetic_page(num_professors, school, seed) renders.
+    """
+    rng = random.Random(seed)
+    return [
+        professor_node(synthetic_professor(rng, school, seed * 100_000 + i))
+        for i in range(num_professors)
+    ]
+
+
+def _cursor(offset: int) -> str:
+    return base64.b64encode(f"arrayconnection:{offset}".encode()).decode()
+
+
+def _offset(cursor: str) -> int:
+    if not cursor:
+        return 0
+    return int(base64.b64decode(cursor).decode().split(":")[1]) + 1
+
+
+class StubServer:
+    """
+    Threaded HTTP server answering TeacherSearchPaginationQuery requests.
+
+    Synthetic schools are paginated with the requested page size and arrayconnection cursors.
+    Recorded responses are replayed by school and cursor, whatever page size is asked for.
+    School name lookups are answered from directory, a dict of school ID to name.
+    latency adds a delay to every response and failure_rate answers that share with a 503.
+    """
+
+    def __init__(
+        self,
+        schools: dict = None,
+        replay_dir: Path = None,
+        directory: dict = None,
+        latency: float = 0,
+        failure_rate: float = 0,
+        port: int = 0,
+        seed=0,
+    ):
+        # School ID -> list of teacher nodes
+        self.schools = {school_node_id(k): v for k, v in (schools or {}).items()}
+        self.recorded = {}
+        if replay_dir:
+            for path in sorted(Path(replay_dir).glob("*.json")):
+                with open(path, encoding="utf-8") as f:
+                    record = json.load(f)
+                variables = record["variables"]
+                key = (variables["query"]["schoolID"], variables.get("cursor"))
+                self.recorded[key] = record["response"]
+        self.directory = {school_node_id(k): v for k, v in (directory or {}).items()}
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/graphql"
+
+    def respond(self, variables: dict) -> tuple:
+        """
+        Returns the status and JSON body for a request's variables.
+        """
+        with self._lock:
+            self.requests += 1
+            if self.rng.random() < self.failure_rate:
+                self.failures += 1
+                return 503, {"error": "unavailable"}
+        if "query" not in variables:
+            # Aliased node lookups of the directory crawler, $s0, $s1, ...
+            data = {
+                alias: (
+                    {"name": self.directory[node_id]}
+                    if node_id in self.directory
+                    else None
+                )
+                for alias, node_id in variables.items()
+            }
+            return 200, {"data": data}
+        school_id = variables["query"]["schoolID"]
+        cursor = variables.get("cursor")
+        if (school_id, cursor) in self.recorded:
+            return 200, self.recorded[(school_id, cursor)]
+        nodes = self.schools.get(school_id)
+        if nodes is None:
+            return 200, {"errors": [{"message": f"Unknown school {school_id}"}]}
+        start = _offset(cursor)
+        end = min(start + variables["count"], len(nodes))
+        teachers = {
+            "resultCount": len(nodes),
+            "edges": [{"node": node} for node in nodes[start:end]],
+            "pageInfo": {
+                "hasNextPage": end < len(nodes),
+                "endCursor": _cursor(end - 1),
+            },
+        }
+        return 200, {"data": {"search": {"teachers": teachers}}}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length))
+                if stub.latency:
+                    time.sleep(stub.latency)
+                status, body = stub.respond(payload["variables"])
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a local RMP GraphQL stub.")
+    parser.add_argument("--replay", type=Path, help="Directory of recorded responses")
+    parser.add_argument(
+        "--synthetic", type=int, default=0, help="Professors per synthetic school"
+    )
+    parser.add_argument("--schools", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0)
+    parser.add_argument(
+        "--directory", type=Path, help="School names JSON to answer name lookups from"
+    )
+    args = parser.parse_args()
+
+    schools = {
+        school_id: synthetic_nodes(
+            args.synthetic, f"Synthetic University {school_id}", school_id
+        )
+        for school_id in range(1, args.schools + 1)
+        if args.synthetic
+    }
+    directory = {}
+    if args.directory:
+        with open(args.directory, encoding="utf-8") as f:
+            directory = {int(k): v for k, v in json.load(f).items()}
+    stub = StubServer(
+        schools, args.replay, directory, latency=args.latency, port=args.port
+    )
+    print(
+        f"Serving {len(stub.schools)} synthetic and {len(stub.recorded)} recorded pages at {stub.url}"
+    )
+    stub.server.serve_forever()
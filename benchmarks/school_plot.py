@@ -0,0 +1,134 @@
+"""
+Compares the /school_plot query on raw instructors with the DepartmentStats rollup.
+
+Fills a scratch database with a synthetic dataset (5k schools by default),
+then times both queries for random schools and reports p50/p99 latency.
+
+Usage:
+    python -m benchmarks.school_plot --database-url postgresql:///rmp_bench_plot
+"""
+
+import argparse
+import random
+import statistics
+import time
+from pathlib import Path
+from sqlalchemy import create_engine
+from sqlalchemy.sql import text
+from sqlalchemy_utils import create_database, database_exists, drop_database
+from src.migrations import apply_schema
+from src.seeding import Seeding
+from benchmarks.synthetic import synthetic_instructors
+
+ROOT = Path(__file__).parent.parent
+
+# The /school_plot query before the rollup table
+RAW_QUERY = """
+    SELECT d.department_name,
+            ROUND(SUM(i.{metric} * i.total_ratings) / SUM(i.total_ratings), 2) AS avg_metric,
+            SUM(i.total_ratings) as total_ratings
+    FROM Instructors i
+    JOIN Departments d ON i.department_id = d.department_id
+    JOIN Schools s ON i.school_id = s.school_id
+    WHERE s.school_name = :school_name
+    GROUP BY d.department_name
+    HAVING SUM(i.total_ratings) >= :minReviews
+    ORDER BY avg_metric DESC
+"""
+ROLLUP_QUERY = """
+    SELECT d.department_name,
+            ROUND(ds.{metric}_weighted_sum / NULLIF(ds.total_ratings, 0), 2) AS avg_metric,
+            ds.total_ratings
+    FROM DepartmentStats ds
+    JOIN Departments d ON ds.department_id = d.department_id
+    JOIN Schools s ON ds.school_id = s.school_id
+    WHERE s.school_name = :school_name
+    AND ds.total_ratings >= :minReviews
+    ORDER BY avg_metric DESC
+"""
+
+
+def build_dataset(engine, num_schools: int, per_school: int) -> None:
+    """
+    Recreates the scratch database and loads the synthetic schools, departments and instructors.
+    """
+    if database_exists(engine.url):
+        drop_database(engine.url)
+    create_database(engine.url)
+    instructors = synthetic_instructors(num_schools, per_school)
+    with engine.connect() as connection:
+        apply_schema(connection)
+        connection.execute(
+            text(
+                """
+                INSERT INTO Schools (school_id, school_name)
+                SELECT id, 'Synthetic School ' || id FROM generate_series(1, :n) id
+                """
+            ),
+            {"n": num_schools},
+        )
+        connection.execute(
+            text(
+                """
+                INSERT INTO Departments (department_name)
+                SELECT 'Department ' || id FROM generate_series(1, :n) id
+                """
+            ),
+            {"n": int(instructors["department_id"].max())},
+        )
+        connection.execute(
+            text(
+                """
+                INSERT INTO DepartmentAliases (alias, department_id)
+                SELECT department_name, department_id FROM Departments
+                """
+            )
+        )
+        seeder = Seeding(connection)
+        seeder.copy_instructors(instructors)
+        seeder.refresh_department_stats()
+        connection.commit()
+        connection.execute(text("ANALYZE"))
+        connection.commit()
+
+
+def time_query(engine, query: str, schools: list, metric: str) -> list:
+    timings = []
+    with engine.connect() as connection:
+        for school in schools:
+            start = time.perf_counter()
+            connection.execute(
+                text(query.format(metric=metric)),
+                {"school_name": school, "minReviews": 50},
+            ).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default="postgresql:///rmp_bench_plot")
+    parser.add_argument("--schools", type=int, default=5000)
+    parser.add_argument("--instructors-per-school", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.database_url)
+    build_dataset(engine, args.schools, args.instructors_per_school)
+    rng = random.Random(0)
+    schools = [
+        f"Synthetic School {rng.randint(1, args.schools)}" for _ in range(args.queries)
+    ]
+
+    print(f"{'query':<10}{'metric':<16}{'p50 ms':>10}{'p99 ms':>10}")
+    for metric in ("difficulty", "quality", "retake_percent"):
+        for label, query in (("raw", RAW_QUERY), ("rollup", ROLLUP_QUERY)):
+            timings = time_query(engine, query, schools, metric)
+            quantiles = statistics.quantiles(timings, n=100)
+            print(
+                f"{label:<10}{metric:<16}{quantiles[49]:>10.2f}{quantiles[98]:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compares the COPY based bulk loader with the row by row loader.
+
+Seeds the parquet files in data/dataframes into a scratch database with each loader
+and reports rows/sec. The scratch database is created if missing and its
+Instructors and Departments tables (with the department aliases) are emptied before each run.
+
+Usage:
+    python -m benchmarks.seeding --database-url postgresql:///rmp_bench
+"""
+
+import argparse
+import time
+from pathlib import Path
+import polars as pl
+from sqlalchemy import create_engine
+from sqlalchemy.sql import text
+from sqlalchemy_utils import create_database, database_exists
+from src.migrations import apply_schema
+from src.seeding import Seeding
+
+ROOT = Path(__file__).parent.parent
+
+
+def prepare_database(engine) -> None:
+    """
+    Creates the schema and schools in a scratch database and empties the seeded tables.
+    """
+    if not database_exists(engine.url):
+        create_database(engine.url)
+    with engine.connect() as connection:
+        needs_schools = not engine.dialect.has_table(connection, "schools")
+        # Tables and migrations added since the last run are applied too
+        apply_schema(connection)
+        if needs_schools:
+            Seeding(connection).initialize_school_names()
+        connection.execute(
+            text(
+                "TRUNCATE Instructors, DepartmentAliases, Departments, DepartmentStats, "
+                "ScrapeState RESTART IDENTITY"
+            )
+        )
+        connection.commit()
+
+
+def run(engine, loader: str, files: list) -> tuple:
+    """
+    Seeds every file with the given loader and returns (rows, seconds).
+    """
+    prepare_database(engine)
+    with engine.connect() as connection:
+        seeder = Seeding(connection)
+        start = time.perf_counter()
+        if loader == "bulk":
+            rows = seeder.bulk_seed_files(files)
+        else:
+            rows = 0
+            for file in files:
+                df = pl.read_parquet(file)
+                seeder.seed_dataframe_rows(df)
+                rows += df.height
+        return rows, time.perf_counter() - start
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default="postgresql:///rmp_bench")
+    parser.add_argument("--data-dir", type=Path, default=ROOT / "data/dataframes")
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.database_url)
+    files = sorted(args.data_dir.glob("*.parquet"))
+    print(f"{'loader':<8}{'rows':>10}{'seconds':>10}{'rows/sec':>12}")
+    for loader in ("rows", "bulk"):
+        rows, seconds = run(engine, loader, files)
+        print(f"{loader:<8}{rows:>10}{seconds:>10.2f}{rows / seconds:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
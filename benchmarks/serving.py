@@ -0,0 +1,162 @@
+"""
+Load test of the Flask development server against the ASGI server.
+
+Starts each server in its own process on the local database, sends the same mix of
+uncached /school_plot, /box_plot and /departments_for_schools requests from many
+concurrent clients and reports requests/sec and latency percentiles.
+
+Usage:
+    python -m benchmarks.serving --requests 2000 --concurrency 64 --workers 4
+"""
+
+import argparse
+import asyncio
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+import httpx
+from sqlalchemy import create_engine
+from src.backends import PostgresBackend
+from src.schools import get_school_registry
+from benchmarks.common import percentile
+
+ROOT = Path(__file__).parent.parent
+
+
+def request_urls(schools: list, count: int, seed=0) -> list:
+    """
+    Returns count request paths with random parameters, so nearly every one misses the response cache.
+    """
+    rng = random.Random(seed)
+    urls = []
+    for _ in range(count):
+        kind = rng.random()
+        picked = "&".join(f"schools[]={school}" for school in rng.sample(schools, 3))
+        if kind < 0.5:
+            urls.append(
+                f"/school_plot?school_name={rng.choice(schools)}"
+                f"&metric={rng.choice(['quality', 'difficulty'])}&min_reviews={rng.randint(0, 10_000)}"
+            )
+        elif kind < 0.8:
+            urls.append(
+                f"/box_plot?{picked}&department=Mathematics&metric=difficulty"
+                f"&summary={rng.randint(0, 1)}&seed={rng.random()}"
+            )
+        else:
+            urls.append(f"/departments_for_schools?{picked}")
+    return urls
+
+
+def start_server(kind: str, port: int, workers: int) -> subprocess.Popen:
+    if kind == "flask":
+        command = [
+            sys.executable,
+            "-c",
+            f"from app import app; app.run(debug=False, port={port})",
+        ]
+    else:
+        command = [
+            sys.executable,
+            "asgi.py",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+        ]
+    process = subprocess.Popen(
+        command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/cache_stats", timeout=1).status_code == 200:
+                return process
+        except httpx.TransportError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"The {kind} server didn't start on port {port}")
+
+
+async def load(base_url: str, urls: list, concurrency: int) -> tuple:
+    """
+    Sends every request with concurrency clients at once.
+    Returns (latencies in ms, errors, seconds).
+    """
+    latencies = []
+    errors = 0
+    queue = list(reversed(urls))
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=120, limits=limits
+    ) as client:
+
+        async def worker():
+            nonlocal errors
+            while queue:
+                url = queue.pop()
+                start = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    if response.status_code >= 500:
+                        errors += 1
+                except httpx.TransportError:
+                    errors += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return latencies, errors, time.perf_counter() - start
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default="postgresql:///rmp.db")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=4, help="ASGI worker processes")
+    parser.add_argument("--port", type=int, default=8091)
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.database_url)
+    registry = get_school_registry()
+    schools = [
+        registry.name_for(school_id)
+        for school_id in sorted(PostgresBackend(engine.connect).scraped_school_ids())
+    ]
+    engine.dispose()
+    urls = request_urls(schools, args.requests)
+    warmup = request_urls(schools, 50, seed=1)
+
+    print(
+        f"{args.requests} uncached requests from {args.concurrency} concurrent clients"
+    )
+    print(
+        f"{'server':<18}{'req/s':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}"
+    )
+    for kind, label in (
+        ("flask", "flask dev server"),
+        ("asgi", f"asgi x{args.workers}"),
+    ):
+        process = start_server(kind, args.port, args.workers)
+        try:
+            base_url = f"http://127.0.0.1:{args.port}"
+            asyncio.run(load(base_url, warmup, min(args.concurrency, 8)))
+            latencies, errors, elapsed = asyncio.run(
+                load(base_url, urls, args.concurrency)
+            )
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+        print(
+            f"{label:<18}{len(urls) / elapsed:>8.0f}{percentile(latencies, 0.5):>10.1f}"
+            f"{percentile(latencies, 0.95):>10.1f}{percentile(latencies, 0.99):>10.1f}"
+            f"{max(latencies):>10.1f}{errors:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+"""
+Reproducible benchmark suite, with machine-readable results to compare across commits.
+
+generate writes synthetic parquet archives scaled from the bundled 341 school archive
+(see benchmarks/synthetic.py). run seeds one into a scratch database and times parsing
+synthetic pages of 100 to 20k cards, seeding, autocomplete, /school_plot, /box_plot and
+/departments_for_schools, then writes the results as JSON with the commit they were
+measured at. compare lists the changes between two result files and fails on
+regressions past a threshold. Everything runs offline against a local Postgres.
+
+Usage:
+    python -m benchmarks.suite generate --scale 10 --scale 100
+    python -m benchmarks.suite run --scale 10
+    python -m benchmarks.suite compare data/bench/results/OLD.json data/bench/results/NEW.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urlencode
+import polars as pl
+from sqlalchemy import create_engine
+from sqlalchemy.sql import text
+from sqlalchemy_utils import database_exists
+from src.parse_professors import parse_professors
+from src.schools import get_school_registry
+from src.search import SchoolSearchIndex
+from src.seeding import Seeding
+from benchmarks.autocomplete import measure, terms
+from benchmarks.seeding import prepare_database
+from benchmarks.synthetic import synthetic_archive, synthetic_page
+
+ROOT = Path(__file__).parent.parent
+# Archives, and results unless --output says otherwise
+BENCH_PATH = ROOT / "data/bench"
+# Bumped whenever results stop being comparable with earlier ones
+SUITE_VERSION = 1
+# Teacher cards on the synthetic pages parsed
+PAGE_SIZES = (100, 1000, 5000, 20_000)
+# Instructors synced at once when seeding, so the 100x archive fits in memory
+SEED_BATCH_ROWS = 500_000
+# Changes smaller than this share of the old value aren't reported as regressions
+DEFAULT_THRESHOLD = 0.10
+
+
+def scale_label(scale: float) -> str:
+    return f"{scale:g}x".replace(".", "_")
+
+
+def archive_path(scale: float, seed: int) -> Path:
+    return BENCH_PATH / f"archive-{scale_label(scale)}-seed{seed}"
+
+
+def result(name: str, value: float, unit: str) -> dict:
+    """
+    Returns a result entry. Rates (units per second) are better higher,
+    durations better lower.
+    """
+    return {
+        "name": name,
+        "value": round(value, 4),
+        "unit": unit,
+        "higher_is_better": unit.endswith("/sec"),
+    }
+
+
+def latency_results(name: str, timings: list) -> list:
+    cuts = statistics.quantiles(timings, n=100)
+    return [
+        result(f"{name} p50", cuts[49], "ms"),
+        result(f"{name} p99", cuts[98], "ms"),
+    ]
+
+
+def commit_info() -> dict:
+    """
+    Returns the commit the suite runs at and whether the tree has uncommitted changes.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": "unknown", "dirty": None}
+    return {"commit": commit, "dirty": bool(status.strip())}
+
+
+def machine_info() -> dict:
+    return {
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "polars": pl.__version__,
+        "cpus": os.cpu_count(),
+    }
+
+
+def bench_parse(repeats: int) -> list:
+    """
+    Parses synthetic pages of each size with the default engine, median cards/sec.
+    """
+    results = []
+    for size in PAGE_SIZES:
+        page = synthetic_page(size, seed=size)
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            parse_professors(page)
+            timings.append(time.perf_counter() - start)
+        cards_per_sec = size / statistics.median(timings)
+        results.append(result(f"parse {size} cards", cards_per_sec, "cards/sec"))
+    return results
+
+
+def seed_batches(files: list) -> list:
+    """
+    Splits the files into batches of about SEED_BATCH_ROWS instructors.
+    """
+    batches, batch, rows = [], [], 0
+    for file in files:
+        batch.append(file)
+        rows += pl.scan_parquet(file).select(pl.len()).collect().item()
+        if rows >= SEED_BATCH_ROWS:
+            batches.append(batch)
+            batch, rows = [], 0
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def bench_seed(engine, files: list, reuse: bool) -> list:
+    """
+    Seeds the archive into an emptied database (unless reusing a seeded one),
+    then syncs it again, which finds every school unchanged.
+    """
+    seeded = False
+    if reuse and database_exists(engine.url):
+        with engine.connect() as connection:
+            seeded = (
+                engine.dialect.has_table(connection, "instructors")
+                and connection.execute(
+                    text("SELECT EXISTS (SELECT 1 FROM Instructors)")
+                ).scalar()
+            )
+    results = []
+    batches = seed_batches(files)
+    runs = [("seed unchanged", False)]
+    if not seeded:
+        prepare_database(engine)
+        runs.insert(0, ("seed", True))
+    for name, rate in runs:
+        with engine.connect() as connection:
+            seeding = Seeding(connection)
+            start = time.perf_counter()
+            rows = sum(seeding.bulk_seed_files(batch) for batch in batches)
+            seconds = time.perf_counter() - start
+        if rate:
+            results.append(result(name, rows / seconds, "rows/sec"))
+        else:
+            results.append(result(name, seconds, "s"))
+    return results
+
+
+def bench_autocomplete(scraped: list, searches: int) -> list:
+    index = SchoolSearchIndex(get_school_registry(), lambda: scraped, cache_size=0)
+    index.search("warm up", scraped=True)
+    return latency_results(
+        "autocomplete", measure(index, terms(searches), scraped=True)
+    )
+
+
+def bench_endpoints(database_url: str, requests: int) -> tuple:
+    """
+    Times uncached /school_plot, /box_plot and /departments_for_schools requests on random
+    schools of the database through the Flask test client. Returns the results and the
+    IDs of the scraped schools.
+    """
+    # The app reads its database when imported
+    os.environ["RMP_DATABASE_URL"] = database_url
+    import app as dashboard
+
+    client = dashboard.app.test_client()
+    scraped = sorted(dashboard.query_backend.scraped_school_ids())
+    registry = get_school_registry()
+    schools = [registry.name_for(school_id) for school_id in scraped]
+    rng = random.Random(0)
+
+    def timed_get(path: str):
+        dashboard.response_cache.clear()
+        start = time.perf_counter()
+        response = client.get(path)
+        return (time.perf_counter() - start) * 1000, response
+
+    timings = {"/school_plot": [], "/box_plot": [], "/departments_for_schools": []}
+    for _ in range(requests):
+        metric = rng.choice(["quality", "difficulty", "retake_percent"])
+        params = {
+            "school_name": rng.choice(schools),
+            "metric": metric,
+            "min_reviews": 0,
+        }
+        elapsed, _ = timed_get(f"/school_plot?{urlencode(params)}")
+        timings["/school_plot"].append(elapsed)
+        picked = [("schools[]", school) for school in rng.sample(schools, 3)]
+        elapsed, shared = timed_get(f"/departments_for_schools?{urlencode(picked)}")
+        timings["/departments_for_schools"].append(elapsed)
+        if shared.status_code == 200 and shared.get_json():
+            params = picked + [
+                ("department", rng.choice(shared.get_json())),
+                ("metric", metric),
+            ]
+            elapsed, _ = timed_get(f"/box_plot?{urlencode(params)}")
+            timings["/box_plot"].append(elapsed)
+    results = []
+    for endpoint, endpoint_timings in timings.items():
+        results.extend(latency_results(endpoint, endpoint_timings))
+    return results, scraped
+
+
+def run(args) -> None:
+    archive = archive_path(args.scale, args.seed)
+    manifest = synthetic_archive(archive, args.scale, args.seed)
+    database_url = (
+        args.database_url or f"postgresql:///rmp_bench_{scale_label(args.scale)}"
+    )
+    engine = create_engine(database_url)
+    files = sorted(archive.glob("*.parquet"))
+
+    results = bench_parse(args.repeats)
+    results += bench_seed(engine, files, args.reuse)
+    endpoint_results, scraped = bench_endpoints(database_url, args.requests)
+    results += bench_autocomplete(scraped, args.searches) + endpoint_results
+
+    report = {
+        "suite_version": SUITE_VERSION,
+        **commit_info(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": machine_info(),
+        "archive": manifest,
+        "results": results,
+    }
+    output = args.output or BENCH_PATH / "results" / (
+        f"{report['commit'][:10]}-{scale_label(args.scale)}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+
+    print(f"{'benchmark':<36}{'value':>14}  unit")
+    for entry in results:
+        print(f"{entry['name']:<36}{entry['value']:>14.2f}  {entry['unit']}")
+    print(f"Results written to {output}")
+
+
+def compare(old: dict, new: dict, threshold: float) -> int:
+    """
+    Prints each result's change between two runs and returns the number of regressions,
+    changes for the worse past threshold (a share of the old value).
+    """
+    if old["archive"] != new["archive"] or old["suite_version"] != new["suite_version"]:
+        print("Warning: the runs used different archives or suite versions")
+    if old["machine"] != new["machine"]:
+        print("Warning: the runs were on different machines or library versions")
+    print(
+        f"{old['commit'][:10]} -> {new['commit'][:10]}{' (dirty)' if new['dirty'] else ''}"
+    )
+    print(f"{'benchmark':<36}{'old':>12}{'new':>12}{'change':>10}")
+    old_results = {entry["name"]: entry for entry in old["results"]}
+    regressions = 0
+    for entry in new["results"]:
+        before = old_results.get(entry["name"])
+        if before is None or not before["value"]:
+            continue
+        change = entry["value"] / before["value"] - 1
+        worse = -change if entry["higher_is_better"] else change
+        flag = ""
+        if worse > threshold:
+            regressions += 1
+            flag = "  regression"
+        elif -worse > threshold:
+            flag = "  improvement"
+        print(
+            f"{entry['name']:<36}{before['value']:>12.2f}{entry['value']:>12.2f}"
+            f"{change:>+10.1%}{flag}"
+        )
+    print(f"{regressions} regressions past {threshold:.0%}")
+    return regressions
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = commands.add_parser(
+        "generate", help="Write synthetic parquet archives"
+    )
+    generate_parser.add_argument("--scale", type=float, action="append")
+    generate_parser.add_argument("--seed", type=int, default=0)
+
+    run_parser = commands.add_parser("run", help="Run the suite on one archive")
+    run_parser.add_argument("--scale", type=float, default=1)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument(
+        "--database-url",
+        help="Scratch database, postgresql:///rmp_bench_<scale>x by default",
+    )
+    run_parser.add_argument(
+        "--reuse",
+        action="store_true",
+        help="Skip the fresh seed when the database is seeded",
+    )
+    run_parser.add_argument(
+        "--repeats", type=int, default=5, help="Parses of each page"
+    )
+    run_parser.add_argument(
+        "--requests", type=int, default=200, help="Requests per endpoint"
+    )
+    run_parser.add_argument("--searches", type=int, default=2000)
+    run_parser.add_argument("--output", type=Path)
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("old", type=Path)
+    compare_parser.add_argument("new", type=Path)
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        for scale in args.scale or [1, 10, 100]:
+            print(synthetic_archive(archive_path(scale, args.seed), scale, args.seed))
+    elif args.command == "run":
+        run(args)
+    elif compare(
+        json.loads(args.old.read_text()),
+        json.loads(args.new.read_text()),
+        args.threshold,
+    ):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
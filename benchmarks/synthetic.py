@@ -0,0 +1,356 @@
+"""
+Generators for synthetic Rate My Professor data used by the benchmarks.
+Everything is seeded so repeated runs produce identical pages and archives.
+"""
+
+import json
+import math
+import random
+from pathlib import Path
+import polars as pl
+from src.parse_professors import PROFESSOR_SCHEMA, save_to_parquet, typed_professors
+from src.schools import get_school_registry
+
+ROOT = Path(__file__).parent.parent
+# Size of the bundled data/dataframes archive the synthetic archives are scaled from
+BUNDLED_SCHOOLS = 341
+BUNDLED_INSTRUCTORS = 148_302
+# Log-normal fit of the bundled archive's instructors per school (median 243, mean 436)
+SCHOOL_SIZE_MU = 5.49
+SCHOOL_SIZE_SIGMA = 1.08
+# Bumped whenever synthetic_archive generates different data, so old archives are rebuilt
+ARCHIVE_VERSION = 2
+
+DEPARTMENTS = [
+    "Computer Science",
+    "Mathematics",
+    "Biology",
+    "Chemistry",
+    "English",
+    "History",
+    "Psychology",
+    "Economics",
+    "Physics",
+    "Philosophy",
+    "Art",
+    "Music",
+]
+FIRST_NAMES = ["Alex", "Sam", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie"]
+LAST_NAMES = ["Smith", "Lee", "Garcia", "Chen", "Patel", "Brown", "Nguyen", "O'Neil"]
+
+CARD_TEMPLATE = """
+<a class="TeacherCard__StyledTeacherCard-syjs0d-0 dLJIlx" href="/professor/{legacy_id}">
+  <div class="TeacherCard__InfoRatingWrapper-syjs0d-3 kcbPEB">
+    <div class="TeacherCard__NumRatingWrapper-syjs0d-2 joEEbw">
+      <div class="CardNumRating__StyledCardNumRating-sc-17t4b9u-0 eWZmyX">
+        <div class="CardNumRating__CardNumRatingHeader-sc-17t4b9u-1 fVETNc">QUALITY</div>
+        <div class="CardNumRating__CardNumRatingNumber-sc-17t4b9u-2 bUneqk">{quality}</div>
+        <div class="CardNumRating__CardNumRatingCount-sc-17t4b9u-3 fulfGD">{num_ratings} ratings</div>
+      </div>
+    </div>
+    <div class="TeacherCard__CardInfo-syjs0d-1 fkdYMc">
+      <div class="CardName__StyledCardName-sc-1gyrgim-0 cJdVEK">{name}</div>
+      <div class="CardSchool__StyledCardSchool-sc-19lmz2k-2 gSWXyx">
+        <div class="CardSchool__Department-sc-19lmz2k-0 haUIRO">{department}</div>
+        <div class="CardSchool__School-sc-19lmz2k-1 iDlVGM">{school}</div>
+      </div>
+      <div class="CardFeedback__StyledCardFeedback-lq6nix-0 frciyA">
+        <div class="CardFeedback__CardFeedbackItem-lq6nix-1 fyKbws">
+          <div class="CardFeedback__CardFeedbackNumber-lq6nix-2 hroXqf">{again}</div> would take again
+        </div>
+        <div class="VerticalSeparator-sc-1l9ngcr-0 gYxPbQ"></div>
+        <div class="CardFeedback__CardFeedbackItem-lq6nix-1 fyKbws">
+          <div class="CardFeedback__CardFeedbackNumber-lq6nix-2 hroXqf">{difficulty}</div> level of difficulty
+        </div>
+      </div>
+    </div>
+  </div>
+</a>
+"""
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head><title>{school} | Rate My Professors</title></head>
+<body>
+<h1 data-testid="pagination-header-main-results">{count} professors at {school}</h1>
+<div class="SearchResultsPage__StyledResultsWrapper-vhbycj-4">
+{cards}
+</div>
+<button type="button">Show More</button>
+</body>
+</html>
+"""
+
+
+def synthetic_professor(rng: random.Random, school: str, legacy_id: int) -> dict:
+    """
+    Returns the fields of one random professor as strings, like they appear on a card.
+    """
+    num_ratings = rng.choice([0, 1, 2, 5, 12, 40, 150])
+    again = (
+        "N/A" if num_ratings == 0 or rng.random() < 0.2 else f"{rng.randint(0, 100)}%"
+    )
+    return {
+        "legacy_id": legacy_id,
+        "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "department": rng.choice(DEPARTMENTS),
+        "school": school,
+        "quality": f"{rng.uniform(1, 5):.1f}",
+        "num_ratings": num_ratings,
+        "again": again,
+        "difficulty": f"{rng.uniform(1, 5):.1f}",
+    }
+
+
+def synthetic_professors(num_cards: int, school: str, seed=0) -> list:
+    """
+    Returns the professors synthetic_page renders for the same arguments.
+    """
+    rng = random.Random(seed)
+    return [
+        synthetic_professor(rng, school, seed * 100_000 + i) for i in range(num_cards)
+    ]
+
+
+def synthetic_page(num_cards: int, school: str = "Synthetic University", seed=0) -> str:
+    """
+    Builds an RMP style search results page with the given number of teacher cards.
+    Uses the same TeacherCard__* and CardFeedback__* class names as the real page.
+    """
+    cards = [
+        CARD_TEMPLATE.format(**professor)
+        for professor in synthetic_professors(num_cards, school, seed)
+    ]
+    return PAGE_TEMPLATE.format(school=school, count=num_cards, cards="".join(cards))
+
+
+def synthetic_records(
+    num_cards: int, school: str = "Synthetic University", seed=0
+) -> list:
+    """
+    Returns the card records the browser extracts from synthetic_page's cards
+    (see EXTRACT_CARDS_SCRIPT in src/scraping.py).
+    """
+    return [
+        [
+            p["name"],
+            p["department"],
+            p["school"],
+            p["quality"],
+            f"{p['num_ratings']} ratings",
+            p["again"],
+            p["difficulty"],
+            f"/professor/{p['legacy_id']}",
+        ]
+        for p in synthetic_professors(num_cards, school, seed)
+    ]
+
+
+# Loads the cards of the JSON array in pages of 8 per Show More click, like RMP's search page
+SHOW_MORE_PAGE_SCRIPT = """
+<script>
+const pending = {cards};
+const results = document.getElementById("results");
+document.getElementById("show-more").addEventListener("click", () => {{
+    // After the click returns, like React rendering the next page of results
+    setTimeout(() => {{
+        results.insertAdjacentHTML("beforeend", pending.splice(0, 8).join(""));
+    }}, 0);
+}});
+</script>
+"""
+
+
+def synthetic_show_more_page(
+    num_cards: int, school: str = "Synthetic University", seed=0
+) -> str:
+    """
+    Builds a page showing the first 8 of synthetic_page's cards,
+    each Show More click adding the next 8 to it.
+    """
+    cards = [
+        CARD_TEMPLATE.format(**professor)
+        for professor in synthetic_professors(num_cards, school, seed)
+    ]
+    page = PAGE_TEMPLATE.format(
+        school=school, count=num_cards, cards="".join(cards[:8])
+    )
+    page = page.replace(
+        '<div class="SearchResultsPage', '<div id="results" class="SearchResultsPage'
+    )
+    page = page.replace(
+        '<button type="button">', '<button id="show-more" type="button">'
+    )
+    return page.replace(
+        "</body>", SHOW_MORE_PAGE_SCRIPT.format(cards=json.dumps(cards[8:])) + "</body>"
+    )
+
+
+def synthetic_dataframe(
+    num_cards: int, school: str = "Synthetic University", seed=0
+) -> pl.DataFrame:
+    """
+    Returns the professors parse_professors should find on
+    synthetic_page(num_cards, school, seed), built from the generated values
+    rather than from the page, so the parsers can be checked against them.
+    """
+    professors = synthetic_professors(num_cards, school, seed)
+    return typed_professors(
+        pl.DataFrame(
+            {
+                "Name": [p["name"] for p in professors],
+                "Department": [p["department"] for p in professors],
+                "School": [p["school"] for p in professors],
+                "Quality": [p["quality"] for p in professors],
+                "# of Ratings": [str(p["num_ratings"]) for p in professors],
+                "Would Take Again (%)": [
+                    None if p["again"] == "N/A" else p["again"].strip("%")
+                    for p in professors
+                ],
+                "Difficulty": [p["difficulty"] for p in professors],
+                "Professor ID": [str(p["legacy_id"]) for p in professors],
+            },
+            schema={column: pl.String for column in PROFESSOR_SCHEMA},
+        )
+    )
+
+
+def synthetic_instructors(
+    num_schools: int, instructors_per_school: int, num_departments: int = 60, seed=0
+) -> pl.DataFrame:
+    """
+    Builds a dataframe of instructors in the Instructors table layout
+    (instructor_name, department_id, school_id, quality, total_ratings,
+    retake_percent, difficulty) for schools 1..num_schools and departments 1..num_departments.
+    """
+    rng = random.Random(seed)
+    rows = num_schools * instructors_per_school
+    return pl.DataFrame(
+        {
+            "instructor_name": [f"Instructor {i}" for i in range(rows)],
+            "department_id": [rng.randint(1, num_departments) for _ in range(rows)],
+            "school_id": [i // instructors_per_school + 1 for i in range(rows)],
+            "quality": [round(rng.uniform(1, 5), 1) for _ in range(rows)],
+            "total_ratings": [rng.randrange(200) for _ in range(rows)],
+            "retake_percent": [
+                None if rng.random() < 0.2 else rng.randint(0, 100) for _ in range(rows)
+            ],
+            "difficulty": [round(rng.uniform(1, 5), 1) for _ in range(rows)],
+        },
+        schema={
+            "instructor_name": pl.String,
+            "department_id": pl.Int64,
+            "school_id": pl.Int64,
+            "quality": pl.Float64,
+            "total_ratings": pl.Int64,
+            "retake_percent": pl.Int64,
+            "difficulty": pl.Float64,
+        },
+    )
+
+
+def archive_departments(data_dir: Path = ROOT / "data/dataframes") -> pl.Series:
+    """
+    Returns the department names of the bundled archive, each repeated once per
+    instructor so sampling them gives the real mix of departments and spellings.
+    Falls back to DEPARTMENTS without the archive.
+    """
+    files = sorted(Path(data_dir).glob("*.parquet"))
+    if not files:
+        return pl.Series("Department", DEPARTMENTS)
+    departments = pl.concat(
+        # Typed files have categories of their own, so they're joined as strings
+        [
+            pl.read_parquet(file, columns=["Department"]).cast(pl.String)
+            for file in files
+        ],
+        how="vertical_relaxed",
+    )["Department"].drop_nulls()
+    # Sorted so the pool doesn't depend on the order the files were read in
+    return departments.sort()
+
+
+def synthetic_school(
+    school: str, size: int, departments: pl.Series, first_id: int, seed: int
+) -> pl.DataFrame:
+    """
+    Builds one school's professors as parse_professors would from card text.
+    """
+
+    def sample(values, offset: int) -> pl.Series:
+        values = values if isinstance(values, pl.Series) else pl.Series(values)
+        return values.sample(size, with_replacement=True, seed=seed * 10 + offset)
+
+    ratings = [str(n) for n in (0, 1, 2, 5, 12, 40, 150)]
+    # A fifth of the professors have no would take again percentage
+    again = [str(n) for n in range(101)] + [None] * 25
+    scores = [f"{n / 10:.1f}" for n in range(10, 51)]
+    return typed_professors(
+        pl.DataFrame(
+            {
+                "Name": sample(FIRST_NAMES, 0) + " " + sample(LAST_NAMES, 1),
+                "Department": sample(departments, 2),
+                "School": [school] * size,
+                "Quality": sample(scores, 3),
+                "# of Ratings": sample(ratings, 4),
+                "Would Take Again (%)": sample(pl.Series(again, dtype=pl.String), 5),
+                "Difficulty": sample(scores, 6),
+                "Professor ID": [str(first_id + i) for i in range(size)],
+            },
+            schema={column: pl.String for column in PROFESSOR_SCHEMA},
+        )
+    )
+
+
+def synthetic_archive(output_dir: Path, scale: float, seed=0) -> dict:
+    """
+    Writes a parquet file per school in the layout of data/dataframes,
+    with scale times the bundled archive's instructors.
+    Schools are real names of the school registry (seeding skips unknown schools),
+    scale times the bundled 341 up to every school in the registry, past which
+    the schools grow instead. School sizes follow the bundled archive's.
+
+    The manifest (version, scale, seed, schools and instructors) is written last,
+    an archive with the same manifest is reused as is. Returns the manifest.
+    """
+    output_dir = Path(output_dir)
+    manifest_file = output_dir / "manifest.json"
+    names = sorted(set(get_school_registry().names().values()))
+    num_schools = min(round(BUNDLED_SCHOOLS * scale), len(names))
+    instructors = round(BUNDLED_INSTRUCTORS * scale)
+    manifest = {
+        "version": ARCHIVE_VERSION,
+        "scale": scale,
+        "seed": seed,
+        "schools": num_schools,
+        "instructors": instructors,
+    }
+    if manifest_file.exists() and json.loads(manifest_file.read_text()) == manifest:
+        return manifest
+
+    rng = random.Random(seed)
+    schools = rng.sample(names, num_schools)
+    # Cut off where the bundled archive's largest school is, around 2.5 sigmas
+    largest = math.exp(SCHOOL_SIZE_MU + 2.5 * SCHOOL_SIZE_SIGMA)
+    weights = [
+        min(rng.lognormvariate(SCHOOL_SIZE_MU, SCHOOL_SIZE_SIGMA), largest)
+        for _ in schools
+    ]
+    # Every school gets at least one professor, the rest are shared out by weight
+    sizes = [
+        1 + math.floor(w / sum(weights) * (instructors - num_schools)) for w in weights
+    ]
+    sizes[0] += instructors - sum(sizes)
+
+    departments = archive_departments()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_file.unlink(missing_ok=True)
+    for stale in output_dir.glob("*.parquet"):
+        stale.unlink()
+    first_id = 1
+    for i, (school, size) in enumerate(zip(schools, sizes)):
+        df = synthetic_school(school, size, departments, first_id, seed * 1_000_000 + i)
+        save_to_parquet(df, output_dir / f"{i:05d}.parquet")
+        first_id += size
+    manifest_file.write_text(json.dumps(manifest))
+    return manifest
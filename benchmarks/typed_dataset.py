@@ -0,0 +1,181 @@
+"""
+Size and load time of the typed parquet files and dataset against the string ones.
+
+Copies the per school files of data/dataframes, saved as strings before professors were
+typed, and migrates the copy like python -m src.dataset --migrate. Both are loaded the way
+seeding and consolidation read them, typed. The string files have to be parsed on every
+load.
+
+Then consolidates them into a typed dataset and rewrites it with the column types it had
+before (64-bit floats and integers). Both are scanned in full and queried through the
+parquet backend, which has to give the same answers for every school.
+
+Usage:
+    python -m benchmarks.typed_dataset
+    python -m benchmarks.typed_dataset --data-dir data/dataframes --repeats 10
+"""
+
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+import polars as pl
+from src.backends import METRICS, ParquetBackend
+from src.dataset import (
+    QUERY_SCHEMA,
+    consolidate_dataset,
+    migrate_dataframes,
+    partition_path,
+    partitioned_school_ids,
+    scan_dataset,
+    write_school_partition,
+)
+from src.parse_professors import typed_professors
+from src.schools import get_school_registry
+
+ROOT = Path(__file__).parent.parent
+
+
+def directory_size(path: Path) -> int:
+    return sum(file.stat().st_size for file in Path(path).rglob("*.parquet"))
+
+
+def median_seconds(call, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def load_files(files: list) -> int:
+    # Read like Seeding.sync_dataframes and consolidate_dataset read them
+    return sum(typed_professors(pl.read_parquet(file)).height for file in files)
+
+
+def untyped_dataset(dataset_path: Path, output_path: Path) -> None:
+    """
+    Copies a dataset with its columns at the types they had before the dataset was typed.
+    """
+    shutil.copytree(dataset_path, output_path)
+    for school_id in partitioned_school_ids(output_path):
+        df = pl.read_parquet(partition_path(output_path, school_id))
+        write_school_partition(
+            output_path,
+            school_id,
+            df.select(
+                pl.col(column).cast(dtype) for column, dtype in QUERY_SCHEMA.items()
+            ),
+        )
+
+
+def backend_answers(dataset_path: Path) -> tuple:
+    """
+    Returns the seconds taken to ask the parquet backend for the department averages and
+    a department's values of every school in the dataset, with the answers.
+    """
+    backend = ParquetBackend(dataset_path)
+    registry = get_school_registry()
+    answers = []
+    start = time.perf_counter()
+    for school_id in sorted(partitioned_school_ids(dataset_path)):
+        school = registry.name_for(school_id)
+        for metric in METRICS:
+            # Departments tied on their average come back in any order
+            answers.append(
+                sorted(backend.department_averages(school, metric, 0), key=str)
+            )
+        departments = backend.shared_departments([school])
+        if departments:
+            values = backend.metric_values([school], departments[0], "quality")
+            answers.append(sorted(values["value"].to_list()))
+    return time.perf_counter() - start, answers
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--data-dir", type=Path, default=ROOT / "data/dataframes")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        string_files = sorted(args.data_dir.glob("*.parquet"))
+        typed_dir = directory / "dataframes"
+        shutil.copytree(args.data_dir, typed_dir)
+        migrate_dataframes(typed_dir)
+        typed_files = sorted(typed_dir.glob("*.parquet"))
+        consolidate_dataset(typed_dir, directory / "dataset")
+        untyped_dataset(directory / "dataset", directory / "untyped")
+
+        string_frame = pl.concat(
+            [pl.read_parquet(file) for file in string_files], how="diagonal_relaxed"
+        )
+        # The typed files' categoricals share their categories once read under a string cache
+        with pl.StringCache():
+            typed_frame = pl.concat([pl.read_parquet(file) for file in typed_files])
+        rows = [
+            (
+                f"{len(string_files)} per school files",
+                directory_size(args.data_dir),
+                directory_size(typed_dir),
+                median_seconds(lambda: load_files(string_files), args.repeats),
+                median_seconds(lambda: load_files(typed_files), args.repeats),
+            ),
+            (
+                "professors in memory",
+                string_frame.estimated_size(),
+                typed_frame.estimated_size(),
+                None,
+                None,
+            ),
+        ]
+        timings = {}
+        for layout in ("untyped", "dataset"):
+            paths = [
+                partition_path(directory / layout, school_id)
+                for school_id in partitioned_school_ids(directory / layout)
+            ]
+            timings[layout] = median_seconds(
+                lambda: scan_dataset(paths).collect(), args.repeats
+            )
+        rows.append(
+            (
+                f"{len(paths)} dataset partitions",
+                directory_size(directory / "untyped"),
+                directory_size(directory / "dataset"),
+                timings["untyped"],
+                timings["dataset"],
+            )
+        )
+        untyped_seconds, untyped_answers = backend_answers(directory / "untyped")
+        typed_seconds, typed_answers = backend_answers(directory / "dataset")
+        rows.append(
+            ("parquet backend queries", None, None, untyped_seconds, typed_seconds)
+        )
+
+    # Before is the string files and the dataset with 64-bit columns, after the typed ones
+    print(f"{'':<28}{'before MB':>12}{'after MB':>10}{'before s':>11}{'after s':>9}")
+    for name, size_before, size_after, seconds_before, seconds_after in rows:
+        sizes = (
+            f"{size_before / 1e6:>12.2f}{size_after / 1e6:>10.2f}"
+            if size_before is not None
+            else " " * 22
+        )
+        seconds = (
+            f"{seconds_before:>11.3f}{seconds_after:>9.3f}"
+            if seconds_before is not None
+            else ""
+        )
+        print(f"{name:<28}{sizes}{seconds}")
+    mismatches = sum(a != b for a, b in zip(untyped_answers, typed_answers))
+    print(f"Typed vs untyped dataset answers: {mismatches} mismatches")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
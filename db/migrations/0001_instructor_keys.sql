@@ -0,0 +1,29 @@
+-- Identifies an instructor within their school across scrapes:
+-- the RMP professor ID ("rmp:12345") when known, otherwise "name|department"
+-- Repeats of the same key within a school are numbered "#2", "#3", ...
+ALTER TABLE Instructors ADD COLUMN IF NOT EXISTS instructor_key TEXT;
+
+-- Instructors loaded before keys existed are keyed by name and department
+WITH unkeyed AS (
+    SELECT i.instructor_id, i.school_id,
+            COALESCE(i.instructor_name, '') || '|' || COALESCE(d.department_name, '') AS base_key
+    FROM Instructors i
+    LEFT JOIN Departments d ON i.department_id = d.department_id
+    WHERE i.instructor_key IS NULL
+), keyed AS (
+    SELECT instructor_id, base_key,
+            ROW_NUMBER() OVER (
+                PARTITION BY school_id, base_key ORDER BY instructor_id
+            ) AS occurrence
+    FROM unkeyed
+)
+UPDATE Instructors
+SET instructor_key = CASE
+    WHEN keyed.occurrence = 1 THEN keyed.base_key
+    ELSE keyed.base_key || '#' || keyed.occurrence
+END
+FROM keyed
+WHERE Instructors.instructor_id = keyed.instructor_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS instructors_school_key
+    ON Instructors (school_id, instructor_key);
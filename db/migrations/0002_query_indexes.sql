@@ -0,0 +1,15 @@
+-- Every dashboard query starts from school names: /school_plot, /box_plot and
+-- /departments_for_schools all look schools up by name
+CREATE INDEX IF NOT EXISTS schools_name ON Schools (school_name);
+
+-- /box_plot reads one metric of the instructors of a department at a few schools,
+-- /departments_for_schools groups the departments of a few schools and the
+-- DepartmentStats refresh sums the metrics of a school's departments.
+-- Leading with school_id then department_id serves all three, and including the
+-- metrics lets them be answered from the index alone
+CREATE INDEX IF NOT EXISTS instructors_school_department
+    ON Instructors (school_id, department_id)
+    INCLUDE (quality, difficulty, retake_percent, total_ratings);
+
+ANALYZE Schools;
+ANALYZE Instructors;
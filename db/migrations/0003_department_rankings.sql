@@ -0,0 +1,19 @@
+-- /department_leaderboard ranks every school's rollup row of one department
+CREATE INDEX IF NOT EXISTS departmentstats_department
+    ON DepartmentStats (department_id)
+    INCLUDE (
+        quality_weighted_sum,
+        difficulty_weighted_sum,
+        retake_percent_weighted_sum,
+        total_ratings,
+        instructor_count
+    );
+
+-- /instructor_percentile ranks an instructor against their department nationally,
+-- reading the metrics of every instructor of the department from the index alone
+CREATE INDEX IF NOT EXISTS instructors_department
+    ON Instructors (department_id)
+    INCLUDE (quality, difficulty, retake_percent, total_ratings);
+
+ANALYZE DepartmentStats;
+ANALYZE Instructors;
@@ -0,0 +1,10 @@
+-- Departments of databases created before aliases existed are aliases of themselves,
+-- duplicate spellings among them are merged on start (see Seeding.canonicalize_departments)
+INSERT INTO DepartmentAliases (alias, department_id)
+SELECT department_name, department_id
+FROM Departments
+WHERE department_name IS NOT NULL
+ON CONFLICT (alias) DO NOTHING;
+
+CREATE INDEX IF NOT EXISTS departmentaliases_department
+    ON DepartmentAliases (department_id);
@@ -1,16 +1,28 @@
-CREATE TABLE Departments (
+-- Tables of a new database, created if missing on every start
+-- Changes to existing tables go in db/migrations, applied once each by src/migrations.py
+
+CREATE TABLE IF NOT EXISTS Departments (
     department_id SERIAL PRIMARY KEY,
-    department_name VARCHAR(255)
+    department_name VARCHAR(255),
+    CONSTRAINT unique_department UNIQUE (department_name)
+);
+
+-- Every spelling of a department scraped (i.e. "Computer Sci" and "CS") and the
+-- canonical department it was normalized to by src/departments.py,
+-- canonical names are aliases of themselves
+CREATE TABLE IF NOT EXISTS DepartmentAliases (
+    alias VARCHAR(255) PRIMARY KEY,
+    department_id INT NOT NULL,
+    FOREIGN KEY (department_id) REFERENCES Departments(department_id)
 );
-ALTER TABLE Departments ADD CONSTRAINT unique_department UNIQUE (department_name);
 
 
-CREATE TABLE Schools (
+CREATE TABLE IF NOT EXISTS Schools (
     school_id INT PRIMARY KEY,
     school_name VARCHAR(255)
 );
 
-CREATE TABLE Instructors (
+CREATE TABLE IF NOT EXISTS Instructors (
     instructor_id SERIAL PRIMARY KEY,
     instructor_name VARCHAR(255),
     department_id INT,
@@ -22,3 +34,29 @@ CREATE TABLE Instructors (
     FOREIGN KEY (department_id) REFERENCES Departments(department_id),
     FOREIGN KEY (school_id) REFERENCES Schools(school_id)
 );
+
+-- Rating weighted sums per school department, refreshed whenever a school is seeded
+-- The sums keep the types of SUM(metric * total_ratings) over Instructors
+CREATE TABLE IF NOT EXISTS DepartmentStats (
+    school_id INT,
+    department_id INT,
+    quality_weighted_sum NUMERIC,
+    difficulty_weighted_sum NUMERIC,
+    retake_percent_weighted_sum BIGINT,
+    total_ratings BIGINT NOT NULL,
+    instructor_count INT NOT NULL,
+    PRIMARY KEY (school_id, department_id),
+    FOREIGN KEY (department_id) REFERENCES Departments(department_id),
+    FOREIGN KEY (school_id) REFERENCES Schools(school_id)
+);
+
+-- When each school was last scraped and a hash of its professors at the time,
+-- so a scrape that finds nothing new skips every write
+CREATE TABLE IF NOT EXISTS ScrapeState (
+    school_id INT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    instructor_count INT NOT NULL,
+    last_scraped_at TIMESTAMPTZ NOT NULL,
+    last_changed_at TIMESTAMPTZ NOT NULL,
+    FOREIGN KEY (school_id) REFERENCES Schools(school_id)
+);
@@ -0,0 +1,345 @@
+import argparse
+import asyncio
+import base64
+import json
+import random
+from pathlib import Path
+import httpx
+import polars as pl
+from src.metrics import API_PAGES, CARDS_PARSED, timed
+from src.parse_professors import professors_from_columns, save_to_parquet
+
+API_URL = "https://www.ratemyprofessors.com/graphql"
+# The public token the RMP web app sends with its own GraphQL requests
+AUTHORIZATION = "Basic dGVzdDp0ZXN0"
+
+TEACHER_SEARCH_QUERY = """
+query TeacherSearchPaginationQuery($count: Int!, $cursor: String, $query: TeacherSearchQuery!) {
+  search: newSearch {
+    teachers(query: $query, first: $count, after: $cursor) {
+      resultCount
+      edges {
+        node {
+          legacyId
+          firstName
+          lastName
+          department
+          avgRating
+          numRatings
+          wouldTakeAgainPercent
+          avgDifficulty
+          school { name }
+        }
+      }
+      pageInfo { hasNextPage endCursor }
+    }
+  }
+}
+"""
+
+# Responses worth retrying, anything else is a failed scrape
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class ApiScrapeError(Exception):
+    """
+    Raised when a school can't be fetched from the GraphQL API,
+    callers fall back to scraping the page with Selenium.
+    """
+
+
+def school_node_id(school_id: int) -> str:
+    """
+    Returns the GraphQL ID of a school (i.e. 1234 -> base64 of "School-1234")
+    """
+    return base64.b64encode(f"School-{school_id}".encode()).decode()
+
+
+async def post_graphql(
+    client: httpx.AsyncClient,
+    url: str,
+    payload: dict,
+    retries: int = 4,
+    backoff: float = 0.5,
+    label: str = "Request",
+) -> dict:
+    """
+    Posts a GraphQL query and returns the data of the response.
+    Timeouts, 429s and 5xx responses are retried with exponential backoff and jitter,
+    starting at backoff seconds. Raises ApiScrapeError once the retries run out,
+    or when the response isn't a GraphQL result with data.
+    """
+    for attempt in range(retries + 1):
+        delay = backoff * 2**attempt * (1 + random.random() / 2)
+        try:
+            response = await client.post(url, json=payload)
+        except httpx.TransportError as e:
+            error = f"{type(e).__name__}: {e}"
+        # i.e. a DecodingError or TooManyRedirects, which a retry won't fix
+        except httpx.HTTPError as e:
+            raise ApiScrapeError(f"{label}: {type(e).__name__}: {e}") from e
+        else:
+            if response.status_code == 200:
+                break
+            error = f"HTTP {response.status_code}"
+            if response.status_code not in RETRY_STATUSES:
+                raise ApiScrapeError(f"{label}: {error}")
+            # Rate limited responses say how long to wait
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                delay = max(delay, int(retry_after))
+        if attempt == retries:
+            raise ApiScrapeError(f"{label}: {error} after {retries} retries")
+        await asyncio.sleep(delay)
+
+    # A 200 from a proxy or an error page can carry html instead of JSON
+    try:
+        body = response.json()
+    except ValueError:
+        content_type = response.headers.get("Content-Type", "no content type")
+        raise ApiScrapeError(f"{label}: response isn't JSON ({content_type})")
+    if not isinstance(body, dict):
+        raise ApiScrapeError(f"{label}: unexpected response {body}")
+    if body.get("errors"):
+        raise ApiScrapeError(f"{label}: {body['errors'][0].get('message')}")
+    if not isinstance(body.get("data"), dict):
+        raise ApiScrapeError(f"{label}: unexpected response {body}")
+    return body["data"]
+
+
+def _rating(value) -> str:
+    return None if value is None else f"{float(value):.1f}"
+
+
+def professors_dataframe(nodes: list) -> pl.DataFrame:
+    """
+    Converts teacher nodes from the API into the dataframe parse_professors builds from a page.
+    Values are formatted like the text of the teacher cards.
+    """
+    CARDS_PARSED.inc(len(nodes), engine="api")
+    would_take_agains = []
+    for node in nodes:
+        # The API marks professors without a would take again percentage with -1
+        percent = node.get("wouldTakeAgainPercent")
+        would_take_agains.append(
+            None if percent is None or percent < 0 else str(round(percent))
+        )
+    return professors_from_columns(
+        [
+            f"{node.get('firstName', '')} {node.get('lastName', '')}".strip()
+            for node in nodes
+        ],
+        [node.get("department") for node in nodes],
+        [(node.get("school") or {}).get("name") for node in nodes],
+        [_rating(node.get("avgRating")) for node in nodes],
+        [str(node.get("numRatings") or 0) for node in nodes],
+        would_take_agains,
+        [_rating(node.get("avgDifficulty")) for node in nodes],
+        [
+            None if node.get("legacyId") is None else str(node["legacyId"])
+            for node in nodes
+        ],
+    )
+
+
+class ApiScraper:
+    """
+    Fetches professors straight from the GraphQL API that backs the RMP search page,
+    skipping the headless browser and its "Show More" clicks.
+
+    Pages of up to page_size professors are requested through a pooled async httpx client.
+    Timeouts, 429s and 5xx responses are retried with exponential backoff.
+    base_url can point at a local replay server (see benchmarks/rmp_stub.py),
+    and record_dir saves every response so it can be replayed later.
+    """
+
+    def __init__(
+        self,
+        base_url: str = API_URL,
+        page_size: int = 1000,
+        concurrency: int = 4,
+        retries: int = 4,
+        backoff: float = 0.5,
+        timeout: float = 30,
+        record_dir: Path = None,
+    ):
+        self.base_url = base_url
+        self.page_size = page_size
+        # Number of schools fetched at the same time by fetch_schools
+        self.concurrency = concurrency
+        self.retries = retries
+        # Seconds before the first retry, doubled for every retry after
+        self.backoff = backoff
+        self.timeout = timeout
+        self.record_dir = Path(record_dir) if record_dir else None
+
+    def client(self) -> httpx.AsyncClient:
+        """
+        Returns a client whose connections are kept alive across pages and schools.
+        """
+        return httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.concurrency * 2),
+            headers={"Authorization": AUTHORIZATION},
+        )
+
+    async def fetch_page(
+        self, client: httpx.AsyncClient, school_id: int, cursor: str = None
+    ) -> dict:
+        """
+        Requests one page of a school's professors and returns the teachers connection
+        (resultCount, edges and pageInfo).
+        """
+        variables = {
+            "count": self.page_size,
+            "cursor": cursor,
+            "query": {
+                "text": "",
+                "schoolID": school_node_id(school_id),
+                "fallback": True,
+            },
+        }
+        payload = {"query": TEACHER_SEARCH_QUERY, "variables": variables}
+        data = await post_graphql(
+            client,
+            self.base_url,
+            payload,
+            self.retries,
+            self.backoff,
+            f"School {school_id}",
+        )
+        try:
+            teachers = data["search"]["teachers"]
+        except (KeyError, TypeError):
+            raise ApiScrapeError(f"School {school_id}: unexpected response {data}")
+        API_PAGES.inc()
+        if self.record_dir:
+            self._record(school_id, variables, {"data": data})
+        return teachers
+
+    async def fetch_school(
+        self, client: httpx.AsyncClient, school_id: int, progress=None
+    ) -> list:
+        """
+        Follows the page cursors until every professor of a school is fetched.
+        Reports the professor count and pages done through the progress callback,
+        with the same keywords as ProfessorScraper.read_page_source.
+        Returns the teacher nodes.
+        """
+        nodes = []
+        cursor = None
+        pages_done = 0
+        while True:
+            teachers = await self.fetch_page(client, school_id, cursor)
+            nodes.extend(edge["node"] for edge in teachers.get("edges") or [])
+            pages_done += 1
+            if progress:
+                if pages_done == 1:
+                    total = teachers.get("resultCount") or 0
+                    progress(
+                        total_professors=total,
+                        total_clicks=max(1, -(-total // self.page_size)),
+                    )
+                progress(clicks_done=pages_done)
+            page_info = teachers.get("pageInfo") or {}
+            next_cursor = page_info.get("endCursor")
+            # A cursor that doesn't move would request the same page forever
+            if (
+                not page_info.get("hasNextPage")
+                or not next_cursor
+                or next_cursor == cursor
+            ):
+                return nodes
+            cursor = next_cursor
+
+    async def fetch_professors(
+        self, client: httpx.AsyncClient, school_id: int, progress=None
+    ) -> pl.DataFrame:
+        """
+        Fetches a school's professors as a dataframe (see fetch_school).
+        Pages or teacher nodes of an unexpected shape raise ApiScrapeError
+        like any other unusable response.
+        """
+        try:
+            return professors_dataframe(
+                await self.fetch_school(client, school_id, progress=progress)
+            )
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            raise ApiScrapeError(
+                f"School {school_id}: unexpected response ({type(e).__name__}: {e})"
+            ) from e
+
+    async def fetch_schools(self, school_ids: list) -> dict:
+        """
+        Fetches several schools concurrently over one connection pool.
+        Returns a dict of school ID to its dataframe, or to the ApiScrapeError it failed with.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(client, school_id):
+            async with semaphore:
+                try:
+                    return await self.fetch_professors(client, school_id)
+                except ApiScrapeError as e:
+                    return e
+
+        async with self.client() as client:
+            results = await asyncio.gather(
+                *(fetch(client, school_id) for school_id in school_ids)
+            )
+        return dict(zip(school_ids, results))
+
+    @timed("api_scrape")
+    def scrape_school(self, school_id: int, progress=None) -> pl.DataFrame:
+        """
+        Blocking helper for worker threads, returns a school's professors as a dataframe.
+        """
+
+        async def run():
+            async with self.client() as client:
+                return await self.fetch_professors(client, school_id, progress=progress)
+
+        return asyncio.run(run())
+
+    def scrape_schools(self, school_ids: list) -> dict:
+        """
+        Blocking version of fetch_schools.
+        """
+        return asyncio.run(self.fetch_schools(school_ids))
+
+    def _record(self, school_id: int, variables: dict, body: dict) -> None:
+        self.record_dir.mkdir(parents=True, exist_ok=True)
+        page = len(list(self.record_dir.glob(f"{school_id}-*.json")))
+        path = self.record_dir / f"{school_id}-{page:04d}.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"variables": variables, "response": body}, f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Fetch schools' professors from the RMP GraphQL API into parquet files."
+    )
+    parser.add_argument("school_ids", type=int, nargs="+")
+    parser.add_argument("--output", type=Path, default=Path("data/dataframes"))
+    parser.add_argument("--base-url", default=API_URL)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--record", type=Path, help="Save the raw responses here for replaying"
+    )
+    args = parser.parse_args()
+
+    scraper = ApiScraper(
+        args.base_url,
+        page_size=args.page_size,
+        concurrency=args.concurrency,
+        record_dir=args.record,
+    )
+    args.output.mkdir(parents=True, exist_ok=True)
+    for school_id, result in scraper.scrape_schools(args.school_ids).items():
+        if isinstance(result, ApiScrapeError):
+            print(f"Failed to fetch school {school_id}: {result}")
+            continue
+        school_name = result["School"][0] if result.height else str(school_id)
+        save_to_parquet(result, args.output / f"{school_name}.parquet")
+        print(f"Saved {result.height} professors of {school_name}")
@@ -0,0 +1,741 @@
+from pathlib import Path
+import anyio
+import polars as pl
+from sqlalchemy.sql import text
+from src.dataset import (
+    DEPARTMENT_ALIASES_FILE,
+    partition_paths,
+    partitioned_school_ids,
+    read_department_aliases,
+    scan_dataset,
+)
+from src.schools import get_school_registry
+
+# Instructor columns that can be plotted, also used to build the queries
+METRICS = ("difficulty", "quality", "retake_percent")
+
+
+# Queries of the Postgres backends, {metric} is one of METRICS
+# A requested department is looked up by any of its spellings in DepartmentAliases
+# and joined on its canonical department_id
+DEPARTMENT_AVERAGES_QUERY = """
+    SELECT d.department_name,
+            ROUND(ds.{metric}_weighted_sum / NULLIF(ds.total_ratings, 0), 2) AS avg_metric,
+            ds.total_ratings
+    FROM DepartmentStats ds
+    JOIN Departments d ON ds.department_id = d.department_id
+    JOIN Schools s ON ds.school_id = s.school_id
+    WHERE s.school_name = :school_name
+    AND ds.total_ratings >= :minReviews
+    ORDER BY avg_metric DESC
+"""
+METRIC_VALUES_QUERY = """
+    SELECT s.school_name, CAST(i.{metric} AS DOUBLE PRECISION)
+    FROM Instructors i
+    JOIN DepartmentAliases a ON i.department_id = a.department_id
+    JOIN Schools s ON i.school_id = s.school_id
+    WHERE s.school_name = ANY(:schools) AND a.alias = :dept AND i.{metric} IS NOT NULL
+"""
+# Finding the departments shared across all schools
+SHARED_DEPARTMENTS_QUERY = """
+    SELECT department_name
+    FROM Departments
+    JOIN Instructors ON Instructors.department_id = Departments.department_id
+    JOIN Schools ON Schools.school_id = Instructors.school_id
+    WHERE Schools.school_name = ANY(:schools)
+    GROUP BY department_name
+    HAVING COUNT(DISTINCT Schools.school_name) = :num_schools
+"""
+# Schools ranked by a department's rating weighted average, {direction} is ASC or DESC
+DEPARTMENT_LEADERBOARD_QUERY = """
+    SELECT RANK() OVER (ORDER BY avg_metric {direction}) AS rank,
+            school_name, avg_metric, total_ratings, instructor_count,
+            COUNT(*) OVER () AS total
+    FROM (
+        SELECT s.school_name,
+                ROUND(ds.{metric}_weighted_sum / ds.total_ratings, 2) AS avg_metric,
+                ds.total_ratings, ds.instructor_count
+        FROM DepartmentStats ds
+        JOIN DepartmentAliases a ON ds.department_id = a.department_id
+        JOIN Schools s ON ds.school_id = s.school_id
+        WHERE a.alias = :department
+        AND ds.total_ratings >= :min_reviews
+        AND ds.total_ratings > 0
+        AND ds.{metric}_weighted_sum IS NOT NULL
+    ) averages
+    ORDER BY rank, school_name COLLATE "C"
+    LIMIT :limit OFFSET :offset
+"""
+LEADERBOARD_SIZE_QUERY = """
+    SELECT COUNT(*)
+    FROM DepartmentStats ds
+    JOIN DepartmentAliases a ON ds.department_id = a.department_id
+    WHERE a.alias = :department
+    AND ds.total_ratings >= :min_reviews
+    AND ds.total_ratings > 0
+    AND ds.{metric}_weighted_sum IS NOT NULL
+"""
+# Where instructors sit among their department's instructors at every school:
+# for each metric the fraction of the others with a lower value (PERCENT_RANK
+# among the others and the instructor) and how many others have a value.
+# Counted in one pass over the department instead of ranking it three times.
+INSTRUCTOR_PERCENTILES_QUERY = """
+    SELECT s.school_name, t.instructor_name, d.department_name, t.total_ratings,
+        {columns}
+    FROM Instructors t
+    JOIN Schools s ON t.school_id = s.school_id
+    JOIN Departments d ON t.department_id = d.department_id
+    LEFT JOIN Instructors p ON p.department_id = t.department_id
+        AND p.instructor_id <> t.instructor_id
+        AND p.total_ratings >= :min_reviews
+    WHERE s.school_name = :school_name
+    AND LOWER(t.instructor_name) = LOWER(:instructor)
+    AND (
+        CAST(:department AS TEXT) IS NULL
+        OR t.department_id = (SELECT department_id FROM DepartmentAliases WHERE alias = :department)
+    )
+    GROUP BY s.school_name, d.department_name, t.instructor_id
+    ORDER BY d.department_name COLLATE "C", t.total_ratings DESC, t.instructor_id
+""".format(
+    columns=",\n        ".join(
+        f"""CAST(t.{metric} AS DOUBLE PRECISION),
+        CASE WHEN t.{metric} IS NOT NULL THEN
+            CAST(COUNT(*) FILTER (WHERE p.{metric} < t.{metric}) AS DOUBLE PRECISION)
+            / GREATEST(COUNT(p.{metric}), 1)
+        END,
+        COUNT(p.{metric})"""
+        for metric in METRICS
+    )
+)
+# Departments with instructors at some school
+DEPARTMENT_NAMES_QUERY = """
+    SELECT d.department_name
+    FROM Departments d
+    WHERE EXISTS (
+        SELECT 1 FROM DepartmentStats ds WHERE ds.department_id = d.department_id
+    )
+"""
+SCRAPED_SCHOOLS_QUERY = """
+    SELECT school_id
+    FROM Schools s
+    WHERE EXISTS (
+        SELECT 1 FROM Instructors i WHERE i.school_id = s.school_id
+    )
+"""
+
+
+def metric_values_frame(rows) -> pl.DataFrame:
+    return pl.DataFrame(
+        rows, schema={"school": pl.String, "value": pl.Float64}, orient="row"
+    )
+
+
+def leaderboard_query(
+    department: str,
+    metric: str,
+    min_reviews: int,
+    ascending: bool,
+    limit: int,
+    offset: int,
+) -> tuple:
+    """
+    Returns the department leaderboard query, the query counting its schools and their parameters.
+    """
+    direction = "ASC" if ascending else "DESC"
+    return (
+        text(DEPARTMENT_LEADERBOARD_QUERY.format(metric=metric, direction=direction)),
+        text(LEADERBOARD_SIZE_QUERY.format(metric=metric)),
+        {
+            "department": department,
+            "min_reviews": min_reviews,
+            "limit": limit,
+            "offset": offset,
+        },
+    )
+
+
+def leaderboard_page(rows) -> tuple:
+    # The window's COUNT(*) is the last column, a page past the end has no rows to read it from
+    return (rows[0][-1] if rows else None), [tuple(row[:-1]) for row in rows]
+
+
+def percentiles_params(
+    school_name: str, instructor: str, department: str, min_reviews: int
+):
+    return {
+        "school_name": school_name,
+        "instructor": instructor,
+        "department": department or None,
+        "min_reviews": min_reviews,
+    }
+
+
+class PostgresBackend:
+    """
+    Answers the dashboard queries from the Postgres database.
+    Instantiated with a function returning a new database connection.
+    """
+
+    name = "postgres"
+    read_only = False
+
+    def __init__(self, connect):
+        self.connect = connect
+
+    def department_averages(
+        self, school_name: str, metric: str, min_reviews: int
+    ) -> list:
+        """
+        Returns (department, rating weighted average, total ratings) for every department
+        of a school with at least min_reviews ratings, highest average first.
+        """
+        # Read from the rollup instead of aggregating every instructor
+        with self.connect() as connection:
+            result = connection.execute(
+                text(DEPARTMENT_AVERAGES_QUERY.format(metric=metric)),
+                {"school_name": school_name, "minReviews": min_reviews},
+            )
+            return [tuple(row) for row in result]
+
+    def metric_values(self, school_names: list, department: str, metric: str):
+        """
+        Returns a dataframe of school and value columns with the metric of every
+        instructor in the department at the given schools.
+        """
+        # One query for every school, split up by school afterwards
+        with self.connect() as connection:
+            result = connection.execute(
+                text(METRIC_VALUES_QUERY.format(metric=metric)),
+                {"schools": school_names, "dept": department},
+            )
+            return metric_values_frame(result.fetchall())
+
+    def shared_departments(self, school_names: list) -> list:
+        """
+        Returns the departments shared between all the given schools, sorted alphabetically.
+        """
+        with self.connect() as connection:
+            result = connection.execute(
+                text(SHARED_DEPARTMENTS_QUERY),
+                {"schools": school_names, "num_schools": len(school_names)},
+            )
+            return sorted({row[0] for row in result})
+
+    def department_names(self) -> list:
+        """
+        Returns every department with instructors, sorted alphabetically.
+        """
+        with self.connect() as connection:
+            result = connection.execute(text(DEPARTMENT_NAMES_QUERY))
+            return sorted(row[0] for row in result)
+
+    def department_leaderboard(
+        self,
+        department: str,
+        metric: str,
+        min_reviews: int,
+        ascending: bool = False,
+        limit: int = 25,
+        offset: int = 0,
+    ) -> tuple:
+        """
+        Ranks the schools with at least min_reviews ratings in a department
+        by the department's rating weighted average, highest first unless ascending.
+        Returns the number of schools ranked and a page of
+        (rank, school, average, total ratings, instructors), ties sharing a rank.
+        """
+        query, size_query, params = leaderboard_query(
+            department, metric, min_reviews, ascending, limit, offset
+        )
+        # Read from the rollup, one row per school
+        with self.connect() as connection:
+            total, rows = leaderboard_page(connection.execute(query, params).all())
+            if total is None:
+                total = connection.execute(size_query, params).scalar_one()
+            return total, rows
+
+    def instructor_percentiles(
+        self,
+        school_name: str,
+        instructor: str,
+        department: str = None,
+        min_reviews: int = 0,
+    ) -> list:
+        """
+        Returns where the instructors of a school with the given name (and department)
+        sit among their department's instructors with at least min_reviews ratings nationally.
+        Rows are (school, instructor, department, total ratings) followed by
+        (value, percentile, peers) for each of METRICS, the percentile being
+        the fraction of the peers with a lower value (None without a value).
+        """
+        with self.connect() as connection:
+            result = connection.execute(
+                text(INSTRUCTOR_PERCENTILES_QUERY),
+                percentiles_params(school_name, instructor, department, min_reviews),
+            )
+            return [tuple(row) for row in result]
+
+    def scraped_school_ids(self) -> list:
+        """
+        Returns the IDs of every school with instructors.
+        """
+        with self.connect() as connection:
+            result = connection.execute(text(SCRAPED_SCHOOLS_QUERY))
+            return [row[0] for row in result]
+
+
+class AsyncPostgresBackend:
+    """
+    Answers the dashboard queries from the Postgres database without blocking the event loop,
+    through an async SQLAlchemy engine on the asyncpg driver.
+    Runs the same queries as PostgresBackend and returns the same values.
+    """
+
+    name = "postgres"
+    read_only = False
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    async def department_averages(
+        self, school_name: str, metric: str, min_reviews: int
+    ) -> list:
+        async with self.engine.connect() as connection:
+            result = await connection.execute(
+                text(DEPARTMENT_AVERAGES_QUERY.format(metric=metric)),
+                {"school_name": school_name, "minReviews": min_reviews},
+            )
+            return [tuple(row) for row in result]
+
+    async def metric_values(self, school_names: list, department: str, metric: str):
+        async with self.engine.connect() as connection:
+            result = await connection.execute(
+                text(METRIC_VALUES_QUERY.format(metric=metric)),
+                {"schools": school_names, "dept": department},
+            )
+            return metric_values_frame(result.fetchall())
+
+    async def shared_departments(self, school_names: list) -> list:
+        async with self.engine.connect() as connection:
+            result = await connection.execute(
+                text(SHARED_DEPARTMENTS_QUERY),
+                {"schools": school_names, "num_schools": len(school_names)},
+            )
+            return sorted({row[0] for row in result})
+
+    async def department_names(self) -> list:
+        async with self.engine.connect() as connection:
+            result = await connection.execute(text(DEPARTMENT_NAMES_QUERY))
+            return sorted(row[0] for row in result)
+
+    async def department_leaderboard(
+        self,
+        department: str,
+        metric: str,
+        min_reviews: int,
+        ascending: bool = False,
+        limit: int = 25,
+        offset: int = 0,
+    ) -> tuple:
+        query, size_query, params = leaderboard_query(
+            department, metric, min_reviews, ascending, limit, offset
+        )
+        async with self.engine.connect() as connection:
+            total, rows = leaderboard_page(
+                (await connection.execute(query, params)).all()
+            )
+            if total is None:
+                total = (await connection.execute(size_query, params)).scalar_one()
+            return total, rows
+
+    async def instructor_percentiles(
+        self,
+        school_name: str,
+        instructor: str,
+        department: str = None,
+        min_reviews: int = 0,
+    ) -> list:
+        async with self.engine.connect() as connection:
+            result = await connection.execute(
+                text(INSTRUCTOR_PERCENTILES_QUERY),
+                percentiles_params(school_name, instructor, department, min_reviews),
+            )
+            return [tuple(row) for row in result]
+
+    async def scraped_school_ids(self) -> list:
+        async with self.engine.connect() as connection:
+            result = await connection.execute(text(SCRAPED_SCHOOLS_QUERY))
+            return [row[0] for row in result]
+
+    async def close(self) -> None:
+        await self.engine.dispose()
+
+
+class ThreadedBackend:
+    """
+    Async front of a synchronous backend (i.e. the parquet backend),
+    running each query in a worker thread so the event loop keeps serving.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.name = backend.name
+        self.read_only = backend.read_only
+
+    async def department_averages(self, *args) -> list:
+        return await anyio.to_thread.run_sync(self.backend.department_averages, *args)
+
+    async def metric_values(self, *args):
+        return await anyio.to_thread.run_sync(self.backend.metric_values, *args)
+
+    async def shared_departments(self, *args) -> list:
+        return await anyio.to_thread.run_sync(self.backend.shared_departments, *args)
+
+    async def department_names(self) -> list:
+        return await anyio.to_thread.run_sync(self.backend.department_names)
+
+    async def department_leaderboard(self, *args) -> tuple:
+        return await anyio.to_thread.run_sync(
+            self.backend.department_leaderboard, *args
+        )
+
+    async def instructor_percentiles(self, *args) -> list:
+        return await anyio.to_thread.run_sync(
+            self.backend.instructor_percentiles, *args
+        )
+
+    async def scraped_school_ids(self) -> list:
+        return await anyio.to_thread.run_sync(self.backend.scraped_school_ids)
+
+    async def close(self) -> None:
+        pass
+
+
+class ParquetBackend:
+    """
+    Answers the dashboard queries from the partitioned parquet dataset with Polars lazy scans.
+    No database server is needed, so it suits read-only deployments and local testing.
+
+    Only the partitions of the requested schools are scanned
+    and department filters are pushed down into the parquet reader.
+    Departments are requested by any of their spellings in the dataset's aliases.
+    """
+
+    name = "parquet"
+    read_only = True
+
+    def __init__(self, dataset_path: Path):
+        self.dataset_path = Path(dataset_path)
+        # (modification time of the aliases file, its aliases)
+        self._aliases = (None, {})
+
+    def _department(self, department: str) -> str:
+        # Returns the canonical name of a requested department, reread when the file changes
+        try:
+            mtime = (self.dataset_path / DEPARTMENT_ALIASES_FILE).stat().st_mtime_ns
+        except FileNotFoundError:
+            return department
+        if self._aliases[0] != mtime:
+            self._aliases = (mtime, read_department_aliases(self.dataset_path))
+        return self._aliases[1].get(department)
+
+    def _school_ids(self, school_names: list) -> dict:
+        # Maps school IDs to the name they were requested by
+        registry = get_school_registry()
+        ids = {}
+        for name in school_names:
+            school_id = registry.id_for(name)
+            if school_id is not None:
+                ids.setdefault(school_id, name)
+        return ids
+
+    def _scan(self, school_ids) -> pl.LazyFrame:
+        paths = partition_paths(self.dataset_path, school_ids)
+        if not paths:
+            return None
+        return scan_dataset(paths)
+
+    @staticmethod
+    def _weighted_averages(scan: pl.LazyFrame, group: str, metric: str) -> pl.LazyFrame:
+        """
+        Groups instructors like the DepartmentStats rollup, with the group's weighted_sum,
+        total_ratings, instructor_count and rating weighted average avg_metric.
+        Matches the Postgres backend, including integer division of the retake percent.
+        """
+        total = pl.col("total_ratings")
+        if metric == "retake_percent":
+            weighted = pl.col(metric) * total
+        else:
+            # Ratings have two decimals, summing them as integer hundredths keeps the
+            # averages exact so they round half up like Postgres NUMERIC
+            weighted = (pl.col(metric) * 100).round(0).cast(pl.Int64) * total
+        # SUM over only nulls is NULL in SQL but 0 in Polars
+        weighted_sum = pl.when(weighted.count() > 0).then(weighted.sum())
+        if metric == "retake_percent":
+            # Postgres divides the integer sums with integer division
+            average = pl.col("weighted_sum") // total
+        else:
+            average = ((2 * pl.col("weighted_sum") + total) // (2 * total) / 100).round(
+                2
+            )
+        return (
+            scan.filter(pl.col("department").is_not_null())
+            .group_by(group)
+            .agg(
+                weighted_sum=weighted_sum,
+                total_ratings=total.sum(),
+                instructor_count=pl.len(),
+            )
+            .with_columns(avg_metric=pl.when(total > 0).then(average))
+        )
+
+    def department_averages(
+        self, school_name: str, metric: str, min_reviews: int
+    ) -> list:
+        """
+        Returns (department, rating weighted average, total ratings) for every department
+        of a school with at least min_reviews ratings, highest average first.
+        """
+        scan = self._scan(self._school_ids([school_name]))
+        if scan is None:
+            return []
+        df = (
+            self._weighted_averages(scan, "department", metric)
+            .filter(pl.col("total_ratings") >= min_reviews)
+            # Postgres sorts NULLs first when descending
+            .sort("avg_metric", descending=True, nulls_last=False)
+            .select("department", "avg_metric", "total_ratings")
+            .collect()
+        )
+        return df.rows()
+
+    def metric_values(self, school_names: list, department: str, metric: str):
+        """
+        Returns a dataframe of school and value columns with the metric of every
+        instructor in the department at the given schools.
+        """
+        ids = self._school_ids(school_names)
+        scan = self._scan(ids)
+        empty = pl.DataFrame(schema={"school": pl.String, "value": pl.Float64})
+        if scan is None:
+            return empty
+        names = pl.DataFrame(
+            {"school_id": list(ids), "school": list(ids.values())},
+            schema={"school_id": pl.Int64, "school": pl.String},
+        )
+        return (
+            scan.filter(
+                (pl.col("department") == self._department(department))
+                & pl.col(metric).is_not_null()
+            )
+            .select("school_id", pl.col(metric).cast(pl.Float64).alias("value"))
+            .collect()
+            .join(names, on="school_id")
+            .select("school", "value")
+        )
+
+    def shared_departments(self, school_names: list) -> list:
+        """
+        Returns the departments shared between all the given schools, sorted alphabetically.
+        """
+        scan = self._scan(self._school_ids(school_names))
+        if scan is None:
+            return []
+        df = (
+            scan.filter(pl.col("department").is_not_null())
+            .group_by("department")
+            .agg(schools=pl.col("school_id").n_unique())
+            .filter(pl.col("schools") == len(school_names))
+            .collect()
+        )
+        return sorted(df["department"].to_list())
+
+    def department_names(self) -> list:
+        """
+        Returns every department with instructors, sorted alphabetically.
+        """
+        scan = self._scan(partitioned_school_ids(self.dataset_path))
+        if scan is None:
+            return []
+        df = scan.select(pl.col("department").drop_nulls().unique()).collect()
+        return sorted(df["department"].to_list())
+
+    def department_leaderboard(
+        self,
+        department: str,
+        metric: str,
+        min_reviews: int,
+        ascending: bool = False,
+        limit: int = 25,
+        offset: int = 0,
+    ) -> tuple:
+        """
+        Ranks the schools with at least min_reviews ratings in a department
+        by the department's rating weighted average, highest first unless ascending.
+        Returns the number of schools ranked and a page of
+        (rank, school, average, total ratings, instructors), ties sharing a rank.
+
+        Every partition is scanned, row group statistics skip the other departments.
+        """
+        scan = self._scan(partitioned_school_ids(self.dataset_path))
+        if scan is None:
+            return 0, []
+        total = pl.col("total_ratings")
+        df = (
+            self._weighted_averages(
+                scan.filter(pl.col("department") == self._department(department)),
+                "school_id",
+                metric,
+            )
+            .filter(
+                (total >= min_reviews)
+                & (total > 0)
+                & pl.col("weighted_sum").is_not_null()
+            )
+            .collect()
+        )
+        registry = get_school_registry()
+        page = (
+            df.with_columns(
+                rank=pl.col("avg_metric").rank("min", descending=not ascending),
+                school_name=pl.Series(
+                    [registry.name_for(school_id) for school_id in df["school_id"]],
+                    dtype=pl.String,
+                ),
+            )
+            .sort("rank", "school_name")
+            .slice(offset, limit)
+            .select(
+                "rank", "school_name", "avg_metric", "total_ratings", "instructor_count"
+            )
+        )
+        return df.height, page.rows()
+
+    def instructor_percentiles(
+        self,
+        school_name: str,
+        instructor: str,
+        department: str = None,
+        min_reviews: int = 0,
+    ) -> list:
+        """
+        Returns where the instructors of a school with the given name (and department)
+        sit among their department's instructors with at least min_reviews ratings nationally.
+        Rows are (school, instructor, department, total ratings) followed by
+        (value, percentile, peers) for each of METRICS, the percentile being
+        the fraction of the peers with a lower value (None without a value).
+        """
+        ids = self._school_ids([school_name])
+        scan = self._scan(ids)
+        if scan is None:
+            return []
+        target = pl.col("instructor_name").str.to_lowercase() == instructor.lower()
+        if department:
+            target &= pl.col("department") == self._department(department)
+        targets = (
+            scan.filter(target & pl.col("department").is_not_null())
+            .with_row_index("target")
+            .collect()
+        )
+        if not targets.height:
+            return []
+        peers = (
+            self._scan(partitioned_school_ids(self.dataset_path))
+            .filter(
+                pl.col("department").is_in(targets["department"].unique().to_list())
+                & (pl.col("total_ratings") >= min_reviews)
+            )
+            .select(
+                "department",
+                *[pl.col(metric).alias(f"{metric}_peer") for metric in METRICS],
+            )
+        )
+        # Each target against every peer of its department,
+        # itself included when it has enough ratings
+        counts = []
+        for metric in METRICS:
+            peer = pl.col(f"{metric}_peer")
+            counts += [
+                (peer < pl.col(metric)).sum().alias(f"{metric}_lower"),
+                peer.count().alias(f"{metric}_peers"),
+            ]
+        df = (
+            targets.lazy()
+            .join(peers, on="department", how="left")
+            .group_by("target")
+            .agg(
+                pl.col(
+                    "instructor_name", "department", "total_ratings", *METRICS
+                ).first(),
+                *counts,
+            )
+            .collect()
+        )
+        columns = []
+        for metric in METRICS:
+            value = pl.col(metric).cast(pl.Float64)
+            counted = (pl.col("total_ratings") >= min_reviews) & value.is_not_null()
+            others = pl.col(f"{metric}_peers") - counted.fill_null(False).cast(
+                pl.UInt32
+            )
+            columns += [
+                value,
+                pl.when(value.is_not_null())
+                .then(pl.col(f"{metric}_lower") / pl.max_horizontal(others, 1))
+                .alias(f"{metric}_percentile"),
+                others.alias(f"{metric}_peers"),
+            ]
+        school_name = get_school_registry().name_for(next(iter(ids)))
+        return (
+            df.sort(
+                ["department", "total_ratings", "target"],
+                descending=[False, True, False],
+            )
+            .select(
+                pl.lit(school_name).alias("school_name"),
+                "instructor_name",
+                "department",
+                "total_ratings",
+                *columns,
+            )
+            .rows()
+        )
+
+    def scraped_school_ids(self) -> list:
+        """
+        Returns the IDs of every school with a partition in the dataset.
+        """
+        return partitioned_school_ids(self.dataset_path)
+
+
+def create_backend(name: str, connect=None, dataset_path: Path = None):
+    """
+    Returns the query backend chosen in the config ("postgres" or "parquet").
+    """
+    if name == "postgres":
+        return PostgresBackend(connect)
+    if name == "parquet":
+        return ParquetBackend(dataset_path)
+    raise ValueError(f"Unknown query backend {name}, expected postgres or parquet")
+
+
+def create_async_backend(
+    name: str,
+    database_url: str = None,
+    engine_options: dict = None,
+    dataset_path: Path = None,
+):
+    """
+    Returns the async variant of the query backend chosen in the config.
+    The Postgres backend connects with asyncpg to the same database as database_url.
+    """
+    if name == "postgres":
+        # Imported here so the sync app doesn't need the async driver
+        from sqlalchemy.engine import make_url
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        url = make_url(database_url).set(drivername="postgresql+asyncpg")
+        return AsyncPostgresBackend(create_async_engine(url, **(engine_options or {})))
+    if name == "parquet":
+        return ThreadedBackend(ParquetBackend(dataset_path))
+    raise ValueError(f"Unknown query backend {name}, expected postgres or parquet")
@@ -0,0 +1,223 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from src.schools import get_school_registry
+
+# Version bumped whenever any school is seeded, for responses built from every school
+ALL_SCHOOLS = "*"
+
+
+class CachedResponse:
+    """
+    A serialized response body with its status, ETag and the school versions it was built from.
+    """
+
+    def __init__(self, body: bytes, status: int, versions: dict, expires_at: float):
+        self.body = body
+        self.status = status
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.versions = versions
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """
+    Size bounded LRU cache of endpoint responses with a time to live.
+
+    Entries are keyed on the normalized request parameters and remember the version
+    of every school they were built from. Seeding a school bumps its version,
+    which drops that school's entries right away.
+
+    Writes by other processes (i.e. another worker or src.refresh) are noticed by polling
+    version_source, a callable returning a stamp of each school's data stored alongside it
+    (see poll_versions).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl: float = 600,
+        version_source=None,
+        poll_interval: float = 2,
+    ):
+        self.max_entries = max_entries
+        # Seconds an entry is served before it is rebuilt
+        self.ttl = ttl
+        self.version_source = version_source
+        # Seconds between polls of version_source
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._next_poll = 0
+        self._stamps = {}
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._keys_by_school = {}
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "expirations": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+
+    def get(self, key) -> CachedResponse:
+        """
+        Returns the cached response for a key or None if it is missing, expired or stale.
+        """
+        self.poll_versions()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._drop(key)
+                self.stats["expirations"] += 1
+                entry = None
+            if entry is not None and any(
+                self._versions.get(school_id, 0) != version
+                for school_id, version in entry.versions.items()
+            ):
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry
+
+    def versions(self, school_ids) -> dict:
+        """
+        Returns the current version of each school.
+        Taken before building a response so a seed finishing mid-build marks it stale.
+        """
+        self.poll_versions()
+        with self._lock:
+            return {
+                school_id: self._versions.get(school_id, 0)
+                for school_id in school_ids
+                if school_id is not None
+            }
+
+    def set(self, key, body: bytes, status: int, versions: dict) -> CachedResponse:
+        """
+        Caches a response built from the schools' data at the given versions.
+        """
+        with self._lock:
+            entry = CachedResponse(body, status, versions, time.monotonic() + self.ttl)
+            self._drop(key)
+            self._entries[key] = entry
+            for school_id in versions:
+                self._keys_by_school.setdefault(school_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+            return entry
+
+    def invalidate_schools(self, school_ids) -> None:
+        """
+        Bumps the version of each school and drops every entry built from them,
+        along with the entries built from every school (see ALL_SCHOOLS).
+        """
+        school_ids = list(school_ids)
+        if school_ids:
+            school_ids.append(ALL_SCHOOLS)
+        with self._lock:
+            for school_id in school_ids:
+                self._versions[school_id] = self._versions.get(school_id, 0) + 1
+                for key in list(self._keys_by_school.pop(school_id, ())):
+                    if key in self._entries:
+                        self._drop(key)
+                        self.stats["invalidations"] += 1
+
+    def poll_versions(self) -> None:
+        """
+        Invalidates the schools whose stamp in version_source moved since the last poll.
+        Polls at most every poll_interval seconds, one thread at a time while the others
+        carry on with the versions they have. A source returning None (i.e. the database
+        isn't prepared yet) is polled again next time.
+        """
+        if self.version_source is None or time.monotonic() < self._next_poll:
+            return
+        if not self._poll_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_poll = time.monotonic() + self.poll_interval
+            stamps = self.version_source()
+            if stamps is None:
+                return
+            # The first poll invalidates every school, its entries may predate the stamps
+            changed = [
+                school_id
+                for school_id in stamps.keys() | self._stamps.keys()
+                if stamps.get(school_id) != self._stamps.get(school_id)
+            ]
+            self._stamps = stamps
+            self.invalidate_schools(changed)
+        finally:
+            self._poll_lock.release()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_school.clear()
+
+    def info(self) -> dict:
+        with self._lock:
+            return dict(
+                self.stats,
+                entries=len(self._entries),
+                max_entries=self.max_entries,
+                ttl=self.ttl,
+            )
+
+    def _drop(self, key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for school_id in entry.versions:
+            keys = self._keys_by_school.get(school_id)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_school[school_id]
+
+
+def request_key(path: str, params, ordered: bool = True) -> tuple:
+    """
+    Returns the cache key of a request from its path and (name, values) parameter lists.
+    ordered=False treats list parameters as sets (i.e. the order schools were picked in doesn't matter)
+    """
+    return (
+        path,
+        tuple(
+            sorted(
+                (name, tuple(values if ordered else sorted(values)))
+                for name, values in params
+            )
+        ),
+    )
+
+
+def requested_school_ids(school_names) -> list:
+    """
+    Returns the IDs of the requested schools, the ones a cached response is invalidated by.
+    """
+    registry = get_school_registry()
+    return [registry.id_for(name) for name in school_names if name]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    Returns the response cache shared by the whole process.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
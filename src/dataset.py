@@ -0,0 +1,295 @@
+import argparse
+import os
+from pathlib import Path
+import polars as pl
+from src.departments import DepartmentNormalizer
+from src.parse_professors import PROFESSOR_SCHEMA, save_to_parquet, typed_professors
+from src.schools import get_school_registry
+
+DATASET_PATH = Path(__file__).parent.parent / "data/dataset"
+DATAFRAMES_PATH = Path(__file__).parent.parent / "data/dataframes"
+# Every spelling of a department written to the dataset and its canonical name,
+# the dataset's counterpart of the DepartmentAliases table
+DEPARTMENT_ALIASES_FILE = "department_aliases.parquet"
+
+# Column types of the consolidated dataset, the Instructors table's columns at the
+# width parse_professors types them with (see PROFESSOR_SCHEMA). Strings are stored
+# dictionary encoded by the parquet writer, so they're as small as categoricals on disk.
+DATASET_SCHEMA = {
+    "instructor_name": pl.String,
+    "department": pl.String,
+    "school_id": pl.Int64,
+    "school_name": pl.String,
+    "quality": pl.Float32,
+    "total_ratings": pl.UInt32,
+    "retake_percent": pl.UInt8,
+    "difficulty": pl.Float32,
+}
+# Column types the query backends compute with, like the Postgres ones, so sums
+# can't overflow and ratings are the decimals they were scraped as, not Float32 ones
+QUERY_SCHEMA = {
+    **DATASET_SCHEMA,
+    "quality": pl.Float64,
+    "total_ratings": pl.Int64,
+    "retake_percent": pl.Int64,
+    "difficulty": pl.Float64,
+}
+
+
+def progress(iterable, **options):
+    # tqdm is imported when first used, the web process reads the dataset without it
+    from tqdm import tqdm
+
+    return tqdm(iterable, **options)
+
+
+def partition_path(dataset_path: Path, school_id: int) -> Path:
+    """
+    Returns the parquet file holding a school's instructors.
+    Schools are partitioned hive style (i.e. data/dataset/school_id=1234/data.parquet)
+    """
+    return Path(dataset_path) / f"school_id={school_id}" / "data.parquet"
+
+
+def partition_paths(dataset_path: Path, school_ids) -> list:
+    """
+    Returns the partition files of the given schools that exist.
+    """
+    paths = [partition_path(dataset_path, school_id) for school_id in school_ids]
+    return [path for path in paths if path.exists()]
+
+
+def partitioned_school_ids(dataset_path: Path) -> list:
+    """
+    Returns the IDs of every school with a partition in the dataset.
+    """
+    if not Path(dataset_path).exists():
+        return []
+    return [
+        int(entry.name.split("=", 1)[1])
+        for entry in os.scandir(dataset_path)
+        if entry.name.startswith("school_id=")
+        and os.path.exists(os.path.join(entry.path, "data.parquet"))
+    ]
+
+
+def to_dataset_frame(df: pl.DataFrame) -> pl.DataFrame:
+    """
+    Converts parsed professors (see parse_professors) into the dataset layout.
+    Instructors at unrecognized universities are dropped.
+    """
+    registry = get_school_registry()
+    school_names = df["School"].drop_nulls().unique().to_list()
+    school_ids = pl.DataFrame(
+        {
+            "School": school_names,
+            "school_id": [registry.id_for(name) for name in school_names],
+        },
+        schema={"School": pl.String, "school_id": pl.Int64},
+    )
+    return (
+        df.with_columns(pl.col("School").cast(pl.String))
+        .join(school_ids, on="School", how="inner")
+        .filter(pl.col("school_id").is_not_null())
+        .select(
+            pl.col(source).cast(DATASET_SCHEMA[column], strict=False).alias(column)
+            for source, column in (
+                ("Name", "instructor_name"),
+                ("Department", "department"),
+                ("school_id", "school_id"),
+                ("School", "school_name"),
+                ("Quality", "quality"),
+                ("# of Ratings", "total_ratings"),
+                ("Would Take Again (%)", "retake_percent"),
+                ("Difficulty", "difficulty"),
+            )
+        )
+    )
+
+
+def scan_dataset(paths: list) -> pl.LazyFrame:
+    """
+    Lazily scans dataset partitions with their columns widened to QUERY_SCHEMA.
+    Float32 ratings are rounded back to the two decimals they have at most.
+    """
+    return pl.scan_parquet(paths).with_columns(
+        (
+            pl.col(column).cast(dtype).round(2)
+            if dtype == pl.Float64
+            else pl.col(column).cast(dtype)
+        )
+        for column, dtype in QUERY_SCHEMA.items()
+        if dtype != DATASET_SCHEMA[column]
+    )
+
+
+def read_department_aliases(dataset_path: Path) -> dict:
+    """
+    Returns {alias: canonical department name} of the dataset, empty if it has none.
+    """
+    path = Path(dataset_path) / DEPARTMENT_ALIASES_FILE
+    if not path.exists():
+        return {}
+    return dict(pl.read_parquet(path).iter_rows())
+
+
+def write_department_aliases(dataset_path: Path, aliases: dict) -> None:
+    path = Path(dataset_path) / DEPARTMENT_ALIASES_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        pl.DataFrame(
+            {"alias": list(aliases), "department": list(aliases.values())},
+            schema={"alias": pl.String, "department": pl.String},
+        ).write_parquet(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def canonicalize_departments(dataset_path: Path, df: pl.DataFrame) -> pl.DataFrame:
+    """
+    Replaces the scraped department names of a dataset frame with their canonical names,
+    normalized like Seeding.resolve_departments against the dataset's aliases,
+    and records the new spellings in the dataset's aliases.
+    """
+    aliases = read_department_aliases(dataset_path)
+    # Canonical names first, so they keep their keys
+    normalizer = DepartmentNormalizer(
+        [(name, name) for name in dict.fromkeys(aliases.values())]
+        + list(aliases.items())
+    )
+    # Spellings with the most instructors first
+    departments = df["department"].drop_nulls().value_counts(name="count")
+    canonical = normalizer.assign(
+        departments.sort(["count", "department"], descending=[True, False])[
+            "department"
+        ].to_list()
+    )
+    if len(normalizer.aliases) > len(aliases):
+        write_department_aliases(dataset_path, normalizer.aliases)
+    return df.with_columns(pl.col("department").replace(canonical))
+
+
+def write_school_partition(
+    dataset_path: Path, school_id: int, df: pl.DataFrame
+) -> None:
+    """
+    Replaces a school's partition with the given instructors in the dataset layout.
+    Rows are sorted by department so row group statistics can skip other departments.
+    """
+    path = partition_path(dataset_path, school_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        df.sort("department", nulls_last=True).write_parquet(
+            tmp_path, compression="zstd", statistics=True
+        )
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def write_dataset(dataset_path: Path, df: pl.DataFrame) -> list:
+    """
+    Writes parsed professors into the dataset, one partition per school.
+    Returns the IDs of the schools written.
+    """
+    # Partitions of different column types can't be scanned together
+    migrate_dataset(dataset_path)
+    dataset = canonicalize_departments(dataset_path, to_dataset_frame(df))
+    school_ids = []
+    for (school_id,), partition in dataset.partition_by(
+        "school_id", as_dict=True
+    ).items():
+        write_school_partition(dataset_path, school_id, partition)
+        school_ids.append(school_id)
+    return school_ids
+
+
+def consolidate_dataset(
+    source_path: Path = DATAFRAMES_PATH, dataset_path: Path = DATASET_PATH
+) -> list:
+    """
+    Converts the per school parquet files written by save_to_parquet
+    into the partitioned dataset read by the parquet query backend.
+    Returns the IDs of the schools written.
+    """
+    files = sorted(Path(source_path).glob("*.parquet"))
+    # Typed whether they were saved before professors were typed or not, each file's
+    # categoricals have their own categories so they're joined as strings
+    frames = [
+        typed_professors(pl.read_parquet(file)).cast({pl.Categorical: pl.String})
+        for file in progress(files, desc="Reading files")
+    ]
+    frames = [df for df in frames if df.height]
+    if not frames:
+        return []
+    return write_dataset(dataset_path, pl.concat(frames))
+
+
+def outdated_partitions(dataset_path: Path) -> list:
+    """
+    Returns the partition files not stored with DATASET_SCHEMA,
+    i.e. written before the dataset was typed.
+    """
+    paths = partition_paths(dataset_path, partitioned_school_ids(dataset_path))
+    return [path for path in paths if pl.read_parquet_schema(path) != DATASET_SCHEMA]
+
+
+def migrate_dataset(dataset_path: Path = DATASET_PATH) -> int:
+    """
+    Rewrites the outdated partitions of a dataset with DATASET_SCHEMA.
+    Returns the number of partitions rewritten.
+    """
+    outdated = outdated_partitions(dataset_path)
+    for path in progress(outdated, desc="Migrating partitions", disable=not outdated):
+        school_id = int(path.parent.name.split("=", 1)[1])
+        df = pl.read_parquet(path).select(
+            pl.col(column).cast(dtype, strict=False)
+            for column, dtype in DATASET_SCHEMA.items()
+        )
+        write_school_partition(dataset_path, school_id, df)
+    return len(outdated)
+
+
+def migrate_dataframes(source_path: Path = DATAFRAMES_PATH) -> tuple:
+    """
+    Rewrites the per school parquet files saved before professors were typed
+    with PROFESSOR_SCHEMA. Returns the number of files rewritten,
+    with their size in bytes before and after.
+    """
+    files = [
+        file
+        for file in sorted(Path(source_path).glob("*.parquet"))
+        if pl.read_parquet_schema(file) != PROFESSOR_SCHEMA
+    ]
+    size_before = size_after = 0
+    for file in progress(files, desc="Migrating files"):
+        size_before += file.stat().st_size
+        save_to_parquet(typed_professors(pl.read_parquet(file)), file)
+        size_after += file.stat().st_size
+    return len(files), size_before, size_after
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Consolidate the per school parquet files into the partitioned dataset."
+    )
+    parser.add_argument("source", type=Path, nargs="?", default=DATAFRAMES_PATH)
+    parser.add_argument("dataset", type=Path, nargs="?", default=DATASET_PATH)
+    parser.add_argument(
+        "--migrate",
+        action="store_true",
+        help="type the per school files and partitions written before the dataset was typed",
+    )
+    args = parser.parse_args()
+    if args.migrate:
+        migrated, size_before, size_after = migrate_dataframes(args.source)
+        print(
+            f"Typed {migrated} files in {args.source}: "
+            f"{size_before / 1e6:.2f} MB before, {size_after / 1e6:.2f} MB after"
+        )
+        print(f"Typed {migrate_dataset(args.dataset)} partitions in {args.dataset}")
+    written = consolidate_dataset(args.source, args.dataset)
+    print(f"Wrote {len(written)} school partitions to {args.dataset}")
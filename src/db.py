@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+# Defaults of the engine's connection pool, each can be overridden by an environment variable
+POOL_DEFAULTS = {
+    # Connections kept open in the pool
+    "pool_size": ("RMP_DB_POOL_SIZE", 10),
+    # Extra connections opened under load, closed again when returned
+    "max_overflow": ("RMP_DB_MAX_OVERFLOW", 5),
+    # Seconds a checkout waits for a free connection before raising
+    "pool_timeout": ("RMP_DB_POOL_TIMEOUT", 30),
+    # Seconds before a connection is replaced, so Postgres and proxies never see stale ones
+    "pool_recycle": ("RMP_DB_POOL_RECYCLE", 1800),
+}
+
+
+def pool_options(environ=os.environ) -> dict:
+    """
+    Returns the engine options of the connection pool (i.e. for SQLALCHEMY_ENGINE_OPTIONS).
+    Connections are pinged on checkout so ones dropped by the server are replaced.
+    """
+    options = {
+        option: int(environ.get(variable, default))
+        for option, (variable, default) in POOL_DEFAULTS.items()
+    }
+    options["pool_pre_ping"] = environ.get("RMP_DB_POOL_PRE_PING", "1") != "0"
+    return options
+
+
+class PoolMonitor:
+    """
+    Hands out pooled connections of an engine as context managers and keeps pool metrics:
+    how long checkouts waited for a connection, how many connections are in use
+    (and the most at once), and how many checkouts timed out.
+    """
+
+    def __init__(self, engine, samples: int = 1000):
+        self.engine = engine
+        self._lock = threading.Lock()
+        # Most recent checkout waits in milliseconds
+        self._waits = deque(maxlen=samples)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.connects = 0
+        self.invalidations = 0
+        event.listen(engine.pool, "checkout", self._on_checkout)
+        event.listen(engine.pool, "checkin", self._on_checkin)
+        event.listen(engine.pool, "connect", self._on_connect)
+        event.listen(engine.pool, "invalidate", self._on_invalidate)
+
+    def _on_checkout(self, *args) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def _on_checkin(self, *args) -> None:
+        with self._lock:
+            self.in_use -= 1
+
+    def _on_connect(self, *args) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def _on_invalidate(self, *args) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+    @contextmanager
+    def connect(self):
+        """
+        Checks out a connection for the duration of a with block and always returns it,
+        rolling back whatever wasn't committed.
+        """
+        start = time.perf_counter()
+        try:
+            connection = self.engine.connect()
+        except PoolTimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise
+        with self._lock:
+            self._waits.append((time.perf_counter() - start) * 1000)
+        with connection:
+            yield connection
+
+    def stats(self) -> dict:
+        """
+        Returns the pool's size and current use with the checkout wait percentiles.
+        """
+        pool = self.engine.pool
+        with self._lock:
+            waits = sorted(self._waits)
+            stats = {
+                "pool_size": pool.size() if hasattr(pool, "size") else None,
+                # Connections opened past pool_size right now
+                "overflow": (
+                    max(0, pool.overflow()) if hasattr(pool, "overflow") else None
+                ),
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "idle": pool.checkedin() if hasattr(pool, "checkedin") else None,
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+            }
+        for name, quantile in (("p50", 0.5), ("p99", 0.99)):
+            stats[f"checkout_wait_ms_{name}"] = (
+                round(waits[min(len(waits) - 1, int(len(waits) * quantile))], 3)
+                if waits
+                else None
+            )
+        stats["checkout_wait_ms_max"] = round(waits[-1], 3) if waits else None
+        return stats
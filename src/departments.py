@@ -0,0 +1,222 @@
+import html
+import re
+from functools import lru_cache
+
+# Shortened words in RMP department names and what they stand for,
+# by lowercase token without its period (i.e. "Comp." is "comp")
+ABBREVIATIONS = {
+    "admin": "administration",
+    "comm": "communication",
+    "comp": "computer",
+    "cs": "computer science",
+    "cult": "cultural",
+    "dev": "development",
+    "ed": "education",
+    "educ": "education",
+    "eng": "engineering",
+    "engr": "engineering",
+    "environ": "environmental",
+    "govt": "government",
+    "info": "information",
+    "intl": "international",
+    "lang": "language",
+    "langs": "languages",
+    "lit": "literature",
+    "math": "mathematics",
+    "maths": "mathematics",
+    "mgmt": "management",
+    "mgt": "management",
+    "microbio": "microbiology",
+    "prod": "production",
+    "sci": "science",
+    "soc": "social",
+    "tech": "technology",
+    "technol": "technology",
+    "tv": "television",
+}
+# Words that don't tell departments apart, "amp" is what's left of a mangled "&amp;"
+STOPWORDS = {"amp", "and", "department", "dept", "for", "in", "of", "the"}
+
+# Tokens this long can differ by one typo (i.e. "Theater" and "Theatre" or "Environmntal").
+# Never by two, "Informatics" and "Information" are two apart.
+FUZZY_TOKEN = 7
+
+
+@lru_cache(maxsize=None)
+def clean_department(name: str) -> str:
+    """
+    Returns how a department name is displayed: HTML entities decoded and
+    the "&" RMP pages lose (i.e. "Art amp Design" or "Art  Design") put back.
+    """
+    name = html.unescape(name).strip()
+    name = re.sub(r"\s+amp\s+", " & ", name)
+    name = re.sub(r"\s*&\s*", " & ", name)
+    return re.sub(r"\s{2,}", " & ", name)
+
+
+@lru_cache(maxsize=None)
+def department_tokens(name: str) -> tuple:
+    """
+    Returns the lowercase words of a department name in order,
+    abbreviations spelled out and stopwords dropped.
+    """
+    name = re.sub(r"['’]", "", clean_department(name).lower())
+    tokens = []
+    for token in re.split(r"[^0-9a-z]+", name):
+        for word in ABBREVIATIONS.get(token, token).split():
+            if word and word not in STOPWORDS:
+                tokens.append(word)
+    return tuple(tokens)
+
+
+def stem(token: str) -> str:
+    # Plurals: "Sciences" is "Science" and "Studies" is "Study"
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if (
+        len(token) > 3
+        and token.endswith("s")
+        and not token.endswith(("ss", "us", "is"))
+    ):
+        return token[:-1]
+    return token
+
+
+@lru_cache(maxsize=None)
+def department_key(name: str) -> tuple:
+    """
+    Returns the stems of a department name's words in order, which every spelling
+    of a department shares (i.e. "Math & Statistics" and "Mathematics and Statistic"
+    are both ("mathematic", "statistic")). Order and repeated words are kept,
+    so "Art & Art History" isn't "Art History" and "Business Economics" isn't
+    "Economics & Business".
+    A name made only of stopwords is its own key.
+    """
+    key = tuple(stem(token) for token in department_tokens(name))
+    return key or (clean_department(name).lower(),)
+
+
+def surface_key(name: str) -> tuple:
+    """
+    Returns the words of a department name in order without stemming them,
+    so typos in plurals (i.e. "Stuides") can still be matched to "Studies".
+    """
+    return department_tokens(name)
+
+
+def compact_key(name: str) -> str:
+    """
+    Returns the words of a department name run together, matching names
+    whose "/" separators were lost (i.e. "CommunicationJournalism").
+    """
+    return "".join(department_tokens(name))
+
+
+def within_distance(a: str, b: str, limit: int) -> bool:
+    """
+    Returns whether a and b are at most limit insertions, deletions, substitutions
+    or swaps of neighbouring letters apart (optimal string alignment distance).
+    """
+    if abs(len(a) - len(b)) > limit:
+        return False
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(
+                previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost
+            )
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return False
+    return current[-1] <= limit
+
+
+def tokens_match(a: str, b: str) -> bool:
+    """
+    Returns whether two stems are the same word, allowing a typo in long words.
+    The first letters have to agree, short words have to be equal
+    so "Dental" and "Mental" or "Geology" and "Ecology" stay apart.
+    """
+    if a == b:
+        return True
+    shortest = min(len(a), len(b))
+    if shortest < FUZZY_TOKEN or a[0] != b[0]:
+        return False
+    return within_distance(a, b, 1)
+
+
+def fuzzy_signature(key: tuple) -> tuple:
+    # Keys that can match share their number of words and first letters, in order
+    return tuple(token[0] for token in key)
+
+
+class DepartmentNormalizer:
+    """
+    Maps scraped department names to canonical department names.
+    A name is matched to a known department by its alias, its key
+    (see department_key), its words run together (see compact_key),
+    then by keys or unstemmed words (see surface_key) only differing by typos
+    (see tokens_match).
+
+    Instantiated with (alias, canonical name) pairs already known,
+    i.e. the DepartmentAliases table, canonical names first.
+    Matches are cached, so a name is only ever compared once.
+    """
+
+    def __init__(self, aliases=()):
+        self.aliases = {}
+        self._keys = {}
+        self._compact = {}
+        self._fuzzy = {}
+        for alias, canonical in aliases:
+            self.add(alias, canonical)
+
+    def add(self, alias: str, canonical: str) -> None:
+        """
+        Records alias as a spelling of the canonical department.
+        The first department a key was seen with keeps it.
+        """
+        self.aliases[alias] = canonical
+        for key in (department_key(alias), surface_key(alias)):
+            if key not in self._keys:
+                self._keys[key] = canonical
+                self._fuzzy.setdefault(fuzzy_signature(key), []).append(key)
+        self._compact.setdefault(compact_key(alias), canonical)
+
+    def canonical(self, name: str) -> str:
+        """
+        Returns the canonical department a name is a spelling of, None for a new department.
+        """
+        if name in self.aliases:
+            return self.aliases[name]
+        key = department_key(name)
+        if key in self._keys:
+            return self._keys[key]
+        compact = compact_key(name)
+        if compact and compact in self._compact:
+            return self._compact[compact]
+        for key in (key, surface_key(name)):
+            for candidate in self._fuzzy.get(fuzzy_signature(key), ()):
+                if all(tokens_match(a, b) for a, b in zip(key, candidate)):
+                    return self._keys[candidate]
+        return None
+
+    def assign(self, names: list) -> dict:
+        """
+        Returns {name: canonical department name} for the given department names,
+        adding the names not matching a known department as new departments.
+        Names come in order of preference, the first spelling of a new department
+        (i.e. the one with the most instructors) is its canonical name once cleaned.
+        """
+        assigned = {}
+        for name in names:
+            canonical = self.canonical(name)
+            if canonical is None:
+                canonical = clean_department(name)
+                self.add(canonical, canonical)
+            self.add(name, canonical)
+            assigned[name] = canonical
+        return assigned
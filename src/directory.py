@@ -0,0 +1,355 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+import httpx
+from src.api_scraper import (
+    API_URL,
+    AUTHORIZATION,
+    ApiScrapeError,
+    post_graphql,
+    school_node_id,
+)
+from src.schools import SCHOOL_NAMES_PATH
+
+CHECKPOINT_PATH = Path(__file__).parent.parent / "data/school_directory_checkpoint.json"
+
+# IDs that exist but aren't a real university
+PLACEHOLDER_NAMES = {"other schools"}
+
+
+def school_names_query(count: int) -> str:
+    """
+    Returns a query looking up count schools at once through aliased node fields
+    (i.e. s0: node(id: $s0) { ... on School { name } }), with the IDs passed as $s0, $s1, ...
+    """
+    arguments = ", ".join(f"$s{i}: ID!" for i in range(count))
+    fields = " ".join(
+        f"s{i}: node(id: $s{i}) {{ ... on School {{ name }} }}" for i in range(count)
+    )
+    return f"query SchoolNames({arguments}) {{ {fields} }}"
+
+
+class RateLimiter:
+    """
+    Spaces requests evenly so at most rate of them start every second.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate else 0
+        self._next = 0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class DirectoryCrawler:
+    """
+    Discovers the ID and name of every school on Rate My Professors.
+
+    IDs are looked up batch_size at a time in a single GraphQL request,
+    by a pool of concurrent requests held under a requests/sec rate limit.
+    Progress is checkpointed to disk so an interrupted crawl resumes where it stopped.
+
+    Most IDs up to dense_limit are in use, past it they become sparse.
+    There each block is probed at a stride that doubles while nothing is found,
+    and the skipped IDs around every hit are filled in afterwards.
+
+    With refresh=True only known schools (to catch renames and removals),
+    misses older than miss_ttl and IDs never probed are requested.
+    New schools get the next free IDs, so the headroom IDs past the highest known school
+    are always probed in full.
+    """
+
+    def __init__(
+        self,
+        base_url: str = API_URL,
+        checkpoint_path: Path = CHECKPOINT_PATH,
+        output_path: Path = SCHOOL_NAMES_PATH,
+        max_id: int = 8000,
+        dense_limit: int = 6000,
+        batch_size: int = 50,
+        concurrency: int = 8,
+        rate: float = 10,
+        max_stride: int = 16,
+        headroom: int = 500,
+        miss_ttl: float = 30 * 24 * 3600,
+        checkpoint_interval: float = 5,
+        retries: int = 4,
+        backoff: float = 0.5,
+    ):
+        self.base_url = base_url
+        self.checkpoint_path = Path(checkpoint_path)
+        self.output_path = Path(output_path)
+        self.max_id = max_id
+        self.dense_limit = dense_limit
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        # Requests per second across every worker
+        self.rate = rate
+        self.max_stride = max_stride
+        # Number of IDs past the highest known school probed by every crawl
+        self.headroom = headroom
+        # Seconds before a refresh probes a missing ID again
+        self.miss_ttl = miss_ttl
+        # Seconds between checkpoint writes
+        self.checkpoint_interval = checkpoint_interval
+        self.retries = retries
+        self.backoff = backoff
+        self.state = self._load_checkpoint()
+        self.requests = 0
+        self.errors = 0
+        self._last_checkpoint = time.monotonic()
+
+    def _load_checkpoint(self) -> dict:
+        if self.checkpoint_path.exists():
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                return json.load(f)
+        # hits: ID -> {name, checked_at}, misses: ID -> checked_at
+        state = {"hits": {}, "misses": {}, "run": None}
+        # The first refresh starts from the schools already in the names file
+        if self.output_path.exists():
+            with open(self.output_path, encoding="utf-8") as f:
+                for school_id, name in json.load(f).items():
+                    state["hits"][school_id] = {"name": name, "checked_at": 0}
+        return state
+
+    def save_checkpoint(self) -> None:
+        """
+        Atomically writes the probed IDs and the current run to the checkpoint file.
+        """
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.checkpoint_path.with_name(f".{self.checkpoint_path.name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.checkpoint_path)
+        self._last_checkpoint = time.monotonic()
+
+    def school_names(self) -> dict:
+        """
+        Returns the schools found so far as {ID: name} sorted by ID.
+        """
+        hits = self.state["hits"]
+        return {
+            school_id: hits[school_id]["name"] for school_id in sorted(hits, key=int)
+        }
+
+    def write_school_names(self) -> None:
+        """
+        Atomically replaces the school names file read by the school registry.
+        """
+        tmp_path = self.output_path.with_name(f".{self.output_path.name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.school_names(), f, indent=4)
+        os.replace(tmp_path, self.output_path)
+
+    def _done(self, school_id: int, run: dict) -> bool:
+        # IDs already probed in this run are skipped when resuming
+        key = str(school_id)
+        hit = self.state["hits"].get(key)
+        if hit:
+            return hit["checked_at"] >= run["started_at"]
+        checked_at = self.state["misses"].get(key)
+        if checked_at is None:
+            return False
+        if checked_at >= run["started_at"]:
+            return True
+        # Recent misses are only trusted below the frontier, where no new schools appear
+        return (
+            run["refresh"]
+            and school_id <= run["frontier"]
+            and time.time() - checked_at < self.miss_ttl
+        )
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            timeout=30,
+            limits=httpx.Limits(max_connections=self.concurrency),
+            headers={"Authorization": AUTHORIZATION},
+        )
+
+    def _record(
+        self, school_id: int, name: str, checked_at: float, changes: dict
+    ) -> None:
+        key = str(school_id)
+        previous = self.state["hits"].get(key)
+        if name and name not in PLACEHOLDER_NAMES:
+            self.state["misses"].pop(key, None)
+            self.state["hits"][key] = {"name": name, "checked_at": checked_at}
+            if previous is None:
+                changes["added"].append(school_id)
+            elif previous["name"] != name:
+                changes["renamed"].append(school_id)
+        else:
+            self.state["hits"].pop(key, None)
+            self.state["misses"][key] = checked_at
+            if previous is not None:
+                changes["removed"].append(school_id)
+
+    async def probe_batch(self, client, limiter: RateLimiter, ids: list) -> dict:
+        """
+        Looks up a batch of IDs in one request and returns {ID: name or None}.
+        """
+        await limiter.wait()
+        self.requests += 1
+        payload = {
+            "query": school_names_query(len(ids)),
+            "variables": {
+                f"s{i}": school_node_id(school_id) for i, school_id in enumerate(ids)
+            },
+        }
+        data = await post_graphql(
+            client,
+            self.base_url,
+            payload,
+            self.retries,
+            self.backoff,
+            f"IDs {ids[0]}-{ids[-1]}",
+        )
+        return {
+            school_id: (data.get(f"s{i}") or {}).get("name")
+            for i, school_id in enumerate(ids)
+        }
+
+    async def _probe(self, client, limiter, ids: list, changes: dict) -> None:
+        # Probes IDs in concurrent batches and records the results
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(batch):
+            async with semaphore:
+                try:
+                    names = await self.probe_batch(client, limiter, batch)
+                except ApiScrapeError as e:
+                    # Left unprobed so the next run picks them up again
+                    self.errors += 1
+                    print(f"Failed to probe {e}")
+                    return
+            checked_at = time.time()
+            for school_id, name in names.items():
+                self._record(school_id, name, checked_at, changes)
+            if time.monotonic() - self._last_checkpoint >= self.checkpoint_interval:
+                self.save_checkpoint()
+
+        batches = [
+            ids[i : i + self.batch_size] for i in range(0, len(ids), self.batch_size)
+        ]
+        await asyncio.gather(*(run(batch) for batch in batches))
+
+    async def _crawl(self, refresh: bool) -> dict:
+        hits = self.state["hits"]
+        known = [int(school_id) for school_id in hits]
+        run = self.state.get("run")
+        # An unfinished run of the same kind is resumed, anything else starts over
+        if not run or run["refresh"] != refresh:
+            run = {
+                "started_at": time.time(),
+                "refresh": refresh,
+                # The highest known school, past it IDs are probed without skipping
+                "frontier": max(known, default=self.max_id),
+            }
+            self.state["run"] = run
+        frontier = run["frontier"]
+        last_id = max(self.max_id, frontier + self.headroom if known else 0)
+        changes = {"added": [], "renamed": [], "removed": []}
+
+        def todo(ids) -> list:
+            return [i for i in ids if not self._done(i, run)]
+
+        async with self.client() as client:
+            limiter = RateLimiter(self.rate)
+            await self._probe(
+                client,
+                limiter,
+                todo(range(1, min(self.dense_limit, last_id) + 1)),
+                changes,
+            )
+            # Known schools in the sparse range are always looked at individually
+            await self._probe(
+                client, limiter, todo(i for i in known if i > self.dense_limit), changes
+            )
+
+            stride = 1
+            block_start = self.dense_limit + 1
+            block_size = self.batch_size * self.concurrency
+            sparse_end = max(self.dense_limit, frontier)
+            while block_start <= sparse_end:
+                block_end = min(block_start + block_size * stride, sparse_end + 1)
+                sampled = range(block_start, block_end, stride)
+                await self._probe(client, limiter, todo(sampled), changes)
+                found = [i for i in sampled if str(i) in hits]
+                if stride > 1 and found:
+                    # Schools cluster, so fill in the skipped IDs around every hit.
+                    # A cluster can start in the previous block, whose stride was smaller
+                    nearby = sorted(
+                        {
+                            i
+                            for school_id in found
+                            for i in range(school_id - stride + 1, school_id + stride)
+                            if self.dense_limit < i < block_end
+                        }
+                    )
+                    await self._probe(client, limiter, todo(nearby), changes)
+                stride = 1 if found else min(stride * 2, self.max_stride)
+                block_start = block_end
+            await self._probe(
+                client, limiter, todo(range(block_start, last_id + 1)), changes
+            )
+
+        self.state["run"] = None
+        self.save_checkpoint()
+        return changes
+
+    def crawl(self, refresh: bool = False) -> dict:
+        """
+        Crawls the directory, resuming an interrupted crawl of the same kind,
+        and writes the school names file.
+        Returns the IDs of the schools added, renamed and removed.
+        """
+        start = time.perf_counter()
+        changes = asyncio.run(self._crawl(refresh))
+        self.write_school_names()
+        elapsed = time.perf_counter() - start
+        print(
+            f"Found {len(self.state['hits'])} schools with {self.requests} requests "
+            f"in {elapsed:.1f}s ({self.errors} failed batches)"
+        )
+        print(
+            f"Added {len(changes['added'])}, renamed {len(changes['renamed'])}, "
+            f"removed {len(changes['removed'])}"
+        )
+        return changes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Crawl the RMP school directory into data/school_names.json."
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Only probe known schools, stale misses and IDs never probed",
+    )
+    parser.add_argument("--base-url", default=API_URL)
+    parser.add_argument("--checkpoint", type=Path, default=CHECKPOINT_PATH)
+    parser.add_argument("--output", type=Path, default=SCHOOL_NAMES_PATH)
+    parser.add_argument("--max-id", type=int, default=8000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=10, help="Requests per second")
+    args = parser.parse_args()
+
+    DirectoryCrawler(
+        args.base_url,
+        args.checkpoint,
+        args.output,
+        max_id=args.max_id,
+        concurrency=args.concurrency,
+        rate=args.rate,
+    ).crawl(refresh=args.refresh)
@@ -0,0 +1,405 @@
+import hashlib
+import io
+import os
+import threading
+import time
+from pathlib import Path
+import polars as pl
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from sqlalchemy.sql import text
+from src.backends import METRICS
+from src.schools import get_school_registry
+
+EXPORT_PATH = Path(__file__).parent.parent / "data/exports"
+
+# Columns of an export, in order
+EXPORT_SCHEMA = {
+    "instructor_id": pl.Int32,
+    "school_id": pl.Int32,
+    "school_name": pl.String,
+    "department": pl.String,
+    "instructor_key": pl.String,
+    "instructor_name": pl.String,
+    "quality": pl.Float64,
+    "difficulty": pl.Float64,
+    "retake_percent": pl.Int32,
+    "total_ratings": pl.Int32,
+}
+ARROW_SCHEMA = pl.DataFrame(schema=EXPORT_SCHEMA).to_arrow().schema
+
+# Rows are ordered by instructor_id so an export of the same data is always the same bytes
+EXPORT_QUERY = """
+    SELECT i.instructor_id, i.school_id, s.school_name, d.department_name,
+            i.instructor_key, i.instructor_name,
+            CAST(i.quality AS DOUBLE PRECISION), CAST(i.difficulty AS DOUBLE PRECISION),
+            i.retake_percent, i.total_ratings
+    FROM Instructors i
+    JOIN Schools s ON i.school_id = s.school_id
+    LEFT JOIN Departments d ON i.department_id = d.department_id
+    {where}
+    ORDER BY i.instructor_id
+"""
+# Moves whenever instructors are inserted, deleted or a school's professors change
+DATA_VERSION_QUERY = """
+    SELECT (SELECT MAX(last_changed_at) FROM ScrapeState), COUNT(*), MAX(instructor_id)
+    FROM Instructors
+"""
+
+# Format: (file extension, mimetype, {compression: extension suffix}, default compression)
+# CSV is compressed as a whole file, Parquet by column chunk and Arrow IPC by record batch
+EXPORT_FORMATS = {
+    "csv": (".csv", "text/csv", {"gzip": ".gz", "zstd": ".zst"}, None),
+    "parquet": (
+        ".parquet",
+        "application/vnd.apache.parquet",
+        {"snappy": "", "gzip": "", "zstd": ""},
+        "zstd",
+    ),
+    "arrow": (
+        ".arrows",
+        "application/vnd.apache.arrow.stream",
+        {"lz4": "", "zstd": ""},
+        None,
+    ),
+}
+# Mimetypes of the whole file compressed CSVs
+COMPRESSED_MIMETYPES = {"gzip": "application/gzip", "zstd": "application/zstd"}
+
+
+class ExportError(ValueError):
+    """
+    Raised for export parameters that can't be used, answered with a 400.
+    """
+
+
+class ExportQuery:
+    """
+    Filters of an export: schools, departments, metric ranges, minimum ratings
+    and the instructor_id to continue after (i.e. the last one of a previous export).
+    """
+
+    def __init__(
+        self,
+        school_ids=(),
+        departments=(),
+        ranges: dict = None,
+        min_reviews: int = None,
+        after: int = None,
+    ):
+        self.school_ids = sorted(set(school_ids))
+        self.departments = sorted(set(departments))
+        # {metric: (min, max)} with None for an open end
+        self.ranges = dict(sorted((ranges or {}).items()))
+        self.min_reviews = min_reviews
+        self.after = after
+
+    @classmethod
+    def from_args(cls, args) -> "ExportQuery":
+        """
+        Reads the filters from request arguments:
+        schools[], departments[] (or department), min_/max_ of each metric
+        (i.e. min_quality=4&max_difficulty=2.5), min_reviews and after.
+        """
+        registry = get_school_registry()
+        school_ids = []
+        for school_name in args.getlist("schools[]"):
+            school_id = registry.id_for(school_name)
+            if school_id is None:
+                raise ExportError(f"Unknown school {school_name}")
+            school_ids.append(school_id)
+        departments = args.getlist("departments[]") + args.getlist("department")
+
+        ranges = {}
+        for metric in METRICS:
+            # Retake percentages are whole numbers, the ratings have two decimals
+            number = int if metric == "retake_percent" else float
+            bounds = tuple(
+                cls._number(args, f"{end}_{metric}", number) for end in ("min", "max")
+            )
+            if bounds != (None, None):
+                ranges[metric] = bounds
+        return cls(
+            school_ids,
+            departments,
+            ranges,
+            cls._number(args, "min_reviews", int),
+            cls._number(args, "after", int),
+        )
+
+    @staticmethod
+    def _number(args, name: str, number):
+        value = args.get(name)
+        if value is None or value == "":
+            return None
+        try:
+            return number(value)
+        except ValueError:
+            raise ExportError(f"{name} must be a number") from None
+
+    def statement(self) -> tuple:
+        """
+        Returns the export query and its parameters.
+        """
+        conditions, params = [], {}
+        if self.school_ids:
+            conditions.append("i.school_id = ANY(:school_ids)")
+            params["school_ids"] = self.school_ids
+        if self.departments:
+            conditions.append(
+                "i.department_id IN ("
+                "SELECT department_id FROM DepartmentAliases WHERE alias = ANY(:departments))"
+            )
+            params["departments"] = self.departments
+        for metric, (low, high) in self.ranges.items():
+            # metric is one of METRICS, never a request value
+            if low is not None:
+                conditions.append(f"i.{metric} >= :min_{metric}")
+                params[f"min_{metric}"] = low
+            if high is not None:
+                conditions.append(f"i.{metric} <= :max_{metric}")
+                params[f"max_{metric}"] = high
+        if self.min_reviews is not None:
+            conditions.append("i.total_ratings >= :min_reviews")
+            params["min_reviews"] = self.min_reviews
+        if self.after is not None:
+            conditions.append("i.instructor_id > :after")
+            params["after"] = self.after
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return text(EXPORT_QUERY.format(where=where)), params
+
+    def key(self) -> tuple:
+        return (
+            tuple(self.school_ids),
+            tuple(self.departments),
+            tuple(self.ranges.items()),
+            self.min_reviews,
+            self.after,
+        )
+
+
+class ExportFormat:
+    """
+    File format and compression of an export, one of EXPORT_FORMATS.
+    compression=None uses the format's default, "none" turns it off.
+    """
+
+    def __init__(self, name: str = "csv", compression: str = None):
+        if name not in EXPORT_FORMATS:
+            raise ExportError(f"Unknown format {name}")
+        extension, mimetype, compressions, default = EXPORT_FORMATS[name]
+        if compression is None or compression == "":
+            compression = default
+        elif compression == "none":
+            compression = None
+        elif compression not in compressions:
+            raise ExportError(
+                f"{name} exports can be compressed with {', '.join(compressions)}"
+            )
+        self.name = name
+        self.compression = compression
+        self.mimetype = mimetype
+        self.extension = extension
+        if name == "csv" and compression:
+            self.mimetype = COMPRESSED_MIMETYPES[compression]
+            self.extension += compressions[compression]
+
+    @property
+    def filename(self) -> str:
+        return f"instructors{self.extension}"
+
+    def writer(self) -> "ExportWriter":
+        return ExportWriter(self.name, self.compression)
+
+
+class ChunkBuffer(io.RawIOBase):
+    """
+    Write only file keeping what was written until it is drained.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ExportWriter:
+    """
+    Writes an export one Arrow table at a time and returns the bytes each write produced,
+    so a response can send them while the next chunk is fetched.
+    Parquet gets a row group per table and Arrow IPC a record batch.
+    """
+
+    def __init__(self, name: str, compression: str = None):
+        self._buffer = ChunkBuffer()
+        sink = pa.PythonFile(self._buffer, mode="w")
+        self._streams = [sink]
+        if name == "csv":
+            if compression:
+                sink = pa.CompressedOutputStream(sink, compression)
+                self._streams.append(sink)
+            self._writer = pa_csv.CSVWriter(sink, ARROW_SCHEMA)
+        elif name == "parquet":
+            self._writer = pq.ParquetWriter(
+                sink, ARROW_SCHEMA, compression=compression or "none"
+            )
+        else:
+            self._writer = pa.ipc.new_stream(
+                sink,
+                ARROW_SCHEMA,
+                options=pa.ipc.IpcWriteOptions(compression=compression),
+            )
+
+    def write(self, table: pa.Table) -> bytes:
+        self._writer.write_table(table)
+        return self._buffer.drain()
+
+    def close(self) -> bytes:
+        """
+        Finishes the file (i.e. the Parquet footer) and returns its last bytes.
+        """
+        self._writer.close()
+        for stream in reversed(self._streams):
+            if not stream.closed:
+                stream.close()
+        return self._buffer.drain()
+
+
+def data_version(connection) -> tuple:
+    """
+    Returns what an export's ETag is built from besides its parameters:
+    the last time a school's professors changed, the number of instructors and the highest ID.
+    """
+    changed_at, count, max_id = connection.execute(text(DATA_VERSION_QUERY)).one()
+    return (changed_at.isoformat() if changed_at else None, count, max_id)
+
+
+def export_etag(
+    export_query: ExportQuery, export_format: ExportFormat, version: tuple
+) -> str:
+    key = (export_query.key(), export_format.name, export_format.compression, version)
+    return hashlib.sha1(repr(key).encode()).hexdigest()
+
+
+def instructor_table(rows) -> pa.Table:
+    return pl.DataFrame(rows, schema=EXPORT_SCHEMA, orient="row").to_arrow()
+
+
+def stream_export(
+    connect,
+    export_query: ExportQuery,
+    export_format: ExportFormat,
+    chunk_rows: int = 10_000,
+):
+    """
+    Yields the bytes of an export as its rows are fetched.
+    connect returns a connection as a context manager (i.e. PoolMonitor.connect),
+    which is held until the last chunk is sent.
+
+    Rows come from a server-side cursor chunk_rows at a time, so at most one chunk
+    is in memory however many rows match.
+    """
+    writer = export_format.writer()
+    statement, params = export_query.statement()
+    with connect() as connection:
+        result = connection.execution_options(
+            stream_results=True, max_row_buffer=chunk_rows
+        ).execute(statement, params)
+        for rows in result.partitions(chunk_rows):
+            data = writer.write(instructor_table(rows))
+            if data:
+                yield data
+        # An export without rows is still a valid file with a header or schema
+        yield writer.close()
+
+
+class ExportSpool:
+    """
+    Keeps finished exports on disk by name (their ETag and extension), so interrupted
+    downloads can be resumed with Range requests and repeated ones are sent from the file.
+    Files are kept for ttl seconds, and the oldest are removed past max_bytes in total.
+    Several processes can share the directory.
+    """
+
+    def __init__(
+        self, directory: Path, ttl: float = 3600, max_bytes: int = 2 * 1024**3
+    ):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+    def get(self, name: str) -> Path:
+        """
+        Returns the path of a spooled export or None if it is missing or expired.
+        """
+        path = self.directory / name
+        try:
+            if path.stat().st_mtime + self.ttl > time.time():
+                return path
+        except FileNotFoundError:
+            return None
+        path.unlink(missing_ok=True)
+        return None
+
+    def write(self, name: str, chunks):
+        """
+        Yields the chunks while writing them to the spool.
+        The export is only kept once every chunk was written, a download
+        stopped part way (i.e. the client disconnecting) leaves nothing behind.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / name
+        tmp_path = path.with_name(f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, "wb") as file:
+                for chunk in chunks:
+                    file.write(chunk)
+                    yield chunk
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        self.prune()
+
+    def build(self, name: str, chunks) -> Path:
+        """
+        Writes a whole export to the spool and returns its path.
+        """
+        for _ in self.write(name, chunks):
+            pass
+        return self.directory / name
+
+    def prune(self) -> None:
+        """
+        Removes expired exports, then the oldest ones until the spool fits in max_bytes.
+        """
+        files = []
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith("."):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime + self.ttl <= now:
+                Path(entry.path).unlink(missing_ok=True)
+            else:
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            Path(path).unlink(missing_ok=True)
+            total -= size
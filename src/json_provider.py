@@ -0,0 +1,35 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    # Optional, the standard library encoder is used without it
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider encoding with orjson, several times faster on the long float
+    arrays of the plot payloads.
+    Keys are sorted and types orjson doesn't know (i.e. Decimal) are converted
+    like Flask's default provider does. Non-ASCII characters are kept as UTF-8.
+    """
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(
+            obj,
+            default=self.default,
+            option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+        ).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+def json_provider(app, use_orjson: bool = True):
+    """
+    Returns the orjson provider for an app when orjson is installed, otherwise Flask's default.
+    """
+    if use_orjson and orjson is not None:
+        return OrjsonProvider(app)
+    return DefaultJSONProvider(app)
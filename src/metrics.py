@@ -0,0 +1,347 @@
+import bisect
+import contextvars
+import functools
+import threading
+import time
+from contextlib import ContextDecorator
+from sqlalchemy import event
+
+# Content type of the Prometheus text exposition format served by /metrics
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Upper bounds in seconds of the latency histogram buckets, from a cached response to a scrape
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+    300,
+    1800,
+)
+
+# The route whose request is being served, attached to the database queries it runs
+# ("background" for seeding, scrape jobs and startup)
+current_route = contextvars.ContextVar("current_route", default="background")
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_sample(name: str, labels: dict, value) -> str:
+    if labels:
+        pairs = ",".join(
+            f'{key}="{escape_label(label)}"' for key, label in labels.items()
+        )
+        name = f"{name}{{{pairs}}}"
+    if value == float("inf"):
+        return f"{name} +Inf"
+    return f"{name} {value!r}"
+
+
+class Metric:
+    """
+    A named family of values, one per combination of its label values.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        if len(labels) == len(self.labels):
+            try:
+                return tuple([str(labels[label]) for label in self.labels])
+            except KeyError:
+                pass
+        raise ValueError(
+            f"{self.name} takes the labels {self.labels}, got {tuple(labels)}"
+        )
+
+    def samples(self) -> list:
+        """
+        Returns the (name, labels, value) samples of every label combination seen.
+        """
+        with self._lock:
+            values = sorted(self._values.items())
+        # Unlabelled metrics are shown from the start, at 0 until anything is counted
+        if not values and not self.labels:
+            values = [((), 0)]
+        return [
+            (self.name, dict(zip(self.labels, key)), value) for key, value in values
+        ]
+
+    def render(self) -> list:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(format_sample(*sample) for sample in self.samples())
+        return lines
+
+
+class Counter(Metric):
+    """
+    A count that only goes up, i.e. rows inserted or pages fetched.
+    """
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set_total(self, total, **labels) -> None:
+        """
+        Sets the count to a running total kept elsewhere (i.e. by the connection pool
+        monitor), read by a collector at render time.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = total
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    """
+    A value read when the metrics are rendered, i.e. connections in use.
+    """
+
+    kind = "gauge"
+
+    def set(self, value, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """
+    Observed durations counted into cumulative buckets, with their sum and count,
+    so Prometheus can compute quantiles across processes and time.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labels=(), buckets=LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, (None, 0.0))
+            if counts is None:
+                counts = [0] * (len(self.buckets) + 1)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def time(self, **labels):
+        """
+        Returns a context manager (or decorator) observing the seconds its block takes.
+        """
+        return Timer(lambda seconds: self.observe(seconds, **labels))
+
+    def samples(self) -> list:
+        with self._lock:
+            values = sorted(
+                (key, (list(counts), total))
+                for key, (counts, total) in self._values.items()
+            )
+        samples = []
+        for key, (counts, total) in values:
+            labels = dict(zip(self.labels, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                samples.append((f"{self.name}_bucket", dict(labels, le=le), cumulative))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class Timer(ContextDecorator):
+    """
+    Measures the seconds a with block or decorated function takes, even when it raises,
+    and hands them to a callback.
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.start = None
+
+    def _recreate_cm(self):
+        # Every call of a decorated function is timed by a timer of its own
+        return Timer(self.callback)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self.callback(time.perf_counter() - self.start)
+        return False
+
+
+class MetricsRegistry:
+    """
+    The metrics of a process, rendered in the Prometheus text format.
+    Collectors are functions called at render time to update gauges
+    from state kept elsewhere (i.e. the connection pool monitor).
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(
+        self, cls, name: str, documentation: str, labels, **options
+    ) -> Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(
+                    name, documentation, labels, **options
+                )
+            elif not isinstance(metric, cls) or metric.labels != tuple(labels):
+                raise ValueError(f"Metric {name} is already registered differently")
+            return metric
+
+    def counter(self, name: str, documentation: str, labels=()) -> Counter:
+        return self._register(Counter, name, documentation, labels)
+
+    def gauge(self, name: str, documentation: str, labels=()) -> Gauge:
+        return self._register(Gauge, name, documentation, labels)
+
+    def histogram(
+        self, name: str, documentation: str, labels=(), buckets=LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram, name, documentation, labels, buckets=buckets)
+
+    def collector(self, collect):
+        """
+        Registers a function called before every render, usable as a decorator.
+        """
+        self._collectors.append(collect)
+        return collect
+
+    def render(self) -> str:
+        for collect in self._collectors:
+            collect()
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "rmp_stage_duration_seconds",
+    "Seconds spent in each stage of the scrape, parse and seed pipeline",
+    ["stage"],
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "rmp_http_request_duration_seconds",
+    "Seconds taken to answer requests by route",
+    ["route", "method", "status"],
+)
+QUERY_SECONDS = REGISTRY.histogram(
+    "rmp_db_query_duration_seconds",
+    "Seconds taken by database statements by route and statement type",
+    ["route", "statement"],
+)
+SHOW_MORE_CLICKS = REGISTRY.counter(
+    "rmp_show_more_clicks_total", "Show More buttons clicked by the Selenium scraper"
+)
+API_PAGES = REGISTRY.counter(
+    "rmp_api_pages_total", "Pages of professors fetched from the API"
+)
+CARDS_PARSED = REGISTRY.counter(
+    "rmp_cards_parsed_total", "Professor cards parsed from school pages", ["engine"]
+)
+INSTRUCTORS_WRITTEN = REGISTRY.counter(
+    "rmp_instructors_written_total",
+    "Instructors inserted, updated or deleted by seeding",
+    ["operation"],
+)
+DEPARTMENTS_CREATED = REGISTRY.counter(
+    "rmp_departments_created_total", "Departments added by seeding"
+)
+INSTRUCTORS_SKIPPED = REGISTRY.counter(
+    "rmp_instructors_skipped_total", "Scraped instructors not seeded", ["reason"]
+)
+SCHOOLS_SYNCED = REGISTRY.counter(
+    "rmp_schools_synced_total",
+    "Schools seeded, changed or skipped as unchanged since their last scrape",
+    ["result"],
+)
+SCRAPE_JOBS = REGISTRY.counter(
+    "rmp_scrape_jobs_total",
+    "Finished scrape jobs by status and source",
+    ["status", "source"],
+)
+
+
+def timed(stage: str) -> Timer:
+    """
+    Times a pipeline stage into rmp_stage_duration_seconds,
+    as a with block or a decorator.
+    """
+    return STAGE_SECONDS.time(stage=stage)
+
+
+@functools.lru_cache(maxsize=256)
+def statement_type(statement: str) -> str:
+    # The first keyword, i.e. "select" or "with", keeps the label's values few
+    words = statement.split(None, 1)
+    return words[0].lower() if words else ""
+
+
+def instrument_engine(engine) -> None:
+    """
+    Times every statement run on a SQLAlchemy engine into rmp_db_query_duration_seconds,
+    labelled with the route being served. Async engines are instrumented
+    through their sync_engine.
+    """
+
+    # Start times are kept on the connection, which only runs one statement at a time
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        conn.info["query_start"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        QUERY_SECONDS.observe(
+            time.perf_counter() - conn.info.pop("query_start"),
+            route=current_route.get(),
+            statement=statement_type(statement),
+        )
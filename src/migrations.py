@@ -0,0 +1,139 @@
+import argparse
+import hashlib
+import re
+from pathlib import Path
+from sqlalchemy import create_engine
+from sqlalchemy.sql import text
+
+ROOT = Path(__file__).parent.parent
+SCHEMA_PATH = ROOT / "db/schema.sql"
+MIGRATIONS_PATH = ROOT / "db/migrations"
+
+# Migration files are named <version>_<name>.sql, i.e. 0002_query_indexes.sql
+MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+# Key of the advisory lock held while migrating, so two starting apps don't both migrate
+MIGRATION_LOCK = 7_262_061
+
+
+class MigrationError(Exception):
+    """
+    Raised for a badly named or duplicated migration file.
+    """
+
+
+def available_migrations(migrations_path: Path = MIGRATIONS_PATH) -> list:
+    """
+    Returns (version, name, sql) for every migration file, oldest version first,
+    where name is the file name without .sql.
+    """
+    migrations = {}
+    for path in sorted(Path(migrations_path).glob("*.sql")):
+        match = MIGRATION_FILE.match(path.name)
+        if not match:
+            raise MigrationError(f"{path.name} isn't named <version>_<name>.sql")
+        version = int(match.group(1))
+        if version in migrations:
+            raise MigrationError(f"Two migrations have version {version}")
+        migrations[version] = (version, path.stem, path.read_text())
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def checksum(sql: str) -> str:
+    return hashlib.sha1(sql.encode()).hexdigest()
+
+
+def applied_migrations(connection) -> dict:
+    """
+    Returns {version: checksum} of the migrations already applied to the database.
+    """
+    result = connection.execute(text("SELECT version, checksum FROM schema_migrations"))
+    return {row[0]: row[1] for row in result}
+
+
+def migrate(connection, migrations_path: Path = MIGRATIONS_PATH) -> list:
+    """
+    Applies the migrations the database hasn't had yet, in version order,
+    each in its own transaction recorded in schema_migrations.
+    A failing migration is rolled back and raised, leaving the earlier ones applied.
+    Returns the names of the migrations applied.
+    """
+    connection.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT PRIMARY KEY,
+                name TEXT NOT NULL,
+                checksum TEXT NOT NULL,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+            """
+        )
+    )
+    connection.commit()
+    connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK})
+    applied = []
+    try:
+        # Read under the lock so migrations applied by another process meanwhile are skipped
+        done = applied_migrations(connection)
+        connection.commit()
+        for version, name, sql in available_migrations(migrations_path):
+            if version in done:
+                if done[version] != checksum(sql):
+                    print(f"Migration {name} was edited after it was applied")
+                continue
+            try:
+                connection.execute(text(sql))
+                connection.execute(
+                    text(
+                        """
+                        INSERT INTO schema_migrations (version, name, checksum)
+                        VALUES (:version, :name, :checksum)
+                        """
+                    ),
+                    {"version": version, "name": name, "checksum": checksum(sql)},
+                )
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            print(f"Applied migration {name}")
+            applied.append(name)
+    finally:
+        connection.execute(
+            text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK}
+        )
+        connection.commit()
+    return applied
+
+
+def apply_schema(connection, migrations_path: Path = MIGRATIONS_PATH) -> list:
+    """
+    Creates any missing tables from db/schema.sql, then applies the pending migrations.
+    Returns the names of the migrations applied.
+    """
+    connection.execute(text(SCHEMA_PATH.read_text()))
+    connection.commit()
+    return migrate(connection, migrations_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Apply the database schema migrations."
+    )
+    parser.add_argument("--database-url", default="postgresql:///rmp.db")
+    parser.add_argument(
+        "--status", action="store_true", help="List the migrations without applying any"
+    )
+    args = parser.parse_args()
+
+    with create_engine(args.database_url).connect() as connection:
+        if args.status:
+            done = {}
+            if connection.dialect.has_table(connection, "schema_migrations"):
+                done = applied_migrations(connection)
+            for version, name, _ in available_migrations():
+                print(f"{name}: {'applied' if version in done else 'pending'}")
+        else:
+            applied = apply_schema(connection)
+            print(f"Applied {len(applied)} migrations")
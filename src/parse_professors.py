@@ -1,48 +1,202 @@
+import argparse
+import multiprocessing
 import os
-from bs4 import BeautifulSoup
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from lxml import etree, html
 import polars as pl
 from pathlib import Path
+from src.metrics import CARDS_PARSED, timed
 
+# Class names of the elements holding each professor's information
+CARD_CLASS = "TeacherCard__CardInfo-syjs0d-1"
+NAME_CLASS = "CardName__StyledCardName-sc-1gyrgim-0"
+DEPARTMENT_CLASS = "CardSchool__Department-sc-19lmz2k-0"
+SCHOOL_CLASS = "CardSchool__School-sc-19lmz2k-1"
+QUALITY_CLASS = "CardNumRating__CardNumRatingNumber-sc-17t4b9u-2"
+NUM_RATINGS_CLASS = "CardNumRating__CardNumRatingCount-sc-17t4b9u-3"
+FEEDBACK_CLASS = "CardFeedback__CardFeedbackNumber-lq6nix-2"
+# Teacher cards link to the professor's page, i.e. /professor/12345
+PROFESSOR_LINK_PREFIX = "/professor/"
 
-def parse_professors_from_path(path: Path) -> pl.DataFrame:
+# Column types of parsed professors. Ratings have a decimal or two so Float32 holds them,
+# the retake percent fits a byte and the school and department repeat on every card,
+# so they're categorical. Values missing from the card (i.e. "N/A") are null.
+PROFESSOR_SCHEMA = {
+    "Name": pl.String,
+    "Department": pl.Categorical,
+    "School": pl.Categorical,
+    "Quality": pl.Float32,
+    "# of Ratings": pl.UInt32,
+    "Would Take Again (%)": pl.UInt8,
+    "Difficulty": pl.Float32,
+    "Professor ID": pl.String,
+}
+
+
+class CardParseError(ValueError):
+    """
+    A teacher card that couldn't be parsed, with its position on the page.
+    Raised instead of dropping the card, so the page is reported as failed
+    (i.e. by parse_batch) rather than silently losing professors.
+    """
+
+    def __init__(self, index: int, error: Exception):
+        super().__init__(f"Card {index + 1}: {type(error).__name__}: {error}")
+        self.index = index
+
+
+def parse_professors_from_path(path: Path, engine: str = "lxml") -> pl.DataFrame:
     """
     Takes the path of an html file and parses it.
     Returns a polars dataframe from the parse_professors function.
     """
     html_content = path.read_text(encoding="utf-8")
-    return parse_professors(html_content)
+    return parse_professors(html_content, engine=engine)
 
 
-def parse_professors(html_content: str) -> pl.DataFrame:
+def parse_professors(html_content: str, engine: str = "lxml") -> pl.DataFrame:
     """
     Takes the html content of a page and parses it into a polars dataframe.
+    The engine is either "lxml" (fast, C-backed) or "bs4" (the BeautifulSoup reference).
+    Both engines produce the same dataframe.
+    """
+    if engine not in PARSER_ENGINES:
+        raise ValueError(
+            f"Unknown parser engine {engine}, expected one of {list(PARSER_ENGINES)}"
+        )
+    with timed("parse"):
+        df = PARSER_ENGINES[engine](html_content)
+    CARDS_PARSED.inc(df.height, engine=engine)
+    return df
+
+
+def _div_with_class(class_name: str) -> str:
+    # Matches a single class within the class attribute like BeautifulSoup's class_
+    return (
+        "div[contains(concat(' ', normalize-space(@class), ' '), " f"' {class_name} ')]"
+    )
+
+
+# XPath expressions are compiled once and reused for every card
+_CARDS = etree.XPath(f"//{_div_with_class(CARD_CLASS)}")
+_NAME = etree.XPath(f"descendant::{_div_with_class(NAME_CLASS)}[1]")
+_DEPARTMENT = etree.XPath(f"descendant::{_div_with_class(DEPARTMENT_CLASS)}[1]")
+_SCHOOL = etree.XPath(f"descendant::{_div_with_class(SCHOOL_CLASS)}[1]")
+_FEEDBACK = etree.XPath(f"descendant::{_div_with_class(FEEDBACK_CLASS)}")
+
+
+def _first_text(elements: list) -> str:
+    return elements[0].text_content() if elements else None
+
+
+def _rating_text(wrapper) -> tuple:
+    # The first quality and rating count within the card, in one walk over its few divs
+    # (quicker than an XPath per value)
+    quality = num = None
+    for element in wrapper.iter("div"):
+        classes = element.get("class", "").split()
+        if quality is None and QUALITY_CLASS in classes:
+            quality = element.text_content()
+        elif num is None and NUM_RATINGS_CLASS in classes:
+            num = element.text_content()
+        if quality is not None and num is not None:
+            break
+    return quality, num
+
+
+def _professor_id(href: str) -> str:
+    # The RMP ID from the card's link, which stays the same across scrapes
+    if href and href.startswith(PROFESSOR_LINK_PREFIX):
+        professor_id = href[len(PROFESSOR_LINK_PREFIX) :].strip("/")
+        if professor_id.isdigit():
+            return professor_id
+    return None
+
+
+def parse_professors_lxml(html_content: str) -> pl.DataFrame:
+    """
+    Parses the html content with lxml and precompiled XPath selectors.
+    Mirrors the BeautifulSoup lookups in parse_professors_bs4 card for card.
     """
-    soup = BeautifulSoup(html_content, "html.parser")
-    # Initialize the column-wise lists for a faster polars dataframe
     names, departments, schools = [], [], []
     qualities, num_ratings, would_take_agains, difficulties = [], [], [], []
+    professor_ids = []
+    # lxml refuses empty documents while BeautifulSoup returns an empty tree
+    cards = _CARDS(html.fromstring(html_content)) if html_content.strip() else []
 
-    for card in soup.find_all("div", class_="TeacherCard__CardInfo-syjs0d-1"):
+    for index, card in enumerate(cards):
         try:
-            name = card.find("div", class_="CardName__StyledCardName-sc-1gyrgim-0")
-            department = card.find("div", class_="CardSchool__Department-sc-19lmz2k-0")
-            school = card.find("div", class_="CardSchool__School-sc-19lmz2k-1")
-            quality = card.find_next(
-                "div", class_="CardNumRating__CardNumRatingNumber-sc-17t4b9u-2"
-            )
-            num = card.find_next(
-                "div", class_="CardNumRating__CardNumRatingCount-sc-17t4b9u-3"
+            link = next(card.iterancestors("a"), None)
+            # The quality and rating count sit next to the card's info, inside its link
+            wrapper = link if link is not None else card.getparent()
+            feedback = _FEEDBACK(card)
+            quality, num = _rating_text(wrapper)
+
+            names.append(_first_text(_NAME(card)))
+            departments.append(_first_text(_DEPARTMENT(card)))
+            schools.append(_first_text(_SCHOOL(card)))
+            qualities.append(quality)
+            num_ratings.append(num.split()[0] if num and num.split() else "0")
+            # Professors without a would take again percentage are marked as N/A
+            if feedback:
+                text = feedback[0].text_content().strip("%")
+                would_take_agains.append(None if text == "N/A" else text)
+            else:
+                would_take_agains.append(None)
+            difficulties.append(
+                feedback[1].text_content() if len(feedback) > 1 else None
             )
-            again = card.find("div", class_="CardFeedback__CardFeedbackNumber-lq6nix-2")
-            diff = card.find_all(
-                "div", class_="CardFeedback__CardFeedbackNumber-lq6nix-2"
+            professor_ids.append(
+                _professor_id(link.get("href") if link is not None else None)
             )
+        except Exception as error:
+            raise CardParseError(index, error) from error
+
+    return professors_from_columns(
+        names,
+        departments,
+        schools,
+        qualities,
+        num_ratings,
+        would_take_agains,
+        difficulties,
+        professor_ids,
+    )
+
+
+def parse_professors_bs4(html_content: str) -> pl.DataFrame:
+    """
+    Parses the html content with BeautifulSoup.
+    Kept as the reference implementation for the faster engines.
+    """
+    # Imported here so the web process (which reads parquet through src.dataset) doesn't need it
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html_content, "html.parser")
+    # Initialize the column-wise lists for a faster polars dataframe
+    names, departments, schools = [], [], []
+    qualities, num_ratings, would_take_agains, difficulties = [], [], [], []
+    professor_ids = []
+
+    for index, card in enumerate(soup.find_all("div", class_=CARD_CLASS)):
+        try:
+            name = card.find("div", class_=NAME_CLASS)
+            department = card.find("div", class_=DEPARTMENT_CLASS)
+            school = card.find("div", class_=SCHOOL_CLASS)
+            link = card.find_parent("a")
+            # The quality and rating count sit next to the card's info, inside its link
+            wrapper = link if link is not None else card.parent
+            quality = wrapper.find("div", class_=QUALITY_CLASS)
+            num = wrapper.find("div", class_=NUM_RATINGS_CLASS)
+            again = card.find("div", class_=FEEDBACK_CLASS)
+            diff = card.find_all("div", class_=FEEDBACK_CLASS)
 
             names.append(name.text if name else None)
             departments.append(department.text if department else None)
             schools.append(school.text if school else None)
             qualities.append(quality.text if quality else None)
-            num_ratings.append(num.text.split()[0] if num else "0")
+            num_ratings.append(num.text.split()[0] if num and num.text.split() else "0")
             # Some of the professors don't have a would take again percentage
             # They are marked as N/A and need to be converted to None
             if again:
@@ -51,31 +205,267 @@ def parse_professors(html_content: str) -> pl.DataFrame:
             else:
                 would_take_agains.append(None)
             difficulties.append(diff[1].text if len(diff) > 1 else None)
+            professor_ids.append(
+                _professor_id(link.get("href") if link is not None else None)
+            )
+        except Exception as error:
+            raise CardParseError(index, error) from error
 
-        except AttributeError:
-            # TODO we can't just continue, but also we can't afford to not continue
-            continue
+    return professors_from_columns(
+        names,
+        departments,
+        schools,
+        qualities,
+        num_ratings,
+        would_take_agains,
+        difficulties,
+        professor_ids,
+    )
 
-    # Create Polars DataFrame
-    return pl.DataFrame(
-        {
-            "Name": names,
-            "Department": departments,
-            "School": schools,
-            "Quality": qualities,
-            "# of Ratings": num_ratings,
-            "Would Take Again (%)": would_take_agains,
-            "Difficulty": difficulties,
-        }
+
+def professors_from_columns(
+    names,
+    departments,
+    schools,
+    qualities,
+    num_ratings,
+    would_take_agains,
+    difficulties,
+    professor_ids,
+) -> pl.DataFrame:
+    """
+    Builds the dataframe shared by every parser engine from its column-wise lists
+    of card text, typed as PROFESSOR_SCHEMA.
+    Professor ID is the RMP ID of the professor, when the page links to it.
+    """
+    # The cards' text is collected as strings and typed once for the whole page
+    return typed_professors(
+        pl.DataFrame(
+            {
+                "Name": names,
+                "Department": departments,
+                "School": schools,
+                "Quality": qualities,
+                "# of Ratings": num_ratings,
+                "Would Take Again (%)": would_take_agains,
+                "Difficulty": difficulties,
+                "Professor ID": professor_ids,
+            },
+            schema={column: pl.String for column in PROFESSOR_SCHEMA},
+        )
+    )
+
+
+def typed_professors(df: pl.DataFrame) -> pl.DataFrame:
+    """
+    Casts parsed professors to PROFESSOR_SCHEMA, whether their columns are the strings
+    files were saved with before professors were typed or already typed.
+    Numbers that don't parse become null, missing columns are all null.
+    """
+    return df.select(
+        (
+            pl.col(column).cast(dtype, strict=False)
+            if column in df.columns
+            else pl.lit(None, dtype).alias(column)
+        )
+        for column, dtype in PROFESSOR_SCHEMA.items()
     )
 
 
+def iter_professor_frames(batches):
+    """
+    Yields the professors dataframe of each batch of card records extracted in the browser
+    (see ProfessorScraper.iter_professor_records) as it arrives.
+    A record is the text of a card's [name, department, school, quality, rating count,
+    would take again, difficulty] and its link. Cards seen in an earlier batch are skipped.
+    """
+    seen = set()
+    for records in batches:
+        names, departments, schools = [], [], []
+        qualities, num_ratings, would_take_agains, difficulties = [], [], [], []
+        professor_ids = []
+        for name, department, school, quality, num, again, difficulty, href in records:
+            professor_id = _professor_id(href)
+            if professor_id is not None:
+                if professor_id in seen:
+                    continue
+                seen.add(professor_id)
+            names.append(name)
+            departments.append(department)
+            schools.append(school)
+            qualities.append(quality)
+            num_ratings.append(num.split()[0] if num and num.split() else "0")
+            # Professors without a would take again percentage are marked as N/A
+            again = again.strip("%") if again is not None else None
+            would_take_agains.append(None if again == "N/A" else again)
+            difficulties.append(difficulty)
+            professor_ids.append(professor_id)
+        CARDS_PARSED.inc(len(names), engine="browser")
+        yield professors_from_columns(
+            names,
+            departments,
+            schools,
+            qualities,
+            num_ratings,
+            would_take_agains,
+            difficulties,
+            professor_ids,
+        )
+
+
+def parse_professor_records(batches) -> pl.DataFrame:
+    """
+    Builds the professors dataframe from batches of card records (see iter_professor_frames).
+    """
+    return concat_professors(list(iter_professor_frames(batches)))
+
+
+def spool_professor_records(batches, directory) -> int:
+    """
+    Writes the professors of each batch of card records to a parquet file of its own
+    in directory as it arrives, so no more than a batch is held in memory.
+    The files read back by read_spooled_professors are what parse_professor_records
+    returns. Returns the number of professors written.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    professors = 0
+    for i, df in enumerate(iter_professor_frames(batches)):
+        # Empty batches too, so a school without professors still reads back
+        df.write_parquet(directory / f"batch-{i:05}.parquet")
+        professors += df.height
+    return professors
+
+
+def read_spooled_professors(directory) -> pl.DataFrame:
+    """
+    Reads back the professors spool_professor_records wrote to directory, in batch order.
+    """
+    return concat_professors(
+        [pl.read_parquet(file) for file in sorted(Path(directory).glob("*.parquet"))]
+    )
+
+
+def concat_professors(frames: list) -> pl.DataFrame:
+    """
+    Concatenates batches of parsed professors into one dataframe typed as PROFESSOR_SCHEMA.
+    """
+    if not frames:
+        return professors_from_columns([], [], [], [], [], [], [], [])
+    # Each batch has categories of its own, so they're joined as strings and typed again
+    return typed_professors(
+        pl.concat([df.cast({pl.Categorical: pl.String}) for df in frames])
+    )
+
+
+PARSER_ENGINES = {
+    "lxml": parse_professors_lxml,
+    "bs4": parse_professors_bs4,
+}
+
+
+@timed("save_parquet")
 def save_to_parquet(df, output_file):
     """
     Takes a polars dataframe and saves it to a parquet file.
     This allows for faster loading and saving of dataframes in smaller file sizes.
+
+    The file is written next to its destination and then renamed over it,
+    so readers never see a partially written parquet.
     """
-    df.write_parquet(output_file)
+    output_file = Path(output_file)
+    tmp_file = output_file.with_name(f".{output_file.name}.{os.getpid()}.tmp")
+    try:
+        df.write_parquet(tmp_file, compression="zstd", statistics=True)
+        os.replace(tmp_file, output_file)
+    finally:
+        tmp_file.unlink(missing_ok=True)
+
+
+def parse_file(html_file: Path, output_file: Path, engine: str = "lxml") -> int:
+    """
+    Parses a single html file into a parquet file.
+    Returns the number of professors parsed.
+    """
+    df = parse_professors_from_path(html_file, engine=engine)
+    save_to_parquet(df, output_file)
+    return df.height
+
+
+def parse_batch(
+    html_dir,
+    output_dir=Path("data", "dataframes"),
+    workers: int = None,
+    engine: str = "lxml",
+    force: bool = False,
+) -> dict:
+    """
+    Parses every html file in a directory across a pool of processes.
+    Files whose parquet is newer than the html are skipped unless forced.
+    A file failing to parse is recorded and the rest of the batch carries on.
+
+    Returns a report with the files parsed, skipped and failed (with their errors),
+    the professors parsed and the elapsed seconds.
+    """
+    from tqdm import tqdm
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    report = {"parsed": [], "skipped": [], "failed": {}, "professors": 0}
+
+    pending = {}
+    for html_file in sorted(Path(html_dir).iterdir()):
+        if not html_file.is_file() or html_file.name.startswith("."):
+            continue
+        output_file = output_dir / (html_file.name + ".parquet")
+        # Skip pages that haven't changed since they were last parsed
+        if (
+            not force
+            and output_file.exists()
+            and output_file.stat().st_mtime >= html_file.stat().st_mtime
+        ):
+            report["skipped"].append(html_file.name)
+            continue
+        pending[html_file] = output_file
+
+    start = time.perf_counter()
+    # Workers are spawned, forking a process that already ran polars can deadlock them
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        futures = {
+            executor.submit(parse_file, html_file, output_file, engine): html_file
+            for html_file, output_file in pending.items()
+        }
+        for future in tqdm(
+            as_completed(futures), total=len(futures), desc="Parsing html files"
+        ):
+            html_file = futures[future]
+            try:
+                report["professors"] += future.result()
+                report["parsed"].append(html_file.name)
+            except Exception as e:
+                report["failed"][html_file.name] = f"{type(e).__name__}: {e}"
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+
+def print_report(report: dict) -> None:
+    """
+    Prints the throughput and failures of a batch parse.
+    """
+    seconds = max(report["seconds"], 1e-9)
+    print(
+        f"Parsed {len(report['parsed'])} files ({report['professors']} professors) "
+        f"in {report['seconds']:.1f}s: "
+        f"{len(report['parsed']) / seconds:.1f} files/sec, "
+        f"{report['professors'] / seconds:.0f} professors/sec"
+    )
+    print(f"Skipped {len(report['skipped'])} up to date files")
+    if report["failed"]:
+        print(f"Failed {len(report['failed'])} files:")
+        for name, error in report["failed"].items():
+            print(f"  {name}: {error}")
 
 
 def parse_all(file_path):
@@ -83,11 +473,28 @@ def parse_all(file_path):
     Takes the file path of the directory containing html files
     Parses all the files and saves them to parquet files.
     """
-    # glob to get all the files in the directory
-    files = [file.name for file in Path(file_path).iterdir()]
-    for file in files:
-        if file == ".DS_Store":
-            continue
+    report = parse_batch(file_path, force=True)
+    print_report(report)
+    return report
 
-        df = parse_professors_from_path(Path(file_path) / file)
-        save_to_parquet(df, Path("data", "dataframes", file + ".parquet"))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Re-parse a directory of saved RMP html pages into parquet files."
+    )
+    parser.add_argument("html_dir", type=Path)
+    parser.add_argument("--output-dir", type=Path, default=Path("data", "dataframes"))
+    parser.add_argument(
+        "--workers", type=int, default=None, help="defaults to the number of CPUs"
+    )
+    parser.add_argument("--engine", choices=list(PARSER_ENGINES), default="lxml")
+    parser.add_argument(
+        "--force", action="store_true", help="re-parse files that are up to date"
+    )
+    args = parser.parse_args()
+
+    batch_report = parse_batch(
+        args.html_dir, args.output_dir, args.workers, args.engine, args.force
+    )
+    print_report(batch_report)
+    raise SystemExit(1 if batch_report["failed"] else 0)
@@ -0,0 +1,275 @@
+import functools
+import json
+import plotly.graph_objs as go
+import polars as pl
+from src.backends import METRICS
+
+
+def box_summary(df: pl.DataFrame) -> pl.DataFrame:
+    """
+    Takes a dataframe of school and value columns and computes Plotly's box statistics per school.
+    Quartiles use linear interpolation and the whiskers reach the furthest values
+    within 1.5 IQR of the box, like Plotly computes them from raw values.
+
+    Returns one row per school with q1, median, q3, lowerfence, upperfence
+    and the list of outliers beyond the whiskers.
+    """
+    value = pl.col("value")
+    quartiles = df.group_by("school").agg(
+        q1=value.quantile(0.25, "linear"),
+        median=value.median(),
+        q3=value.quantile(0.75, "linear"),
+    )
+    iqr = pl.col("q3") - pl.col("q1")
+    inside = value.is_between(pl.col("q1") - 1.5 * iqr, pl.col("q3") + 1.5 * iqr)
+    whiskers = (
+        df.join(quartiles, on="school")
+        .with_columns(inside=inside)
+        .group_by("school")
+        .agg(
+            lowerfence=value.filter(pl.col("inside")).min(),
+            upperfence=value.filter(pl.col("inside")).max(),
+            outliers=value.filter(~pl.col("inside")),
+        )
+    )
+    return quartiles.join(whiskers, on="school")
+
+
+# Response forms of the plot endpoints: "compact" sends the data columns only,
+# drawn in the browser with plot_layouts(), "figure" sends the whole Plotly figure
+PLOT_FORMATS = ("compact", "figure")
+
+# Color of every bar, box and outlier
+PLOT_COLOR = "#FF9149"
+
+
+def figure_json(fig) -> str:
+    # Imported here as it loads narwhals, which the compact responses don't need
+    # (nor are the figure classes loaded before they're used, see the quoted annotations)
+    import plotly.utils
+
+    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+
+
+def metric_axis(metric: str) -> tuple:
+    """
+    Returns the (tick values, range) of a metric's axis.
+    """
+    if metric != "retake_percent":
+        return [1, 2, 3, 4, 5], [1, 5]
+    return [0, 25, 50, 75, 100], [0, 100]
+
+
+def department_bar_title(school_name: str) -> str:
+    return f"Department Wide Averages at {school_name}"
+
+
+def department_bar_layout(metric: str, title: str = None) -> "go.Layout":
+    """
+    Returns the layout of the department averages bar plot for a metric.
+    """
+    # Change the title and axis based on user selection
+    if metric == "difficulty":
+        axis_title = "Average Professor Difficulty"
+    elif metric == "quality":
+        axis_title = "Average Professor Quality"
+    else:
+        axis_title = "Average Professor Retake Percent"
+    ticks, span = metric_axis(metric)
+
+    return go.Layout(
+        title=title,
+        xaxis=dict(title="Department", tickangle=45),
+        yaxis=dict(title=axis_title, range=span, tickvals=ticks),
+        height=600,
+        margin=dict(b=150),
+        paper_bgcolor="#FFEDDB",
+    )
+
+
+def department_bar_json(school_name: str, metric: str, data: list) -> str:
+    """
+    Builds the bar plot of department averages at a school
+    from (department, average, total ratings) rows and returns its JSON.
+    """
+    departments = [row[0] for row in data]
+    avg_stat = [row[1] for row in data]
+    total_ratings = [row[2] for row in data]
+
+    bar = go.Bar(
+        x=departments,
+        y=avg_stat,
+        text=[f"{tr} ratings" for tr in total_ratings],
+        marker_color=PLOT_COLOR,
+    )
+    layout = department_bar_layout(metric, department_bar_title(school_name))
+    return figure_json(go.Figure(data=[bar], layout=layout))
+
+
+def department_bar_data(school_name: str, metric: str, data: list) -> dict:
+    """
+    Returns the compact form of the department averages bar plot:
+    its title and columns of departments, averages and total ratings.
+    Drawn in the browser with the layouts of plot_layouts() (see static/js/plots.js).
+    """
+    return {
+        "metric": metric,
+        "title": department_bar_title(school_name),
+        "departments": [row[0] for row in data],
+        "averages": [None if row[1] is None else float(row[1]) for row in data],
+        "total_ratings": [row[2] for row in data],
+    }
+
+
+def box_plot_title(department: str, metric: str) -> str:
+    return f"{metric.replace('_', ' ').title()} Distribution in {department} Across Schools"
+
+
+def box_plot_layout(metric: str, title: str = None) -> "go.Layout":
+    """
+    Returns the layout of the box plot of a metric across schools.
+    """
+    ticks, span = metric_axis(metric)
+    return go.Layout(
+        title=title,
+        xaxis=dict(title=metric.replace("_", " ").title(), range=span, tickvals=ticks),
+        paper_bgcolor="#FFEDDB",
+        height=600,
+    )
+
+
+def box_plot_columns(school_names: list, df: pl.DataFrame, summary: bool) -> dict:
+    """
+    Returns the schools with values, in the order they were selected, with either
+    every instructor's value per school or (summary=True) columns of the box statistics.
+    """
+    # Boxes are drawn in the order the schools were selected
+    order = list(dict.fromkeys(school_names))
+    if summary:
+        stats = {row["school"]: row for row in box_summary(df).iter_rows(named=True)}
+        schools = [school for school in order if school in stats]
+        columns = {"schools": schools}
+        for name in ("q1", "median", "q3", "lowerfence", "upperfence", "outliers"):
+            columns[name] = [stats[school][name] for school in schools]
+        return columns
+    values_by_school = {
+        key[0]: group["value"].to_list()
+        for key, group in df.partition_by("school", as_dict=True).items()
+    }
+    schools = [school for school in order if values_by_school.get(school)]
+    return {
+        "schools": schools,
+        "values": [values_by_school[school] for school in schools],
+    }
+
+
+def box_plot_json(
+    school_names: list, department: str, metric: str, df: pl.DataFrame, summary: bool
+) -> str:
+    """
+    Builds the box plot of a metric in a department across schools from a dataframe
+    of school and value columns and returns its JSON, or None when no school has values.
+
+    With summary=True only each school's quartiles, whiskers and outliers are sent
+    instead of every instructor's value.
+    """
+    columns = box_plot_columns(school_names, df, summary)
+    box_data = []
+    for i, school in enumerate(columns["schools"]):
+        if summary:
+            box_data.append(
+                go.Box(
+                    y=[school],
+                    q1=[columns["q1"][i]],
+                    median=[columns["median"][i]],
+                    q3=[columns["q3"][i]],
+                    lowerfence=[columns["lowerfence"][i]],
+                    upperfence=[columns["upperfence"][i]],
+                    name=school,
+                    marker_color=PLOT_COLOR,
+                    orientation="h",
+                    hoverinfo="x",
+                )
+            )
+            outliers = columns["outliers"][i]
+            if outliers:
+                box_data.append(
+                    go.Scatter(
+                        x=outliers,
+                        y=[school] * len(outliers),
+                        mode="markers",
+                        marker_color=PLOT_COLOR,
+                        showlegend=False,
+                        hoverinfo="x",
+                    )
+                )
+        else:
+            box_data.append(
+                go.Box(
+                    x=columns["values"][i],
+                    name=school,
+                    boxpoints="outliers",
+                    marker_color=PLOT_COLOR,
+                    orientation="h",
+                    hoverinfo="x",
+                )
+            )
+
+    if not box_data:
+        return None
+    layout = box_plot_layout(metric, box_plot_title(department, metric))
+    return figure_json(go.Figure(data=box_data, layout=layout))
+
+
+def box_plot_data(
+    school_names: list, department: str, metric: str, df: pl.DataFrame, summary: bool
+) -> dict:
+    """
+    Returns the compact form of the box plot (see box_plot_columns),
+    or None when no school has values.
+    """
+    columns = box_plot_columns(school_names, df, summary)
+    if not columns["schools"]:
+        return None
+    return dict(
+        {
+            "metric": metric,
+            "title": box_plot_title(department, metric),
+            "summary": summary,
+        },
+        **columns,
+    )
+
+
+@functools.cache
+def plot_layouts() -> str:
+    """
+    Returns the JSON of every plot's layout per metric, Plotly's default template
+    and the style of the traces, which the browser fills in with the compact payloads.
+    Built once per process.
+    """
+
+    layouts = {
+        # Figures apply the default template to their layout, it is sent once for every plot
+        "template": go.Figure().to_plotly_json()["layout"]["template"],
+        "school_plot": {
+            "layouts": {m: department_bar_layout(m).to_plotly_json() for m in METRICS},
+            "bar": go.Bar(marker_color=PLOT_COLOR).to_plotly_json(),
+        },
+        "box_plot": {
+            "layouts": {m: box_plot_layout(m).to_plotly_json() for m in METRICS},
+            "box": go.Box(
+                boxpoints="outliers",
+                marker_color=PLOT_COLOR,
+                orientation="h",
+                hoverinfo="x",
+            ).to_plotly_json(),
+            "summary_box": go.Box(
+                marker_color=PLOT_COLOR, orientation="h", hoverinfo="x"
+            ).to_plotly_json(),
+            "outliers": go.Scatter(
+                mode="markers", marker_color=PLOT_COLOR, showlegend=False, hoverinfo="x"
+            ).to_plotly_json(),
+        },
+    }
+    return figure_json(layouts)
@@ -0,0 +1,130 @@
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import time
+from pathlib import Path
+
+# Where the profiles of requests are written, one .prof file per request
+PROFILE_PATH = Path("data", "profiles")
+# "off" never profiles, "header" profiles requests sent with the X-Profile header
+# and "all" profiles every request (i.e. while load testing a single worker)
+PROFILING_MODES = ("off", "header", "all")
+PROFILE_HEADER = "X-Profile"
+# Response header naming the profile written
+PROFILE_FILE_HEADER = "X-Profile-File"
+# Functions listed by an X-Profile: text response
+PROFILE_TEXT_LINES = 40
+
+
+class RequestProfiler:
+    """
+    Runs requests under cProfile and dumps each profile as a .prof file,
+    readable with pstats or snakeviz. A request sent with "X-Profile: text"
+    gets the slowest functions by cumulative time back instead of its response.
+
+    Only one request is profiled at a time, as the profiler hooks the whole
+    interpreter, others arriving meanwhile are served as usual.
+    """
+
+    def __init__(self, mode: str = "off", path: Path = PROFILE_PATH):
+        if mode not in PROFILING_MODES:
+            raise ValueError(
+                f"Unknown profiling mode {mode}, expected one of {PROFILING_MODES}"
+            )
+        self.mode = mode
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def wanted(self, header: str = None) -> bool:
+        """
+        Returns whether a request is to be profiled given its X-Profile header, if any.
+        """
+        if self.mode == "all":
+            return True
+        return self.mode == "header" and header is not None
+
+    def profile(self, name: str, call):
+        """
+        Calls call() under the profiler unless another request is being profiled.
+        Returns its result and the path of the profile written, or None.
+        """
+        if not self._lock.acquire(blocking=False):
+            return call(), None
+        try:
+            profiler = cProfile.Profile()
+            result = profiler.runcall(call)
+            self.path.mkdir(parents=True, exist_ok=True)
+            slug = re.sub(r"[^0-9A-Za-z_-]+", "_", name).strip("_") or "index"
+            now = time.time()
+            stamp = (
+                time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+                + f"{now % 1:.3f}"[1:]
+            )
+            profile_file = self.path / f"{stamp}_{os.getpid()}_{slug}.prof"
+            profiler.dump_stats(profile_file)
+        finally:
+            self._lock.release()
+        return result, profile_file
+
+
+def profile_text(profile_file: Path, lines: int = PROFILE_TEXT_LINES) -> str:
+    """
+    Returns the functions of a profile with the most cumulative time as text.
+    """
+    out = io.StringIO()
+    stats = pstats.Stats(str(profile_file), stream=out)
+    stats.sort_stats("cumulative").print_stats(lines)
+    return out.getvalue()
+
+
+class ProfilerMiddleware:
+    """
+    WSGI middleware profiling the requests the profiler wants (see RequestProfiler.wanted).
+    The response of a profiled request is built in full under the profiler,
+    then sent with the X-Profile-File header naming its profile.
+    """
+
+    def __init__(self, wsgi_app, profiler: RequestProfiler):
+        self.wsgi_app = wsgi_app
+        self.profiler = profiler
+
+    def __call__(self, environ, start_response):
+        header = environ.get("HTTP_" + PROFILE_HEADER.upper().replace("-", "_"))
+        if not self.profiler.wanted(header):
+            return self.wsgi_app(environ, start_response)
+        started, body = [], []
+
+        def capture(status, headers, exc_info=None):
+            started[:] = [status, headers, exc_info]
+            return body.append
+
+        def respond():
+            app_iter = self.wsgi_app(environ, capture)
+            try:
+                body.extend(app_iter)
+            finally:
+                if hasattr(app_iter, "close"):
+                    app_iter.close()
+
+        _, profile_file = self.profiler.profile(environ.get("PATH_INFO", ""), respond)
+        status, headers, exc_info = started
+        if profile_file is None:
+            start_response(status, headers, exc_info)
+            return body
+        if header == "text":
+            headers = [("Content-Type", "text/plain; charset=utf-8")]
+            start_response(
+                "200 OK", headers + [(PROFILE_FILE_HEADER, profile_file.name)]
+            )
+            return [profile_text(profile_file).encode()]
+        start_response(
+            status, headers + [(PROFILE_FILE_HEADER, profile_file.name)], exc_info
+        )
+        return body
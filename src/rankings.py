@@ -0,0 +1,92 @@
+import math
+from src.backends import METRICS
+
+# Schools per leaderboard page, and the most a request can ask for
+LEADERBOARD_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+# Ratings a school's department needs to be ranked unless min_reviews says otherwise
+LEADERBOARD_MIN_REVIEWS = 100
+LEADERBOARD_ORDERS = ("desc", "asc")
+
+
+def page_params(page, per_page) -> tuple:
+    """
+    Returns the page number (from 1) and page size of a paginated request.
+    Raises ValueError with the message to answer with when either isn't usable.
+    """
+    try:
+        page = int(page)
+        per_page = int(per_page)
+    except (TypeError, ValueError):
+        raise ValueError("page and per_page must be numbers") from None
+    if page < 1:
+        raise ValueError("page must be at least 1")
+    if not 1 <= per_page <= MAX_PAGE_SIZE:
+        raise ValueError(f"per_page must be between 1 and {MAX_PAGE_SIZE}")
+    return page, per_page
+
+
+def leaderboard_data(
+    department: str,
+    metric: str,
+    order: str,
+    min_reviews: int,
+    page: int,
+    per_page: int,
+    total: int,
+    rows: list,
+) -> dict:
+    """
+    Returns a page of the department leaderboard from the backend's count and
+    (rank, school, average, total ratings, instructors) rows.
+    """
+    return {
+        "department": department,
+        "metric": metric,
+        "order": order,
+        "min_reviews": min_reviews,
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "pages": math.ceil(total / per_page),
+        "schools": [
+            {
+                "rank": rank,
+                "school": school,
+                "average": None if average is None else float(average),
+                "total_ratings": total_ratings,
+                "instructors": instructors,
+            }
+            for rank, school, average, total_ratings, instructors in rows
+        ],
+    }
+
+
+def percentile_data(school_name: str, instructor: str, rows: list) -> dict:
+    """
+    Returns the percentiles of the matching instructors from the backend's rows.
+    Percentiles are percentages, the share of the department's other instructors
+    with a lower value.
+    """
+    instructors = []
+    for row in rows:
+        _, name, department, total_ratings, *values = row
+        metrics = {}
+        for i, metric in enumerate(METRICS):
+            value, percentile, peers = values[3 * i : 3 * i + 3]
+            metrics[metric] = {
+                "value": value,
+                "percentile": (
+                    None if percentile is None else round(percentile * 100, 1)
+                ),
+                "peers": peers,
+            }
+        instructors.append(
+            {
+                "instructor": name,
+                "department": department,
+                "total_ratings": total_ratings,
+                "metrics": metrics,
+            }
+        )
+    return {"school": school_name, "instructor": instructor, "instructors": instructors}
@@ -0,0 +1,84 @@
+import threading
+import time
+
+
+class Readiness:
+    """
+    Whether the process' data is ready to be served, reported by /ready
+    as "waiting", "preparing", "ready" or "failed".
+
+    The data is either prepared by the process itself, in a background thread
+    while requests are served (see start), or by another process (i.e. python app.py
+    --prepare only or the ASGI server's parent). Until then probe() is called on
+    every check, and the process is ready once it returns True.
+
+    on_ready is called once the data is ready, to drop what was loaded from it
+    while it was being prepared.
+    """
+
+    def __init__(self, probe, on_ready=None):
+        self.probe = probe
+        self.on_ready = on_ready
+        self._lock = threading.Lock()
+        self._status = "waiting"
+        self._error = None
+        self._prepare_seconds = None
+
+    @property
+    def status(self) -> str:
+        return self._status
+
+    def start(self, prepare) -> threading.Thread:
+        """
+        Calls prepare() in a background thread, the process is ready once it returns.
+        """
+        self._set(status="preparing")
+        thread = threading.Thread(
+            target=self.run, args=(prepare,), name="prepare-data", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def run(self, prepare) -> None:
+        """
+        Calls prepare(), then reports the process ready, or failed if it raises.
+        """
+        self._set(status="preparing")
+        start = time.perf_counter()
+        try:
+            prepare()
+        except Exception as error:
+            self._set(status="failed", error=f"{type(error).__name__}: {error}")
+            raise
+        self._ready(time.perf_counter() - start)
+
+    def check(self) -> dict:
+        """
+        Returns the status, with the error of a failed preparation and the seconds it took.
+        Waiting processes probe the data first.
+        """
+        if self._status == "waiting":
+            try:
+                prepared = self.probe()
+            # i.e. the database isn't created or reachable yet
+            except Exception:
+                prepared = False
+            if prepared:
+                self._ready(None)
+        with self._lock:
+            return {
+                "status": self._status,
+                "error": self._error,
+                "prepare_seconds": self._prepare_seconds,
+            }
+
+    def _ready(self, seconds) -> None:
+        # Called before the status changes, so requests let through by /ready see fresh data
+        if self.on_ready is not None:
+            self.on_ready()
+        self._set(status="ready", error=None, prepare_seconds=seconds)
+
+    def _set(self, **state) -> None:
+        with self._lock:
+            for name, value in state.items():
+                setattr(self, f"_{name}", value)
@@ -0,0 +1,101 @@
+import argparse
+from pathlib import Path
+from sqlalchemy import create_engine
+from src.api_scraper import API_URL, ApiScrapeError, ApiScraper
+from src.db import pool_options
+from src.dataset import DATAFRAMES_PATH, DATASET_PATH, write_dataset
+from src.parse_professors import save_to_parquet
+from src.schools import get_school_registry
+from src.seeding import Seeding
+
+
+def ingest_school(
+    connection,
+    school_id: int,
+    school_name: str,
+    df,
+    dataframes_path: Path = DATAFRAMES_PATH,
+    dataset_path: Path = DATASET_PATH,
+    complete: bool = True,
+) -> dict:
+    """
+    Syncs a freshly scraped school into the database, then saves its parquet file
+    and its partition of the dataset (when the dataset has been built).
+    A school whose professors haven't changed since its last scrape skips every write.
+    complete=False (i.e. the scrape stopped before every professor loaded) keeps
+    the instructors missing from the scrape.
+    Returns the sync report of Seeding.sync_dataframes.
+    """
+    report = Seeding(connection).sync_dataframes([df], delete_missing=complete)
+    if school_id in report["unchanged_schools"]:
+        print(f"{school_name} is unchanged since its last scrape")
+        return report
+    save_to_parquet(df, Path(dataframes_path) / f"{school_name}.parquet")
+    # Keep the consolidated dataset current for the parquet backend if it has been built
+    if Path(dataset_path).exists():
+        write_dataset(dataset_path, df)
+    return report
+
+
+def refresh_stale_schools(
+    engine,
+    max_age: float,
+    limit: int = None,
+    scraper: ApiScraper = None,
+    dataframes_path: Path = DATAFRAMES_PATH,
+    dataset_path: Path = DATASET_PATH,
+) -> dict:
+    """
+    Re-scrapes the schools last scraped more than max_age seconds ago (oldest first)
+    through the GraphQL API and ingests the ones that changed.
+    Returns {school_id: sync report}, or the ApiScrapeError a school failed with.
+    """
+    scraper = scraper or ApiScraper()
+    with engine.connect() as connection:
+        school_ids = Seeding(connection).stale_school_ids(max_age, limit)
+    print(f"Refreshing {len(school_ids)} stale schools")
+    results = {}
+    for school_id, df in scraper.scrape_schools(school_ids).items():
+        if isinstance(df, ApiScrapeError):
+            print(f"Failed to refresh school {school_id}: {df}")
+            results[school_id] = df
+            continue
+        if not df.height:
+            print(
+                f"No professors found for school {school_id}, keeping the previous scrape"
+            )
+            continue
+        with engine.connect() as connection:
+            results[school_id] = ingest_school(
+                connection,
+                school_id,
+                get_school_registry().name_for(school_id),
+                df,
+                dataframes_path,
+                dataset_path,
+            )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Re-scrape the schools that haven't been scraped recently."
+    )
+    parser.add_argument("--database-url", default="postgresql:///rmp.db")
+    parser.add_argument("--max-age-days", type=float, default=7)
+    parser.add_argument("--limit", type=int, help="Refresh at most this many schools")
+    parser.add_argument("--base-url", default=API_URL)
+    args = parser.parse_args()
+
+    results = refresh_stale_schools(
+        create_engine(args.database_url, **pool_options()),
+        args.max_age_days * 24 * 3600,
+        args.limit,
+        ApiScraper(args.base_url),
+    )
+    reports = [r for r in results.values() if isinstance(r, dict)]
+    changed = sum(bool(r["changed_schools"]) for r in reports)
+    print(
+        f"Refreshed {len(reports)} schools ({changed} changed, "
+        f"{len(results) - len(reports)} failed)"
+    )
@@ -0,0 +1,106 @@
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from pathlib import Path
+
+SCHOOL_NAMES_PATH = Path(__file__).parent.parent / "data/school_names.json"
+
+
+def normalize_school_name(name: str) -> str:
+    """
+    Normalizes a school name for matching.
+    Ignores case, accents, punctuation and repeated whitespace, and treats "&" as "and"
+    (i.e. "Texas A&M University-Commerce" matches "texas a and m university commerce")
+    """
+    if not name:
+        return ""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    name = name.casefold().replace("&", " and ")
+    name = re.sub(r"[^\w\s]", " ", name)
+    return " ".join(name.split())
+
+
+class SchoolRegistry:
+    """
+    Process-wide lookup of Rate My Professor school IDs and names.
+    Loaded once from the JSON file of prescraped names and reloaded when the file changes.
+    Lookups by ID or name are dictionary lookups.
+    """
+
+    def __init__(self, path: Path = SCHOOL_NAMES_PATH, check_interval: float = 1.0):
+        self.path = Path(path)
+        # Seconds between checks of the file for changes
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._checked_at = 0.0
+        self._names = {}
+        self._ids = {}
+        self._normalized_ids = {}
+
+    def names(self) -> dict:
+        """
+        Returns a dictionary of all school IDs (as strings like the JSON file) and their names
+        """
+        self._refresh()
+        return self._names
+
+    def id_for(self, name: str) -> int:
+        """
+        Returns the ID of a school name, falling back to a normalized match.
+        Returns None for unknown schools.
+        """
+        self._refresh()
+        school_id = self._ids.get(name)
+        if school_id is None:
+            school_id = self._normalized_ids.get(normalize_school_name(name))
+        return school_id
+
+    def name_for(self, school_id) -> str:
+        """
+        Returns the name of a school ID or None for unknown IDs.
+        """
+        self._refresh()
+        return self._names.get(str(school_id))
+
+    def _refresh(self) -> None:
+        now = time.monotonic()
+        if self._stamp is not None and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            stat = os.stat(self.path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            self._checked_at = now
+            if stamp == self._stamp:
+                return
+            with open(self.path, "r", encoding="UTF-8") as file:
+                names = json.load(file)
+            # Flipping the id name mapping, later IDs win like the original dict reversal
+            ids = {name: int(key) for key, name in names.items()}
+            normalized_ids = {
+                normalize_school_name(name): school_id
+                for name, school_id in ids.items()
+            }
+            # Swapped in together so readers never see a half loaded registry
+            self._names, self._ids, self._normalized_ids = names, ids, normalized_ids
+            self._stamp = stamp
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_school_registry() -> SchoolRegistry:
+    """
+    Returns the registry shared by the whole process.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = SchoolRegistry()
+    return _registry
@@ -0,0 +1,285 @@
+import queue
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+import polars as pl
+from src.api_scraper import ApiScrapeError
+from src.metrics import SCRAPE_JOBS, timed
+from src.parse_professors import parse_professors, read_spooled_professors
+from src.scraping import ProfessorScraper
+
+
+class DriverPool:
+    """
+    Bounded pool of long-lived scrapers.
+    Browsers are started lazily, health checked before each use
+    and replaced when they have crashed, so Chrome only starts once per slot.
+    """
+
+    def __init__(self, size: int = 2, factory=ProfessorScraper):
+        self.size = size
+        self.factory = factory
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._all = []
+
+    def acquire(self) -> ProfessorScraper:
+        """
+        Blocks until a slot is free and returns a healthy scraper.
+        Scrapers that fail their health check or reset are quit and replaced.
+        """
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    scraper = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._start()
+                if scraper.is_alive():
+                    try:
+                        scraper.reset()
+                        return scraper
+                    # i.e. a WebDriverException from a session that died since the check
+                    except Exception:
+                        pass
+                self._discard(scraper)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, scraper: ProfessorScraper) -> None:
+        """
+        Returns a scraper to the pool, dropping it if its browser died mid-job.
+        """
+        if scraper.is_alive():
+            self._idle.put(scraper)
+        else:
+            self._discard(scraper)
+        self._slots.release()
+
+    def close(self) -> None:
+        """
+        Quits every browser owned by the pool.
+        """
+        with self._lock:
+            scrapers, self._all = self._all, []
+        for scraper in scrapers:
+            try:
+                scraper.quit()
+            except Exception:
+                pass
+
+    def _start(self) -> ProfessorScraper:
+        scraper = self.factory()
+        with self._lock:
+            self._all.append(scraper)
+        return scraper
+
+    def _discard(self, scraper: ProfessorScraper) -> None:
+        with self._lock:
+            if scraper in self._all:
+                self._all.remove(scraper)
+        try:
+            scraper.quit()
+        except Exception:
+            pass
+
+
+class ScrapeJob:
+    """
+    A single school scrape and its progress.
+    Updated by the worker thread and read by the status endpoints.
+    """
+
+    def __init__(self, school_id: int, school_name: str):
+        self.job_id = uuid.uuid4().hex
+        self.school_id = school_id
+        self.school_name = school_name
+        self.status = "queued"
+        self.total_professors = None
+        self.total_clicks = None
+        self.clicks_done = 0
+        self.rows = None
+        # "api" or "selenium", whichever scraper fetched the professors
+        self.source = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def update(self, **fields) -> None:
+        """
+        Progress callback handed to the scraper (e.g. total_professors, clicks_done).
+        """
+        for key, value in fields.items():
+            setattr(self, key, value)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "school_id": self.school_id,
+            "school_name": self.school_name,
+            "status": self.status,
+            "total_professors": self.total_professors,
+            "total_clicks": self.total_clicks,
+            "clicks_done": self.clicks_done,
+            "rows": self.rows,
+            "source": self.source,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class ScrapeJobQueue:
+    """
+    Background queue of school scrapes worked through by a fixed set of threads.
+    Schools are fetched with the API scraper when one is given, and a worker only
+    borrows a browser from the driver pool when the API fails.
+
+    Browsers either serialize the loaded page to be parsed ("page" extraction)
+    or hand over the cards in batches as they load, each written to a spool
+    directory once parsed ("records", see ProfessorScraper.spool_professors).
+
+    The pipeline is called as pipeline(job, df) with the parsed professors
+    and returns the number of rows ingested.
+    Requests for a school that already has a queued or running job return that job.
+    """
+
+    SCRAPE_URL = "https://www.ratemyprofessors.com/search/professors/{id}?q="
+
+    def __init__(
+        self,
+        pipeline,
+        pool: DriverPool = None,
+        workers: int = None,
+        history=200,
+        api_scraper=None,
+        extraction: str = "page",
+    ):
+        if extraction not in ("page", "records"):
+            raise ValueError(
+                f"Unknown extraction {extraction}, expected page or records"
+            )
+        self.pipeline = pipeline
+        self.extraction = extraction
+        self.pool = pool or DriverPool()
+        self.api_scraper = api_scraper
+        self.workers = workers or self.pool.size
+        # Number of jobs kept around for the status endpoints
+        self.history = history
+        self._queue = queue.Queue()
+        self._jobs = {}
+        # Maps school IDs to their unfinished job for merging duplicate requests
+        self._active = {}
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def submit(self, school_id: int, school_name: str) -> ScrapeJob:
+        """
+        Queues a school to be scraped and returns its job.
+        """
+        with self._lock:
+            job = self._active.get(school_id)
+            if job:
+                return job
+            job = ScrapeJob(school_id, school_name)
+            self._forget_finished()
+            self._jobs[job.job_id] = job
+            self._active[school_id] = job
+            self._start_workers()
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id: str) -> ScrapeJob:
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> list:
+        return list(self._jobs.values())
+
+    def _forget_finished(self) -> None:
+        # Dicts keep insertion order so the oldest jobs are dropped first
+        excess = len(self._jobs) - self.history + 1
+        if excess <= 0:
+            return
+        for job_id in [j.job_id for j in self._jobs.values() if j.finished][:excess]:
+            del self._jobs[job_id]
+
+    def _start_workers(self) -> None:
+        # Threads are only started on the first submission so importing the app stays cheap
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"scrape-worker-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                self._run(job)
+            finally:
+                with self._lock:
+                    self._active.pop(job.school_id, None)
+                self._queue.task_done()
+
+    @timed("scrape_job")
+    def _run(self, job: ScrapeJob) -> None:
+        job.update(status="running", started_at=time.time())
+        try:
+            df = self._fetch_api(job) if self.api_scraper else None
+            if df is None:
+                df = self._fetch_browser(job)
+                job.update(source="selenium")
+            job.update(status="processing")
+            job.update(rows=self.pipeline(job, df), status="done")
+        except Exception as e:
+            traceback.print_exc()
+            job.update(status="failed", error=str(e))
+        finally:
+            job.update(finished_at=time.time())
+            SCRAPE_JOBS.inc(status=job.status, source=job.source or "none")
+
+    def _fetch_api(self, job: ScrapeJob):
+        try:
+            df = self.api_scraper.scrape_school(job.school_id, progress=job.update)
+        except ApiScrapeError as e:
+            print(
+                f"API scrape of {job.school_name} failed, falling back to Selenium: {e}"
+            )
+            job.update(total_professors=None, total_clicks=None, clicks_done=0)
+            return None
+        job.update(source="api")
+        return df
+
+    def _fetch_browser(self, job: ScrapeJob) -> pl.DataFrame:
+        if self.extraction == "records":
+            with tempfile.TemporaryDirectory(prefix="rmp-cards-") as spool:
+                self._load_page(job, "spool_professors", spool)
+                # Read back once the browser is returned to the pool
+                return read_spooled_professors(spool)
+        return parse_professors(self._load_page(job, "read_page_source"))
+
+    def _load_page(self, job: ScrapeJob, method: str, *args):
+        # Calls a ProfessorScraper method on the school's page with a pooled browser
+        scraper = self.pool.acquire()
+        try:
+            return getattr(scraper, method)(
+                self.SCRAPE_URL.format(id=job.school_id),
+                *args,
+                keep_alive=True,
+                progress=job.update,
+            )
+        finally:
+            self.pool.release(scraper)
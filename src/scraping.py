@@ -1,5 +1,4 @@
-import json
-from pathlib import Path
+from functools import lru_cache
 from selenium import webdriver
 from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.chrome.options import Options
@@ -9,13 +8,108 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 from webdriver_manager.chrome import ChromeDriverManager
 from tqdm import tqdm
+import polars as pl
+from src.directory import DirectoryCrawler
+from src.metrics import SHOW_MORE_CLICKS, timed
+from src.parse_professors import (
+    CARD_CLASS,
+    DEPARTMENT_CLASS,
+    FEEDBACK_CLASS,
+    NAME_CLASS,
+    NUM_RATINGS_CLASS,
+    QUALITY_CLASS,
+    SCHOOL_CLASS,
+    spool_professor_records,
+)
+
+# Seconds to wait for a Show More click to load more professors before giving up
+SHOW_MORE_TIMEOUT = 5
+# Show More clicks between extractions of the loaded cards by iter_professor_records
+EXTRACT_EVERY_CLICKS = 25
+
+# Clicks Show More (waiting for the button to appear if it hasn't yet) and calls back with
+# the number of cards once the click has loaded more, or -1 after the timeout.
+# A MutationObserver wakes it on every change to the page, so nothing is polled.
+SHOW_MORE_SCRIPT = """
+const [cardClass, timeout, done] = arguments;
+const cards = document.getElementsByClassName(cardClass);
+const before = cards.length;
+let clicked = false;
+let finished = false;
+const finish = (loaded) => {
+    if (finished) return;
+    finished = true;
+    observer.disconnect();
+    clearTimeout(timer);
+    done(loaded);
+};
+const click = () => {
+    const button = Array.from(document.getElementsByTagName("button")).find(
+        (element) => element.textContent.includes("Show More") && !element.disabled
+    );
+    if (button) {
+        clicked = true;
+        button.click();
+    }
+};
+const observer = new MutationObserver(() => {
+    if (!clicked) click();
+    else if (cards.length !== before) finish(cards.length);
+});
+const timer = setTimeout(() => finish(-1), timeout);
+observer.observe(document.body, {childList: true, subtree: true});
+click();
+"""
+# Returns the text of the cards not read yet as compact arrays of
+# [name, department, school, quality, rating count, would take again, difficulty, link]
+# and empties them, leaving each card's bare link behind as a placeholder.
+# React still owns the card links and inserts the cards Show More loads next to them,
+# so removing the links breaks its next render (NotFoundError in insertBefore).
+# Emptied cards have no card info left, so later extractions skip them.
+# Cards are the TeacherCard link around the card info, which holds the quality and count.
+EXTRACT_CARDS_SCRIPT = """
+const [cardClass, nameClass, departmentClass, schoolClass,
+    qualityClass, countClass, feedbackClass] = arguments;
+const text = (root, className) => {
+    const element = root.querySelector("div." + className);
+    return element ? element.textContent : null;
+};
+const records = [];
+for (const info of Array.from(document.getElementsByClassName(cardClass))) {
+    const link = info.closest("a");
+    const card = link || info.parentElement;
+    const feedback = info.querySelectorAll("div." + feedbackClass);
+    records.push([
+        text(info, nameClass),
+        text(info, departmentClass),
+        text(info, schoolClass),
+        text(card, qualityClass),
+        text(card, countClass),
+        feedback.length > 0 ? feedback[0].textContent : null,
+        feedback.length > 1 ? feedback[1].textContent : null,
+        link ? link.getAttribute("href") : null,
+    ]);
+    card.replaceChildren();
+}
+return records;
+"""
+
+
+@lru_cache(maxsize=1)
+def chrome_driver_path() -> str:
+    """
+    Installs the Chrome webdriver if not cached already and returns its path.
+    Cached so that drivers started after the first one skip the install lookup.
+    """
+    return ChromeDriverManager().install()
 
 
 class ProfessorScraper:
     """
     This class scrapes professor data from Rate My Professors using Selenium.
     It loads the page, clicks the "Show More" button to load all professors,
-    extracts the total number of professors, and returns page source code.
+    extracts the total number of professors, and returns page source code,
+    or takes the cards out of the page in batches as they load (see spool_professors).
     It also provides a method to fetch school names based on their IDs.
     """
 
@@ -25,11 +119,28 @@ class ProfessorScraper:
             options.add_argument("--headless")
             options.add_argument("--no-sandbox")
             options.add_argument("--disable-dev-shm-usage")
-            # install the webdriver if not cached already
         self.driver = webdriver.Chrome(
-            service=ChromeService(ChromeDriverManager().install()), options=options
+            service=ChromeService(chrome_driver_path()), options=options
         )
 
+    def is_alive(self) -> bool:
+        """
+        Health check for long-lived scrapers.
+        Returns False if the browser has crashed or the session was closed.
+        """
+        try:
+            self.driver.execute_script("return 1;")
+            return True
+        except WebDriverException:
+            return False
+
+    def reset(self) -> None:
+        """
+        Clears the state left behind by a previous page so the driver can be reused.
+        """
+        self.driver.delete_all_cookies()
+        self.driver.get("about:blank")
+
     def get_total_professors(self) -> int:
         """
         Extracts the total number of professors from the page.
@@ -53,46 +164,133 @@ class ProfessorScraper:
             print(f"Failed to extract total professors: {e}")
             return 0
 
-    def load_all_professors(self, total_professors: int) -> None:
+    def click_show_more(self) -> int:
+        """
+        Clicks the 'Show More' button and waits for the professors it loads,
+        woken by changes to the page rather than polling it.
+        Returns the number of cards on the page after the click,
+        or -1 when no button showed up or nothing loaded within SHOW_MORE_TIMEOUT seconds.
+        """
+        return self.driver.execute_async_script(
+            SHOW_MORE_SCRIPT, CARD_CLASS, SHOW_MORE_TIMEOUT * 1000
+        )
+
+    def show_more_clicks(self, total_professors: int, progress=None):
         """
-        Clicks the 'Show More' button on the webpage until all professors are loaded.
+        Clicks the 'Show More' button on the webpage until all professors are loaded,
+        yielding the number of clicks done after each one.
         Each button click loads 8 professors.
         The total number of clicks needed is calculated by dividing the total number of professors by 8.
+
+        Optionally reports the clicks done so far through the progress callback.
         """
         # add 7 to the total professors to round up to the nearest multiple of 8
         total_clicks = (total_professors + 7) // 8
-        for _ in tqdm(range(total_clicks), desc="Loading professors"):
+        if progress:
+            progress(total_clicks=total_clicks, clicks_done=0)
+        for clicks_done in tqdm(range(1, total_clicks + 1), desc="Loading professors"):
             try:
-                button = WebDriverWait(self.driver, 5).until(
-                    EC.element_to_be_clickable(
-                        (By.XPATH, "//button[contains(text(), 'Show More')]")
-                    )
-                )
-                self.driver.execute_script("arguments[0].click();", button)
-            except Exception:
-                break
+                if self.click_show_more() < 0:
+                    return
+            except WebDriverException:
+                return
+            SHOW_MORE_CLICKS.inc()
+            if progress:
+                progress(clicks_done=clicks_done)
+            yield clicks_done
+
+    def load_all_professors(self, total_professors: int, progress=None) -> int:
+        """
+        Loads every professor into the page (see show_more_clicks).
+        Returns the number of clicks done.
+        """
+        clicks_done = 0
+        for clicks_done in self.show_more_clicks(total_professors, progress):
+            pass
+        return clicks_done
+
+    def extract_cards(self) -> list:
+        """
+        Returns the text of the teacher cards loaded so far as compact records
+        (see EXTRACT_CARDS_SCRIPT) and empties them, later calls skip the cards already read.
+        """
+        return self.driver.execute_script(
+            EXTRACT_CARDS_SCRIPT,
+            CARD_CLASS,
+            NAME_CLASS,
+            DEPARTMENT_CLASS,
+            SCHOOL_CLASS,
+            QUALITY_CLASS,
+            NUM_RATINGS_CLASS,
+            FEEDBACK_CLASS,
+        )
 
-    def read_page_source(self, url: str, output_file: str = None) -> str:
+    def iter_professor_records(self, url: str, progress=None):
+        """
+        Loads a school page like read_page_source, but reads the new cards out of the page
+        every EXTRACT_EVERY_CLICKS clicks and yields them as lists of records.
+        Cards read are emptied, so the page holds no more than a batch of cards
+        besides their bare links and clicks don't slow down on the largest schools.
+        """
+        self.driver.get(url)
+        total_professors = self.get_total_professors()
+        print(f"Total professors: {total_professors}")
+        if progress:
+            progress(total_professors=total_professors)
+        for clicks_done in self.show_more_clicks(total_professors, progress=progress):
+            if clicks_done % EXTRACT_EVERY_CLICKS == 0:
+                yield self.extract_cards()
+        yield self.extract_cards()
+
+    @timed("selenium_scrape")
+    def spool_professors(
+        self, url: str, directory, keep_alive=False, progress=None
+    ) -> int:
+        """
+        Scrapes a school page, extracting the cards in the browser as they load
+        (see iter_professor_records) instead of serializing the whole page to parse it.
+        Each batch is parsed and written to directory as it arrives
+        (see spool_professor_records), so the school is never held in memory.
+        Takes the same arguments as read_page_source, with the directory
+        instead of the output file. Returns the number of professors written.
+        """
+        try:
+            return spool_professor_records(
+                self.iter_professor_records(url, progress), directory
+            )
+        finally:
+            if not keep_alive:
+                self.quit()
+
+    @timed("selenium_scrape")
+    def read_page_source(
+        self, url: str, output_file: str = None, keep_alive=False, progress=None
+    ) -> str:
         """
         Main function to scrape professor data from a school page.
 
-        Input: URL of the school page and an optional output file name.
+        Input: URL of the school page, an optional output file name,
+        whether to keep the driver open for another page (i.e. pooled scrapers)
+        and an optional progress callback receiving keyword updates.
         Output: Returns the page source as a string.
         """
         self.driver.get(url)
         # Wait for the page to load and print how many professors the college has
         total_professors = self.get_total_professors()
         print(f"Total professors: {total_professors}")
-        self.load_all_professors(total_professors)
+        if progress:
+            progress(total_professors=total_professors)
+        self.load_all_professors(total_professors, progress=progress)
 
+        # Store the page source code and quit the driver
+        page_source = self.driver.page_source
         if output_file:
             with open(output_file, "w", encoding="utf-8") as f:
-                f.write(self.driver.page_source)
+                f.write(page_source)
                 print(f"Page source saved to {output_file}")
 
-        # Store the page source code and quit the driver
-        page_source = self.driver.page_source
-        self.quit()
+        if not keep_alive:
+            self.quit()
         return page_source
 
     def fetch_school_name(self, id: str) -> str:
@@ -122,22 +320,10 @@ class ProfessorScraper:
         - Most school IDs are densely packed between 1 and 6000.
         - Beyond 6000, IDs become increasingly sparse, with the majority unused.
         - This function is not integrated in the app. The IDs are statically stored in a JSON file.
+        - Probing one ID at a time through the browser is slow, so the crawl is done by
+          the concurrent and resumable DirectoryCrawler (python -m src.directory).
         """
-        # Checking the first 8000 IDs for reasonable coverage
-        NUM_UNIVERSITIES = 8000
-        school_data = {}
-
-        for id in range(1, NUM_UNIVERSITIES + 1):
-            name = self.fetch_school_name(id)
-            # Store only if a valid name is found
-            # IDs not corresponding to a university will return None or "other schools"
-            if name and name != "other schools":
-                school_data[id] = name
-
-        # Save dictionary to JSON file
-        json_path = Path(__file__).parent.parent / "data/school_names.json"
-        with open(json_path, "w") as f:
-            json.dump(school_data, f, indent=4)
+        DirectoryCrawler().crawl()
 
     def quit(self):
         """
@@ -0,0 +1,126 @@
+import threading
+from functools import lru_cache
+from src.schools import normalize_school_name
+
+
+def trigrams(text: str) -> set:
+    """
+    Returns the set of three character substrings of a normalized string.
+    """
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class SchoolSearchIndex:
+    """
+    In-process trigram index of school names for autocomplete.
+
+    Matches the search term anywhere in a school's normalized name.
+    Prefix matches rank first, then matches at the start of a word, then the rest.
+    Keeps the set of scraped schools (i.e. schools with instructors) in memory
+    so the autocomplete endpoints never query the Instructors table.
+    """
+
+    def __init__(
+        self, registry, load_scraped=None, cache_size: int = 1024, poll_scraped=None
+    ):
+        self.registry = registry
+        # Called once to fill the scraped set, returns an iterable of school IDs
+        self.load_scraped = load_scraped
+        # Called before each search, marks the schools scraped by other processes
+        self.poll_scraped = poll_scraped
+        self._lock = threading.Lock()
+        self._names = None
+        self._entries = []
+        self._postings = {}
+        self._scraped = None
+        # Schools marked as scraped before the scraped set was loaded
+        self._pending_scraped = set()
+        self._search = lru_cache(maxsize=cache_size)(self._uncached_search)
+
+    def search(self, term: str, limit: int = 10, scraped: bool = None) -> list:
+        """
+        Returns up to limit school names matching the term, best matches first.
+        scraped=True only returns scraped schools, scraped=False only unscraped ones.
+        """
+        self._refresh()
+        if self.poll_scraped:
+            self.poll_scraped()
+        if scraped is not None and self._scraped is None:
+            self._load_scraped()
+        return self._search(normalize_school_name(term), limit, scraped)
+
+    def mark_scraped(self, school_ids) -> None:
+        """
+        Adds schools to the scraped set, called once a scrape has been seeded here
+        or is seen in the database (i.e. seeded by another worker).
+        Cached searches are only dropped when a school is new to the set.
+        """
+        with self._lock:
+            scraped = self._pending_scraped if self._scraped is None else self._scraped
+            new = set(school_ids) - scraped
+            if new:
+                scraped.update(new)
+                self._search.cache_clear()
+
+    def cache_info(self):
+        return self._search.cache_info()
+
+    def _load_scraped(self) -> None:
+        scraped = set(self.load_scraped()) if self.load_scraped else set()
+        with self._lock:
+            if self._scraped is None:
+                self._scraped = scraped | self._pending_scraped
+                self._pending_scraped = set()
+                self._search.cache_clear()
+
+    def _refresh(self) -> None:
+        # The registry returns a new dictionary whenever it reloads the JSON file
+        names = self.registry.names()
+        if names is self._names:
+            return
+        entries = []
+        postings = {}
+        for key, name in names.items():
+            normalized = normalize_school_name(name)
+            position = len(entries)
+            entries.append((int(key), name, normalized, " " + normalized))
+            for gram in trigrams(normalized):
+                postings.setdefault(gram, []).append(position)
+        with self._lock:
+            self._entries, self._postings, self._names = entries, postings, names
+            self._search.cache_clear()
+
+    def _candidates(self, term: str):
+        # Terms shorter than a trigram are checked against every name
+        grams = trigrams(term)
+        if not grams:
+            return range(len(self._entries))
+        lists = sorted((self._postings.get(gram, []) for gram in grams), key=len)
+        candidates = set(lists[0])
+        for positions in lists[1:]:
+            candidates.intersection_update(positions)
+            if not candidates:
+                break
+        return candidates
+
+    def _uncached_search(self, term: str, limit: int, scraped: bool) -> list:
+        if not term:
+            return []
+        scraped_ids = self._scraped
+        matches = []
+        for position in self._candidates(term):
+            school_id, name, normalized, spaced = self._entries[position]
+            if scraped is not None and (school_id in scraped_ids) != scraped:
+                continue
+            if normalized.startswith(term):
+                rank = 0
+            elif " " + term in spaced:
+                rank = 1
+            elif term in normalized:
+                rank = 2
+            else:
+                continue
+            matches.append((rank, len(name), name))
+        matches.sort()
+        # Different IDs can share a name, each name is only suggested once
+        return list(dict.fromkeys(name for _, _, name in matches))[:limit]
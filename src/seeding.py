@@ -1,20 +1,110 @@
-import json
+import hashlib
+import io
+import time
 from pathlib import Path
 from sqlalchemy.sql import text
-from bs4 import BeautifulSoup
 import tqdm
 import polars as pl
+from src.schools import get_school_registry
+from src.cache import get_response_cache
+from src.departments import DepartmentNormalizer
+from src.parse_professors import typed_professors
+from src.metrics import (
+    DEPARTMENTS_CREATED,
+    INSTRUCTORS_SKIPPED,
+    INSTRUCTORS_WRITTEN,
+    SCHOOLS_SYNCED,
+    timed,
+)
+
+# Instructors are streamed to COPY in chunks of this many rows
+COPY_CHUNK_ROWS = 100_000
+# Order of the columns written by COPY into the Instructors table
+INSTRUCTOR_COLUMNS = [
+    "instructor_key",
+    "instructor_name",
+    "department_id",
+    "school_id",
+    "quality",
+    "total_ratings",
+    "retake_percent",
+    "difficulty",
+]
+# Columns of the parsed professors, hashed to tell whether a school changed since its last scrape
+PROFESSOR_COLUMNS = [
+    "Name",
+    "Department",
+    "School",
+    "Quality",
+    "# of Ratings",
+    "Would Take Again (%)",
+    "Difficulty",
+    "Professor ID",
+]
+
+
+def with_instructor_keys(df: pl.DataFrame) -> pl.DataFrame:
+    """
+    Adds the instructor_key column identifying each instructor within their school_id.
+    Keys are the RMP professor ID ("rmp:12345") when the page has it, otherwise "name|department".
+    Repeats of a key within a school are numbered "#2", "#3", ... in page order,
+    like the keys db/migrations/0001_instructor_keys.sql gives instructors loaded before keys existed.
+    """
+    base_key = (
+        pl.when(pl.col("Professor ID").is_not_null())
+        .then(pl.lit("rmp:") + pl.col("Professor ID"))
+        .otherwise(
+            pl.col("Name").fill_null("")
+            + pl.lit("|")
+            + pl.col("Department").fill_null("")
+        )
+    )
+    occurrence = pl.int_range(1, pl.len() + 1).over("school_id", "base_key")
+    return (
+        df.with_columns(base_key=base_key)
+        .with_columns(
+            instructor_key=pl.when(occurrence == 1)
+            .then(pl.col("base_key"))
+            .otherwise(pl.col("base_key") + pl.lit("#") + occurrence.cast(pl.String))
+        )
+        .drop("base_key")
+    )
+
+
+def content_hashes(df: pl.DataFrame) -> dict:
+    """
+    Returns {school_id: (hash, number of instructors)} of the professors parsed for each school.
+    Rows are sorted before hashing, so the order professors were listed in doesn't matter.
+    """
+    hashes = {}
+    for (school_id,), school in df.partition_by("school_id", as_dict=True).items():
+        rows = school.select(PROFESSOR_COLUMNS).sort(PROFESSOR_COLUMNS, nulls_last=True)
+        digest = hashlib.sha1(rows.write_csv(null_value="\\N").encode()).hexdigest()
+        hashes[school_id] = (digest, school.height)
+    return hashes
 
 
 class Seeding:
     """
     Class for loading any information into the database.
     Instantiated with a database connection.
+    Used as a context manager it closes the connection when done,
+    rolling back anything left uncommitted (i.e. with Seeding(engine.connect()) as seeding:)
     """
 
     def __init__(self, db_connection: str):
         self.db_connection = db_connection
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        try:
+            if exc_type is not None:
+                self.db_connection.rollback()
+        finally:
+            self.db_connection.close()
+
     def initialize_school_names(self) -> None:
         """
         Initializes university names and IDs in the database.
@@ -39,43 +129,581 @@ class Seeding:
         """
         Returns a dictionary of all Rate My Professor school IDs and their names
         """
-        # Open the JSON file of all RMP university names
+        # Loaded once per process from the JSON file of all RMP university names
         # Contains names and IDs between 1 and 8000 from rate my professor URLs
         # I.e. "https://www.ratemyprofessors.com/search/professors/{SCHOOL_ID_NUMBER}?q="
-        school_names_path = Path(__file__).parent.parent / "data/school_names.json"
-        with open(school_names_path, "r", encoding="UTF-8") as file:
-            school_data = json.load(file)
-        return school_data
+        return get_school_registry().names()
 
-    def seed_existing_data(self) -> None:
+    def seed_existing_data(self) -> int:
         """
-        Opens the "data/dataframes" folder and seeds all existing dataframes.
+        Opens the "data/dataframes" folder and seeds all existing dataframes in one bulk load.
         Skips files without the .parquet "ending"
+        Returns the number of instructors inserted.
         """
         # Open the directory of all dataframes
         dataframes_path = Path(__file__).parent.parent / "data/dataframes"
-        files = [f for f in dataframes_path.iterdir() if f.is_file()]
-        for file in tqdm.tqdm(files, desc="Seeding files into database"):
-            # Skip erroneous files
-            if not file.suffix == ".parquet":
-                continue
-            self.seed_file(file)
+        # Skip erroneous files
+        files = [
+            f
+            for f in dataframes_path.iterdir()
+            if f.is_file() and f.suffix == ".parquet"
+        ]
+        return self.bulk_seed_files(files)
 
-    def seed_file(self, file: Path) -> None:
+    def seed_file(self, file: Path) -> int:
         """
         Converts a file path to a Polars DataFrame and seeds it into the database.
         """
         return self.seed_dataframe(pl.read_parquet(file))
 
-    def seed_dataframe(self, df: pl.DataFrame) -> None:
+    def seed_dataframe(self, df: pl.DataFrame) -> int:
         """
         Seed a Polars Dataframe into the database.
+        Instructors at unrecognized universities are skipped.
+        Returns the number of instructors inserted.
+        """
+        return self.bulk_seed_dataframes([df])
+
+    def bulk_seed_files(self, files: list) -> int:
+        """
+        Reads every parquet file and seeds them together with a single bulk load.
+        """
+        frames = [
+            pl.read_parquet(file)
+            for file in tqdm.tqdm(files, desc="Reading files to seed")
+        ]
+        return self.bulk_seed_dataframes(frames)
+
+    def bulk_seed_dataframes(self, frames: list) -> int:
+        """
+        Seeds Polars Dataframes into the database with set-based statements.
+        See sync_dataframes, returns the number of instructors inserted or updated.
+        """
+        report = self.sync_dataframes(frames)
+        return report["inserted"] + report["updated"]
+
+    @timed("seed")
+    def sync_dataframes(self, frames: list, delete_missing: bool = True) -> dict:
+        """
+        Brings the instructors of every school in the dataframes up to date with them.
+        Each school's professors are a full snapshot of that school:
+        new instructors are inserted, changed ones updated and missing ones deleted.
+        delete_missing=False keeps instructors missing from an incomplete scrape.
+        Schools whose professors hash the same as at their last scrape are skipped entirely.
+
+        All departments are resolved in one statement and the instructors
+        are streamed into a staging table with COPY FROM STDIN.
+        Returns the number of instructors inserted, updated and deleted
+        with the IDs of the changed and unchanged schools, and prints the rows/sec.
+        """
+        start = time.perf_counter()
+        report = {
+            "inserted": 0,
+            "updated": 0,
+            "deleted": 0,
+            "changed_schools": [],
+            "unchanged_schools": [],
+        }
+        frames = [df for df in frames if df.height]
+        if not frames:
+            return report
+        # Files saved before professors were typed hold strings (i.e. a difficulty of "5"),
+        # typing them first gives them the same content hashes as typed files.
+        # typed_professors also adds the Professor ID column older files are missing.
+        df = pl.concat([typed_professors(df).cast(pl.String) for df in frames])
+
+        school_ids = self.school_id_frame(df["School"].drop_nulls().unique().to_list())
+        df = df.join(school_ids, on="School", how="left")
+        unknown = df.filter(pl.col("school_id").is_null())
+        for school_name, count in unknown.group_by("School").len().iter_rows():
+            print(f"Skipping {count} instructors — unknown school: {school_name}")
+            INSTRUCTORS_SKIPPED.inc(count, reason="unknown_school")
+        df = df.filter(pl.col("school_id").is_not_null())
+
+        hashes = content_hashes(df)
+        previous = self.scrape_hashes(list(hashes))
+        report["unchanged_schools"] = [
+            school_id
+            for school_id, (digest, _) in hashes.items()
+            if previous.get(school_id) == digest
+        ]
+        df = df.filter(~pl.col("school_id").is_in(report["unchanged_schools"]))
+        report["changed_schools"] = df["school_id"].unique().to_list()
+
+        # Spellings with the most instructors first, see resolve_departments
+        departments = df["Department"].drop_nulls().value_counts(name="count")
+        department_ids = self.resolve_departments(
+            departments.sort(["count", "Department"], descending=[True, False])[
+                "Department"
+            ].to_list()
+        )
+        df = with_instructor_keys(df.join(department_ids, on="Department", how="left"))
+
+        instructors = df.select(
+            "instructor_key",
+            pl.col("Name").alias("instructor_name"),
+            "department_id",
+            "school_id",
+            pl.col("Quality").alias("quality"),
+            pl.col("# of Ratings").alias("total_ratings"),
+            pl.col("Would Take Again (%)").alias("retake_percent"),
+            pl.col("Difficulty").alias("difficulty"),
+        )
+        school_ids = report["changed_schools"]
+        if school_ids:
+            inserted, updated, deleted = self.upsert_instructors(
+                instructors, school_ids, delete_missing
+            )
+            report.update(inserted=inserted, updated=updated, deleted=deleted)
+            self.refresh_department_stats(school_ids)
+        self.record_scrapes(hashes)
+        self.db_connection.commit()
+        # Cached plots of these schools are out of date now
+        get_response_cache().invalidate_schools(school_ids)
+        for operation in ("inserted", "updated", "deleted"):
+            INSTRUCTORS_WRITTEN.inc(report[operation], operation=operation)
+        SCHOOLS_SYNCED.inc(len(report["changed_schools"]), result="changed")
+        SCHOOLS_SYNCED.inc(len(report["unchanged_schools"]), result="unchanged")
+
+        elapsed = time.perf_counter() - start
+        print(
+            f"Synced {instructors.height} instructors in {elapsed:.2f}s "
+            f"({instructors.height / max(elapsed, 1e-9):.0f} rows/sec): "
+            f"{report['inserted']} inserted, {report['updated']} updated, "
+            f"{report['deleted']} deleted, "
+            f"{len(report['unchanged_schools'])} unchanged schools skipped"
+        )
+        return report
+
+    def school_id_frame(self, school_names: list) -> pl.DataFrame:
+        """
+        Returns the given school names and their IDs as a dataframe for joining.
+        Names are matched through the school registry, unknown schools have a null ID.
+        """
+        registry = get_school_registry()
+        return pl.DataFrame(
+            {
+                "School": school_names,
+                "school_id": [registry.id_for(name) for name in school_names],
+            },
+            schema={"School": pl.String, "school_id": pl.Int64},
+        )
+
+    @timed("resolve_departments")
+    def resolve_departments(self, department_names: list) -> pl.DataFrame:
+        """
+        Returns the canonical department IDs of the given scraped department names.
+        Names already seen are looked up in DepartmentAliases, the others are normalized
+        (see src/departments.py) and added as aliases of a known department or as new ones.
+        Names come in order of preference, i.e. most instructors first,
+        as the first spelling of a new department becomes its name.
+        """
+        department_ids = self.department_aliases(department_names)
+        new_names = [name for name in department_names if name not in department_ids]
+        if new_names:
+            canonical = self.department_normalizer().assign(new_names)
+            created = self.db_connection.execute(
+                text(
+                    """
+                    INSERT INTO Departments (department_name)
+                    SELECT DISTINCT unnest(CAST(:names AS TEXT[]))
+                    ON CONFLICT (department_name) DO NOTHING
+                    """
+                ),
+                {"names": list(canonical.values())},
+            )
+            DEPARTMENTS_CREATED.inc(created.rowcount)
+            # Canonical names are aliases of themselves
+            aliases = {**{name: name for name in canonical.values()}, **canonical}
+            self.db_connection.execute(
+                text(
+                    """
+                    INSERT INTO DepartmentAliases (alias, department_id)
+                    SELECT a.alias, d.department_id
+                    FROM unnest(CAST(:aliases AS TEXT[]), CAST(:names AS TEXT[]))
+                        AS a(alias, department_name)
+                    JOIN Departments d ON d.department_name = a.department_name
+                    ON CONFLICT (alias) DO NOTHING
+                    """
+                ),
+                {"aliases": list(aliases), "names": list(aliases.values())},
+            )
+            # Read back, another process may have added some of the names meanwhile
+            department_ids = self.department_aliases(department_names)
+        return pl.DataFrame(
+            {
+                "department_id": list(department_ids.values()),
+                "Department": list(department_ids),
+            },
+            schema={"department_id": pl.Int64, "Department": pl.String},
+        )
+
+    def department_aliases(self, department_names: list) -> dict:
+        """
+        Returns {name: canonical department ID} of the given names with an alias.
+        """
+        result = self.db_connection.execute(
+            text(
+                """
+                SELECT alias, department_id FROM DepartmentAliases
+                WHERE alias = ANY(:names)
+                """
+            ),
+            {"names": department_names},
+        )
+        return {alias: department_id for alias, department_id in result}
+
+    def department_normalizer(self) -> DepartmentNormalizer:
+        """
+        Returns a DepartmentNormalizer knowing every department and alias in the database.
+        """
+        result = self.db_connection.execute(
+            text(
+                """
+                SELECT d.department_name, a.alias
+                FROM Departments d
+                LEFT JOIN DepartmentAliases a ON a.department_id = d.department_id
+                WHERE d.department_name IS NOT NULL
+                ORDER BY d.department_id, a.alias
+                """
+            )
+        )
+        rows = result.fetchall()
+        # Canonical names first, so they keep their keys
+        return DepartmentNormalizer(
+            [(name, name) for name, _ in rows]
+            + [(alias, name) for name, alias in rows if alias is not None]
+        )
+
+    def canonicalize_departments(self) -> int:
+        """
+        Merges departments whose names are spellings of the same department,
+        i.e. in a database seeded before department names were normalized.
+        Each department's instructors, rollup rows and aliases move to the spelling
+        with the most instructors, which is renamed to its cleaned up name.
+        Commits when done and returns the number of departments merged away.
+        """
+        rows = self.db_connection.execute(
+            text(
+                """
+                SELECT d.department_id, d.department_name
+                FROM Departments d
+                LEFT JOIN Instructors i ON i.department_id = d.department_id
+                WHERE d.department_name IS NOT NULL
+                GROUP BY d.department_id
+                ORDER BY COUNT(i.instructor_id) DESC, d.department_name
+                """
+            )
+        ).fetchall()
+        canonical = DepartmentNormalizer().assign([name for _, name in rows])
+        # The first spelling of each department keeps its row
+        kept = {}
+        for department_id, name in rows:
+            kept.setdefault(canonical[name], department_id)
+        mapping = {
+            "department_ids": [department_id for department_id, _ in rows],
+            "canonical_ids": [kept[canonical[name]] for _, name in rows],
+        }
+        merged = sum(a != b for a, b in zip(*mapping.values()))
+
+        self.db_connection.execute(
+            text(
+                """
+                CREATE TEMP TABLE department_mapping ON COMMIT DROP AS
+                SELECT * FROM unnest(CAST(:department_ids AS INT[]), CAST(:canonical_ids AS INT[]))
+                    AS m(department_id, canonical_id)
+                WHERE department_id <> canonical_id
+                """
+            ),
+            mapping,
+        )
+        for statement in (
+            """
+            UPDATE Instructors i SET department_id = m.canonical_id
+            FROM department_mapping m WHERE i.department_id = m.department_id
+            """,
+            """
+            UPDATE DepartmentAliases a SET department_id = m.canonical_id
+            FROM department_mapping m WHERE a.department_id = m.department_id
+            """,
+            """
+            DELETE FROM DepartmentStats
+            WHERE department_id IN (SELECT department_id FROM department_mapping)
+            """,
+            """
+            DELETE FROM Departments
+            WHERE department_id IN (SELECT department_id FROM department_mapping)
+            """,
+        ):
+            self.db_connection.execute(text(statement))
+        names = {department_id: name for name, department_id in kept.items()}
+        renamed = self.db_connection.execute(
+            text(
+                """
+                UPDATE Departments d SET department_name = n.department_name
+                FROM unnest(CAST(:department_ids AS INT[]), CAST(:names AS TEXT[]))
+                    AS n(department_id, department_name)
+                WHERE d.department_id = n.department_id
+                AND d.department_name <> n.department_name
+                RETURNING d.department_id
+                """
+            ),
+            {"department_ids": list(names), "names": list(names.values())},
+        ).fetchall()
+        # Departments whose instructors now show up under another name
+        changed = {department_id for (department_id,) in renamed} | {
+            canonical_id
+            for department_id, canonical_id in zip(*mapping.values())
+            if department_id != canonical_id
+        }
+        if changed:
+            # Moves the stamps other processes' response caches poll (see app.scrape_versions)
+            self.db_connection.execute(
+                text(
+                    """
+                    UPDATE ScrapeState SET last_changed_at = now()
+                    WHERE school_id IN (
+                        SELECT school_id FROM Instructors
+                        WHERE department_id = ANY(:department_ids)
+                    )
+                    """
+                ),
+                {"department_ids": sorted(changed)},
+            )
+        # Every spelling, including the cleaned up names, is an alias
+        aliases = {**{name: name for name in kept}, **canonical}
+        self.db_connection.execute(
+            text(
+                """
+                INSERT INTO DepartmentAliases (alias, department_id)
+                SELECT a.alias, d.department_id
+                FROM unnest(CAST(:aliases AS TEXT[]), CAST(:names AS TEXT[]))
+                    AS a(alias, department_name)
+                JOIN Departments d ON d.department_name = a.department_name
+                ON CONFLICT (alias) DO UPDATE SET department_id = EXCLUDED.department_id
+                """
+            ),
+            {"aliases": list(aliases), "names": list(aliases.values())},
+        )
+        if merged:
+            self.refresh_department_stats()
+        self.db_connection.commit()
+        if changed:
+            # Plots of any school may show the merged or renamed departments
+            get_response_cache().clear()
+        print(f"Merged {merged} department spellings into {len(kept)} departments")
+        return merged
+
+    @timed("refresh_department_stats")
+    def refresh_department_stats(self, school_ids: list = None) -> None:
+        """
+        Recomputes the DepartmentStats rollup for the given schools,
+        or for every school when no IDs are given.
+        Runs in the connection's current transaction.
+        """
+        school_filter = (
+            "" if school_ids is None else "WHERE school_id = ANY(:school_ids)"
+        )
+        params = {} if school_ids is None else {"school_ids": school_ids}
+        self.db_connection.execute(
+            text(f"DELETE FROM DepartmentStats {school_filter}"), params
+        )
+        self.db_connection.execute(
+            text(
+                f"""
+                INSERT INTO DepartmentStats (
+                    school_id, department_id,
+                    quality_weighted_sum, difficulty_weighted_sum,
+                    retake_percent_weighted_sum, total_ratings, instructor_count
+                )
+                SELECT school_id, department_id,
+                        SUM(quality * total_ratings),
+                        SUM(difficulty * total_ratings),
+                        SUM(retake_percent * total_ratings),
+                        COALESCE(SUM(total_ratings), 0),
+                        COUNT(*)
+                FROM Instructors
+                {school_filter}
+                {"AND" if school_filter else "WHERE"} department_id IS NOT NULL
+                GROUP BY school_id, department_id
+                """
+            ),
+            params,
+        )
+
+    @timed("upsert_instructors")
+    def upsert_instructors(
+        self, instructors: pl.DataFrame, school_ids: list, delete_missing: bool = True
+    ) -> tuple:
+        """
+        Makes the instructors of the given schools match the dataframe, matched on
+        (school_id, instructor_key). Only new or changed rows are written
+        and instructors no longer listed are deleted unless delete_missing is False.
+        Runs in the connection's current transaction.
+        Returns the number of instructors inserted, updated and deleted.
+        """
+        self.db_connection.execute(
+            text(
+                """
+                CREATE TEMP TABLE instructor_staging (
+                    instructor_key TEXT,
+                    instructor_name VARCHAR(255),
+                    department_id INT,
+                    school_id INT,
+                    quality DECIMAL(3, 2),
+                    total_ratings INT,
+                    retake_percent INT,
+                    difficulty DECIMAL(3, 2)
+                ) ON COMMIT DROP
+                """
+            )
+        )
+        self.copy_instructors(instructors, table="instructor_staging")
+        deleted = 0
+        if delete_missing:
+            deleted = self.db_connection.execute(
+                text(
+                    """
+                    DELETE FROM Instructors i
+                    WHERE i.school_id = ANY(:school_ids)
+                    AND NOT EXISTS (
+                        SELECT 1 FROM instructor_staging s
+                        WHERE s.school_id = i.school_id AND s.instructor_key = i.instructor_key
+                    )
+                    """
+                ),
+                {"school_ids": school_ids},
+            ).rowcount
+        columns = ", ".join(INSTRUCTOR_COLUMNS)
+        excluded = ", ".join(f"EXCLUDED.{column}" for column in INSTRUCTOR_COLUMNS)
+        current = ", ".join(f"Instructors.{column}" for column in INSTRUCTOR_COLUMNS)
+        updates = ", ".join(
+            f"{column} = EXCLUDED.{column}" for column in INSTRUCTOR_COLUMNS
+        )
+        # xmax is 0 for freshly inserted rows and set for updated ones
+        written = self.db_connection.execute(
+            text(
+                f"""
+                INSERT INTO Instructors ({columns})
+                SELECT {columns} FROM instructor_staging
+                ON CONFLICT (school_id, instructor_key) DO UPDATE SET {updates}
+                WHERE ({current}) IS DISTINCT FROM ({excluded})
+                RETURNING (Instructors.xmax = 0)
+                """
+            )
+        ).fetchall()
+        self.db_connection.execute(text("DROP TABLE instructor_staging"))
+        inserted = sum(1 for (is_insert,) in written if is_insert)
+        return inserted, len(written) - inserted, deleted
+
+    def scrape_hashes(self, school_ids: list) -> dict:
+        """
+        Returns {school_id: content hash} of the given schools' last scrape.
+        """
+        result = self.db_connection.execute(
+            text(
+                """
+                SELECT school_id, content_hash FROM ScrapeState
+                WHERE school_id = ANY(:school_ids)
+                """
+            ),
+            {"school_ids": school_ids},
+        )
+        return {school_id: digest for school_id, digest in result}
+
+    def record_scrapes(self, hashes: dict) -> None:
+        """
+        Stores the content hash and scrape time of each school (see content_hashes).
+        last_changed_at only moves when the hash does.
+        Runs in the connection's current transaction.
+        """
+        if not hashes:
+            return
+        self.db_connection.execute(
+            text(
+                """
+                INSERT INTO ScrapeState (
+                    school_id, content_hash, instructor_count, last_scraped_at, last_changed_at
+                )
+                SELECT school_id, content_hash, instructor_count, now(), now()
+                FROM unnest(
+                    CAST(:school_ids AS INT[]),
+                    CAST(:hashes AS TEXT[]),
+                    CAST(:counts AS INT[])
+                ) AS scrape(school_id, content_hash, instructor_count)
+                ON CONFLICT (school_id) DO UPDATE SET
+                    last_scraped_at = EXCLUDED.last_scraped_at,
+                    last_changed_at = CASE
+                        WHEN ScrapeState.content_hash = EXCLUDED.content_hash
+                        THEN ScrapeState.last_changed_at
+                        ELSE EXCLUDED.last_changed_at
+                    END,
+                    content_hash = EXCLUDED.content_hash,
+                    instructor_count = EXCLUDED.instructor_count
+                """
+            ),
+            {
+                "school_ids": list(hashes),
+                "hashes": [digest for digest, _ in hashes.values()],
+                "counts": [count for _, count in hashes.values()],
+            },
+        )
+
+    def stale_school_ids(self, max_age: float, limit: int = None) -> list:
+        """
+        Returns the IDs of schools last scraped more than max_age seconds ago, oldest first.
+        Schools with instructors but no recorded scrape (i.e. seeded before scrapes were tracked)
+        come first.
+        """
+        result = self.db_connection.execute(
+            text(
+                """
+                SELECT s.school_id
+                FROM Schools s
+                LEFT JOIN ScrapeState st ON st.school_id = s.school_id
+                WHERE st.last_scraped_at < now() - make_interval(secs => :max_age)
+                OR (
+                    st.school_id IS NULL
+                    AND EXISTS (SELECT 1 FROM Instructors i WHERE i.school_id = s.school_id)
+                )
+                ORDER BY st.last_scraped_at NULLS FIRST, s.school_id
+                LIMIT :limit
+                """
+            ),
+            {"max_age": max_age, "limit": limit},
+        )
+        return [row[0] for row in result]
+
+    def copy_instructors(
+        self, instructors: pl.DataFrame, table: str = "Instructors"
+    ) -> None:
+        """
+        Streams instructor rows into the Instructors table (or a staging table) with COPY FROM STDIN.
+        The dataframe's columns are copied into the table's columns of the same name.
+        Runs in the connection's current transaction.
+        """
+        cursor = self.db_connection.connection.cursor()
+        try:
+            for chunk in instructors.iter_slices(n_rows=COPY_CHUNK_ROWS):
+                buffer = io.BytesIO()
+                # Unquoted empty fields are NULLs to COPY, empty strings are quoted
+                chunk.write_csv(buffer, include_header=False, null_value="")
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f"COPY {table} ({', '.join(instructors.columns)}) "
+                    "FROM STDIN WITH (FORMAT csv)",
+                    buffer,
+                )
+        finally:
+            cursor.close()
+
+    def seed_dataframe_rows(self, df: pl.DataFrame) -> None:
+        """
+        Seed a Polars Dataframe into the database one row at a time.
+        Kept as a baseline to compare the bulk loader against.
         Fails if the university name is not recognized
         """
-        # Retrieving schools id's and their corresponding names
-        school_names = self.get_school_names()
-        # Flipping the id name mapping
-        school_id_mapping = {val: int(key) for key, val in school_names.items()}
+        registry = get_school_registry()
         # Storing the department IDs to avoid duplicate inserts and faster retrieval
         department_cache = {}
         # Storing the instructors to be inserted for bulk insert
@@ -85,42 +713,24 @@ class Seeding:
             department_name = row["Department"]
             school_name = row["School"]
             # Check the new school name matches a name in the schools table
-            school_id = school_id_mapping.get(school_name)
+            school_id = registry.id_for(school_name)
             if not school_id:
                 print(
                     f"Skipping instructor {row['Name']} — unknown school: {school_name}"
                 )
+                INSTRUCTORS_SKIPPED.inc(reason="unknown_school")
                 continue
-            # Adding or retrieving the department name and department ID
+            # Adding or retrieving the canonical department ID of the department name
             if department_name not in department_cache:
-                # Equals 0 if the department already exists
-                department_id = self.db_connection.execute(
-                    text(
-                        """
-                        INSERT INTO Departments (department_name)
-                        VALUES (:name)
-                        ON CONFLICT (department_name) DO NOTHING
-                        RETURNING department_id
-                    """
-                    ),
-                    {"name": department_name},
-                ).scalar()
-
-                # If the department already exists, then retrieve its ID
-                if department_id is None:
-                    department_id = self.db_connection.execute(
-                        text(
-                            """
-                            SELECT department_id
-                            FROM Departments
-                            WHERE department_name = :name
-                        """
-                        ),
-                        {"name": department_name},
-                    ).scalar()
-
+                department_ids = self.resolve_departments(
+                    [department_name] if department_name else []
+                )
                 # Store the department ID in the cache for faster access later
-                department_cache[department_name] = department_id
+                department_cache[department_name] = (
+                    department_ids["department_id"][0]
+                    if department_ids.height
+                    else None
+                )
             department_id = department_cache[department_name]
             # Prep instructors to be added to the database with a dictionary
             # Dictionaries allow for bulk insertions for efficiency
@@ -150,4 +760,8 @@ class Seeding:
             """
             )
             self.db_connection.execute(insert_statement, pending_instructors)
+            INSTRUCTORS_WRITTEN.inc(len(pending_instructors), operation="inserted")
+            school_ids = list({row["school_id"] for row in pending_instructors})
+            self.refresh_department_stats(school_ids)
             self.db_connection.commit()
+            get_response_cache().invalidate_schools(school_ids)
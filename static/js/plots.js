@@ -0,0 +1,77 @@
+// Draws the compact payloads of /school_plot and /box_plot.
+// Layouts, the Plotly template and trace styles come from /plot_layouts, fetched once per page.
+
+let plotLayoutsRequest = null;
+
+// Calls back with the plot layouts, fetching them on first use
+function withPlotLayouts(callback) {
+  if (!plotLayoutsRequest) {
+    plotLayoutsRequest = $.getJSON("/plot_layouts");
+  }
+  plotLayoutsRequest.done(callback);
+}
+
+function plotLayout(layouts, plot, payload) {
+  return Object.assign({}, layouts[plot].layouts[payload.metric], {
+    title: { text: payload.title },
+    template: layouts.template,
+  });
+}
+
+// Bar traces and layout of the department averages at a school
+function departmentPlot(layouts, payload) {
+  const bar = Object.assign({}, layouts.school_plot.bar, {
+    x: payload.departments,
+    y: payload.averages,
+    text: payload.total_ratings.map(total => `${total} ratings`),
+  });
+  return { data: [bar], layout: plotLayout(layouts, "school_plot", payload) };
+}
+
+// Box traces and layout of a metric across schools, from raw values or box statistics
+function boxPlot(layouts, payload) {
+  const styles = layouts.box_plot;
+  const data = [];
+  payload.schools.forEach((school, i) => {
+    if (!payload.summary) {
+      data.push(Object.assign({}, styles.box, { x: payload.values[i], name: school }));
+      return;
+    }
+    data.push(Object.assign({}, styles.summary_box, {
+      y: [school],
+      q1: [payload.q1[i]],
+      median: [payload.median[i]],
+      q3: [payload.q3[i]],
+      lowerfence: [payload.lowerfence[i]],
+      upperfence: [payload.upperfence[i]],
+      name: school,
+    }));
+    const outliers = payload.outliers[i];
+    if (outliers.length) {
+      data.push(Object.assign({}, styles.outliers, {
+        x: outliers,
+        y: outliers.map(() => school),
+      }));
+    }
+  });
+  return { data: data, layout: plotLayout(layouts, "box_plot", payload) };
+}
+
+function renderDepartmentPlot(target, payload) {
+  withPlotLayouts(function (layouts) {
+    const plot = departmentPlot(layouts, payload);
+    Plotly.newPlot(target, plot.data, plot.layout, { responsive: true });
+  });
+}
+
+function renderBoxPlot(target, payload) {
+  withPlotLayouts(function (layouts) {
+    const plot = boxPlot(layouts, payload);
+    Plotly.newPlot(target, plot.data, plot.layout, { responsive: true });
+  });
+}
+
+// Lets the payload benchmark check the plots against the figure form in Node
+if (typeof module !== "undefined") {
+  module.exports = { departmentPlot, boxPlot };
+}
@@ -0,0 +1,64 @@
+import asyncio
+import httpx
+import pytest
+from benchmarks.rmp_stub import StubServer, synthetic_nodes
+from benchmarks.synthetic import synthetic_dataframe, synthetic_page
+from src.api_scraper import ApiScrapeError, ApiScraper, post_graphql
+from src.parse_professors import parse_professors
+
+SCHOOL = "Synthetic University"
+
+
+@pytest.mark.parametrize("failure_rate", [0, 0.3])
+def test_api_scraper_matches_the_cards(failure_rate):
+    nodes = synthetic_nodes(250, SCHOOL, seed=1)
+    with StubServer({1: nodes}, failure_rate=failure_rate) as stub:
+        scraper = ApiScraper(stub.url, page_size=100, backoff=0.01, retries=8)
+        df = scraper.scrape_school(1)
+    assert df.equals(synthetic_dataframe(250, SCHOOL, seed=1))
+    # The same professors scraped from their page
+    assert df.equals(parse_professors(synthetic_page(250, SCHOOL, seed=1)))
+
+
+def test_api_scraper_fetches_schools_concurrently():
+    schools = {i: synthetic_nodes(30, f"School {i}", seed=i) for i in (1, 2, 3)}
+    with StubServer(schools) as stub:
+        results = ApiScraper(stub.url, page_size=7).scrape_schools([1, 2, 3, 4])
+    for school_id in (1, 2, 3):
+        expected = synthetic_dataframe(30, f"School {school_id}", seed=school_id)
+        assert results[school_id].equals(expected)
+    # A school that fails is returned as its error, without failing the others
+    assert isinstance(results[4], ApiScrapeError)
+
+
+def test_api_scraper_gives_up_after_its_retries():
+    with StubServer({1: synthetic_nodes(5, SCHOOL)}, failure_rate=1) as stub:
+        scraper = ApiScraper(stub.url, backoff=0.01, retries=2)
+        with pytest.raises(ApiScrapeError, match="after 2 retries"):
+            scraper.scrape_school(1)
+        assert stub.requests == 3
+
+
+@pytest.mark.parametrize(
+    "status, body, content_type, error",
+    [
+        (200, "<html>Service unavailable</html>", "text/html", "isn't JSON"),
+        (200, "[]", "application/json", "unexpected response"),
+        (200, "{}", "application/json", "unexpected response"),
+        (200, '{"errors": [{"message": "bad query"}]}', "application/json", "bad"),
+        (403, "Forbidden", "text/plain", "HTTP 403"),
+    ],
+)
+def test_unusable_responses_are_scrape_errors(status, body, content_type, error):
+    transport = httpx.MockTransport(
+        lambda request: httpx.Response(
+            status, text=body, headers={"Content-Type": content_type}
+        )
+    )
+
+    async def post():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await post_graphql(client, "http://stub/graphql", {}, retries=0)
+
+    with pytest.raises(ApiScrapeError, match=error):
+        asyncio.run(post())
@@ -0,0 +1,21 @@
+from starlette.testclient import TestClient
+from asgi import create_app, flask_app
+
+
+def test_scraping_is_turned_away_unless_single_worker():
+    client = TestClient(create_app(single_worker=False))
+    for path in ("/scrape_school", "/refresh_stale"):
+        response = client.post(path, data={"school_name": "Synthetic University"})
+        assert response.status_code == 503
+        assert "single worker" in response.json()["error"]
+
+
+def test_single_worker_passes_scraping_to_flask(monkeypatch):
+    # Read only, so the Flask app answers without starting a scrape
+    monkeypatch.setitem(flask_app.config, "READ_ONLY", True)
+    client = TestClient(create_app(single_worker=True))
+    response = client.post(
+        "/scrape_school", data={"school_name": "Synthetic University"}
+    )
+    assert response.status_code == 503
+    assert "RMP_READ_ONLY" in response.json()["error"]
@@ -0,0 +1,53 @@
+from src.cache import ALL_SCHOOLS, ResponseCache
+
+
+def cache_with_stamps(stamps: dict) -> ResponseCache:
+    # Polled on every lookup, as if each came after the interval
+    return ResponseCache(version_source=lambda: dict(stamps), poll_interval=0)
+
+
+def test_seeds_in_this_process_drop_their_schools_entries():
+    cache = ResponseCache()
+    cache.set("a", b"a", 200, cache.versions([1]))
+    cache.set("b", b"b", 200, cache.versions([2]))
+    cache.set("all", b"all", 200, cache.versions([ALL_SCHOOLS]))
+    cache.invalidate_schools([1])
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    assert cache.get("all") is None
+
+
+def test_seeds_by_other_processes_drop_their_schools_entries():
+    stamps = {1: "monday", 2: "monday"}
+    cache = cache_with_stamps(stamps)
+    cache.set("a", b"a", 200, cache.versions([1]))
+    cache.set("b", b"b", 200, cache.versions([2]))
+    cache.set("all", b"all", 200, cache.versions([ALL_SCHOOLS]))
+    assert cache.get("a") is not None
+
+    # Another process seeds school 1 and a new school 3
+    stamps.update({1: "tuesday", 3: "tuesday"})
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    assert cache.get("all") is None
+
+
+def test_responses_built_during_a_seed_are_stale():
+    stamps = {1: "monday"}
+    cache = cache_with_stamps(stamps)
+    versions = cache.versions([1])
+    stamps[1] = "tuesday"
+    cache.set("a", b"a", 200, versions)
+    assert cache.get("a") is None
+
+
+def test_an_unprepared_source_is_polled_again():
+    stamps = None
+    cache = ResponseCache(version_source=lambda: stamps, poll_interval=0)
+    cache.set("a", b"a", 200, cache.versions([1]))
+    assert cache.get("a") is not None
+    stamps = {1: "monday"}
+    # Entries cached before the first stamps were read may be out of date
+    assert cache.get("a") is None
+    cache.set("a", b"a", 200, cache.versions([1]))
+    assert cache.get("a") is not None
@@ -0,0 +1,42 @@
+import pytest
+from src.departments import DepartmentNormalizer, clean_department
+
+
+@pytest.mark.parametrize(
+    "spelling, department",
+    [
+        ("Mathematics and Statistic", "Math & Statistics"),
+        ("Art amp Design", "Art & Design"),
+        ("Theatre Arts", "Theater Arts"),
+        ("Comp Sci", "Computer Science"),
+        ("CommunicationJournalism", "Communication/Journalism"),
+        ("Environmntal Studies", "Environmental Study"),
+    ],
+)
+def test_spellings_find_their_department(spelling, department):
+    normalizer = DepartmentNormalizer()
+    normalizer.assign([department])
+    assert normalizer.canonical(spelling) == department
+
+
+@pytest.mark.parametrize(
+    "name, other",
+    [
+        ("Art & Art History", "Art History"),
+        ("Business Economics", "Economics & Business"),
+        ("Dental Hygiene", "Mental Hygiene"),
+        ("Geology", "Ecology"),
+        ("Informatics", "Information"),
+        ("Informatics", "Information Technology/Systems"),
+        ("Information Systems", "Informatics Systems"),
+    ],
+)
+def test_distinct_departments_stay_apart(name, other):
+    assigned = DepartmentNormalizer().assign([other, name])
+    assert assigned == {other: other, name: name}
+
+
+def test_clean_department_puts_lost_ampersands_back():
+    assert clean_department("Art amp Design") == "Art & Design"
+    assert clean_department("Art  Design") == "Art & Design"
+    assert clean_department("Art &amp; Design") == "Art & Design"
@@ -0,0 +1,82 @@
+import json
+import pytest
+from benchmarks.rmp_stub import StubServer
+from src.directory import DirectoryCrawler
+
+# Most IDs up to 300 are schools, past it a few clusters of them
+DIRECTORY = {
+    **{i: f"School {i}" for i in range(1, 301) if i % 7},
+    **{i: f"School {i}" for start in (420, 690, 950) for i in range(start, start + 4)},
+}
+
+
+class Interrupted(Exception):
+    pass
+
+
+def crawler(stub: StubServer, workdir, **options) -> DirectoryCrawler:
+    return DirectoryCrawler(
+        stub.url,
+        workdir / "checkpoint.json",
+        workdir / "school_names.json",
+        max_id=1000,
+        dense_limit=300,
+        batch_size=20,
+        concurrency=2,
+        rate=0,
+        max_stride=4,
+        headroom=100,
+        checkpoint_interval=0,
+        backoff=0.01,
+        **options,
+    )
+
+
+def expected_names(directory: dict) -> dict:
+    return {str(school_id): directory[school_id] for school_id in sorted(directory)}
+
+
+def test_interrupted_crawl_resumes_from_its_checkpoint(tmp_path):
+    with StubServer(directory=DIRECTORY) as stub:
+        first = crawler(stub, tmp_path)
+        probe_batch = first.probe_batch
+
+        async def interrupted_probe(client, limiter, ids):
+            if first.requests >= 8:
+                raise Interrupted()
+            return await probe_batch(client, limiter, ids)
+
+        first.probe_batch = interrupted_probe
+        with pytest.raises(Interrupted):
+            first.crawl()
+        checkpointed = len(first.state["hits"])
+        assert 0 < checkpointed < len(DIRECTORY)
+
+        resumed = crawler(stub, tmp_path)
+        changes = resumed.crawl()
+
+        # A crawl from scratch, to compare the requests with
+        full = crawler(stub, tmp_path / "full")
+        full.crawl()
+
+    names = json.loads((tmp_path / "school_names.json").read_text())
+    assert names == expected_names(DIRECTORY)
+    assert len(changes["added"]) == len(DIRECTORY) - checkpointed
+    assert resumed.requests < full.requests
+
+
+def test_refresh_finds_added_renamed_and_removed_schools(tmp_path):
+    with StubServer(directory=DIRECTORY) as stub:
+        crawler(stub, tmp_path).crawl()
+
+    directory = dict(DIRECTORY)
+    directory[1010] = "Newly Listed College"
+    directory[5] = directory[5] + " (Renamed)"
+    del directory[10]
+    with StubServer(directory=directory) as stub:
+        refreshed = crawler(stub, tmp_path)
+        changes = refreshed.crawl(refresh=True)
+
+    assert changes == {"added": [1010], "renamed": [5], "removed": [10]}
+    names = json.loads((tmp_path / "school_names.json").read_text())
+    assert names == expected_names(directory)
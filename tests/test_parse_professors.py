@@ -0,0 +1,87 @@
+import polars as pl
+import pytest
+from benchmarks.synthetic import synthetic_dataframe, synthetic_page, synthetic_records
+from src import parse_professors
+from src.parse_professors import (
+    PARSER_ENGINES,
+    CardParseError,
+    parse_batch,
+    parse_professor_records,
+    read_spooled_professors,
+    spool_professor_records,
+)
+
+
+@pytest.mark.parametrize("engine", list(PARSER_ENGINES))
+@pytest.mark.parametrize("num_cards", [0, 1, 25])
+def test_engines_parse_the_generated_professors(engine, num_cards):
+    page = synthetic_page(num_cards, seed=num_cards)
+    df = parse_professors.parse_professors(page, engine=engine)
+    assert df.equals(synthetic_dataframe(num_cards, seed=num_cards))
+
+
+@pytest.mark.parametrize("engine", list(PARSER_ENGINES))
+def test_cards_without_a_link_keep_their_own_ratings(engine):
+    # Without the link the ratings are looked up next to the card's info
+    page = synthetic_page(5, seed=3)
+    page = page.replace("<a class=", "<div class=").replace("</a>", "</div>")
+    expected = synthetic_dataframe(5, seed=3).with_columns(
+        pl.lit(None, pl.String).alias("Professor ID")
+    )
+    df = parse_professors.parse_professors(page, engine=engine)
+    assert df.equals(expected)
+
+
+def test_empty_page():
+    for engine in PARSER_ENGINES:
+        assert parse_professors.parse_professors("", engine=engine).height == 0
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        parse_professors.parse_professors("", engine="regex")
+
+
+@pytest.mark.parametrize("engine", list(PARSER_ENGINES))
+def test_card_failures_are_raised(engine, monkeypatch):
+    def broken_link(href):
+        raise IndexError("broken link")
+
+    monkeypatch.setattr(parse_professors, "_professor_id", broken_link)
+    with pytest.raises(CardParseError, match="Card 1: IndexError: broken link"):
+        parse_professors.parse_professors(synthetic_page(3), engine=engine)
+
+
+def test_records_match_the_page_parsers():
+    records = synthetic_records(10, seed=4)
+    # Cards read twice are only counted once
+    df = parse_professor_records([records[:6], records[4:]])
+    assert df.equals(synthetic_dataframe(10, seed=4))
+
+
+def test_spooled_records_read_back_as_parsed(tmp_path):
+    records = synthetic_records(30, seed=5)
+    batches = [records[:12], records[10:25], records[25:], []]
+    assert spool_professor_records(batches, tmp_path) == 30
+    assert len(list(tmp_path.glob("*.parquet"))) == 4
+    assert read_spooled_professors(tmp_path).equals(synthetic_dataframe(30, seed=5))
+
+
+def test_parse_batch_records_failures_and_skips_parsed_files(tmp_path):
+    html_dir = tmp_path / "html"
+    html_dir.mkdir()
+    (html_dir / "small").write_text(synthetic_page(4, seed=1), encoding="utf-8")
+    (html_dir / "large").write_text(synthetic_page(40, seed=2), encoding="utf-8")
+    (html_dir / "binary").write_bytes(b"\xff\xfe\x00")
+    output_dir = tmp_path / "dataframes"
+
+    report = parse_batch(html_dir, output_dir, workers=2)
+    assert sorted(report["parsed"]) == ["large", "small"]
+    assert list(report["failed"]) == ["binary"]
+    assert report["professors"] == 44
+    df = pl.read_parquet(output_dir / "large.parquet")
+    assert df.equals(synthetic_dataframe(40, seed=2))
+
+    report = parse_batch(html_dir, output_dir, workers=2)
+    assert sorted(report["skipped"]) == ["large", "small"]
+    assert report["parsed"] == []
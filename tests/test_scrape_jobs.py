@@ -0,0 +1,150 @@
+import httpx
+import pytest
+from benchmarks.synthetic import synthetic_dataframe, synthetic_page, synthetic_records
+from src.api_scraper import ApiScraper
+from src.parse_professors import spool_professor_records
+from src.scrape_jobs import DriverPool, ScrapeJob, ScrapeJobQueue
+
+
+class FakeScraper:
+    """
+    Stands in for ProfessorScraper. Without resets, reset raises like a dead session.
+    """
+
+    def __init__(self, alive=True, resets=True):
+        self.alive = alive
+        self.resets = resets
+        self.quit_called = False
+
+    def is_alive(self) -> bool:
+        return self.alive
+
+    def reset(self) -> None:
+        if not self.resets:
+            raise RuntimeError("invalid session id")
+
+    def quit(self) -> None:
+        self.quit_called = True
+
+
+def test_scrapers_are_reused():
+    pool = DriverPool(size=1, factory=FakeScraper)
+    scraper = pool.acquire()
+    pool.release(scraper)
+    assert pool.acquire() is scraper
+
+
+def test_scrapers_failing_their_reset_are_replaced():
+    pool = DriverPool(size=1, factory=FakeScraper)
+    broken = pool.acquire()
+    broken.resets = False
+    pool.release(broken)
+
+    scraper = pool.acquire()
+    assert scraper is not broken
+    assert broken.quit_called
+    assert pool._all == [scraper]
+    # The slot is still usable once the replacement is released
+    pool.release(scraper)
+    assert pool.acquire() is scraper
+
+
+def test_dead_scrapers_are_replaced():
+    pool = DriverPool(size=1, factory=FakeScraper)
+    dead = pool.acquire()
+    dead.alive = False
+    pool.release(dead)
+    assert dead.quit_called
+    assert pool.acquire() is not dead
+
+
+def finished_queue(jobs: int, history: int) -> ScrapeJobQueue:
+    queue = ScrapeJobQueue(lambda job, df: 0, DriverPool(size=1), history=history)
+    # Finished jobs without running them, so no worker threads are started
+    for school_id in range(jobs):
+        job = ScrapeJob(school_id, f"School {school_id}")
+        job.status = "done"
+        queue._jobs[job.job_id] = job
+    queue._threads = ["started"]
+    return queue
+
+
+def test_jobs_under_the_history_are_kept():
+    queue = finished_queue(120, history=200)
+    queue.submit(1000, "New School")
+    assert len(queue.jobs()) == 121
+
+
+def test_the_oldest_finished_jobs_are_forgotten():
+    queue = finished_queue(200, history=200)
+    oldest = queue.jobs()[0]
+    queue.submit(1000, "New School")
+    assert len(queue.jobs()) == 200
+    assert queue.get(oldest.job_id) is None
+
+
+class RecordsScraper(FakeScraper):
+    """
+    Hands over the cards of a synthetic school in batches, like a browser
+    extracting them as they load.
+    """
+
+    def spool_professors(self, url, directory, keep_alive=False, progress=None):
+        records = synthetic_records(40, seed=6)
+        batches = [records[i : i + 16] for i in range(0, len(records), 16)]
+        return spool_professor_records(batches, directory)
+
+
+def test_records_are_spooled_and_read_back():
+    ingested = []
+    queue = ScrapeJobQueue(
+        lambda job, df: ingested.append(df) or df.height,
+        DriverPool(size=1, factory=RecordsScraper),
+        extraction="records",
+    )
+    job = queue.submit(1, "Synthetic University")
+    queue._queue.join()
+    assert job.status == "done" and job.rows == 40
+    assert ingested[0].equals(synthetic_dataframe(40, seed=6))
+
+
+class PageScraper(FakeScraper):
+    def read_page_source(self, url, keep_alive=False, progress=None):
+        return synthetic_page(12, seed=7)
+
+
+class BrokenApiScraper(ApiScraper):
+    """
+    An API scraper whose every request is answered by handler.
+    """
+
+    def __init__(self, handler):
+        super().__init__("http://stub/graphql", retries=0)
+        self.handler = handler
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+
+
+def undecodable(request):
+    raise httpx.DecodingError("invalid gzip data", request=request)
+
+
+def malformed_nodes(request):
+    edges = [{"node": "not a teacher"}]
+    return httpx.Response(
+        200, json={"data": {"search": {"teachers": {"edges": edges}}}}
+    )
+
+
+@pytest.mark.parametrize("handler", [undecodable, malformed_nodes])
+def test_api_failures_fall_back_to_selenium(handler):
+    queue = ScrapeJobQueue(
+        lambda job, df: df.height,
+        DriverPool(size=1, factory=PageScraper),
+        api_scraper=BrokenApiScraper(handler),
+    )
+    job = queue.submit(1, "Synthetic University")
+    queue._queue.join()
+    assert job.status == "done" and job.source == "selenium"
+    assert job.rows == 12
@@ -0,0 +1,37 @@
+import pytest
+from benchmarks.synthetic import synthetic_dataframe, synthetic_show_more_page
+from src.parse_professors import parse_professor_records
+from src.scraping import ProfessorScraper
+
+# The page's own elements besides the cards: header, results, Show More and its script
+PAGE_ELEMENTS = 4
+
+
+@pytest.fixture(scope="module")
+def scraper():
+    try:
+        scraper = ProfessorScraper()
+    except Exception as error:
+        pytest.skip(f"Chrome can't be started: {error}")
+    yield scraper
+    scraper.quit()
+
+
+def test_extracted_cards_only_leave_their_links(scraper, tmp_path):
+    page = tmp_path / "school.html"
+    page.write_text(synthetic_show_more_page(600, seed=5), encoding="utf-8")
+    batches, elements = [], []
+    for records in scraper.iter_professor_records(page.as_uri()):
+        batches.append(records)
+        elements.append(
+            scraper.driver.execute_script(
+                "return document.body.getElementsByTagName('*').length"
+            )
+        )
+    assert len(batches) > 2
+    assert parse_professor_records(batches).equals(synthetic_dataframe(600, seed=5))
+    # However many cards were loaded, the ones read are single bare links
+    loaded = 0
+    for records, count in zip(batches, elements):
+        loaded += len(records)
+        assert count <= loaded + PAGE_ELEMENTS
@@ -0,0 +1,45 @@
+import app
+from src.cache import ResponseCache
+from src.search import SchoolSearchIndex
+
+
+class Registry:
+    def __init__(self, names: dict):
+        self._names = names
+
+    def names(self) -> dict:
+        return self._names
+
+
+REGISTRY = Registry({"1": "Alpha College", "2": "Beta College"})
+
+
+def test_schools_scraped_by_another_worker_are_marked(monkeypatch):
+    # The database's stamps, with Alpha College scraped before either worker started
+    stamps = {1: "monday"}
+    # Polled on every search, as if each came after the interval
+    cache = ResponseCache(version_source=app.poll_scrape_versions, poll_interval=0)
+    worker = SchoolSearchIndex(
+        REGISTRY, lambda: list(stamps), poll_scraped=cache.poll_versions
+    )
+    other = SchoolSearchIndex(REGISTRY, lambda: list(stamps))
+    monkeypatch.setattr(app, "search_index", worker)
+    monkeypatch.setattr(app, "scrape_versions", lambda: dict(stamps))
+    assert worker.search("college", scraped=False) == ["Beta College"]
+
+    # The other worker scrapes Beta College
+    stamps[2] = "tuesday"
+    other.mark_scraped([2])
+    assert worker.search("college", scraped=False) == []
+    assert sorted(worker.search("college", scraped=True)) == [
+        "Alpha College",
+        "Beta College",
+    ]
+
+
+def test_known_schools_keep_the_cached_searches():
+    index = SchoolSearchIndex(REGISTRY, lambda: [1])
+    index.search("college", scraped=True)
+    index.mark_scraped([1])
+    index.search("college", scraped=True)
+    assert index.cache_info().hits == 1